@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row predictions into one vectorized call.
+
+    ``submit`` parks each request on a future. The pending rows are flushed
+    through ``fn`` (a list of rows -> list of results function) once
+    ``max_rows`` have queued up or ``window`` seconds have passed since the
+    first one arrived, and the results are fanned back out in order.
+    ``runner`` decides where ``fn`` executes, e.g. on a worker pool; without
+    one it runs on the event loop.
+
+    If a coalesced call fails, the rows are retried one by one so a single
+    bad input only fails its own request.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_rows: int = 64,
+        window: float = 0.002,
+        runner: Optional[Callable[..., Awaitable[List[Any]]]] = None,
+    ):
+        self.fn = fn
+        self.max_rows = max_rows
+        self.window = window
+        self.runner = runner
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_rows > 1
+
+    async def submit(self, item):
+        if not self.enabled:
+            return (await self._call([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    async def submit_all(self, items):
+        return list(await asyncio.gather(*(self.submit(item) for item in items)))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run([item for item, _ in batch], [future for _, future in batch]))
+        # Keep a reference until the task is done so it is not garbage collected
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _call(self, items):
+        if self.runner is None:
+            return self.fn(items)
+        return await self.runner(self.fn, items)
+
+    async def _run(self, items, futures):
+        try:
+            results = await self._call(items)
+        except Exception as e:
+            if len(items) == 1:
+                self._set_exception(futures[0], e)
+                return
+            logger.warning("Batched call of %d rows failed, retrying rows individually: %s", len(items), e)
+            for item, future in zip(items, futures):
+                await self._run([item], [future])
+            return
+
+        if len(results) != len(items):
+            # zip() would leave the extra futures, and their requests, waiting forever
+            error = RuntimeError(f"Batched call returned {len(results)} results for {len(items)} rows")
+            logger.error("%s", error)
+            for future in futures:
+                self._set_exception(future, error)
+            return
+
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _set_exception(future, exc):
+        if not future.done():
+            future.set_exception(exc)
@@ -0,0 +1,403 @@
+"""
+Reproducible latency and throughput benchmarks of the API.
+
+    python -m backend.benchmark [--only NAME ...] [--concurrency 1,4,16,64,256]
+                                [--requests N] [--out FILE] [--compare FILE]
+
+Covers the symptom encoder, DiseaseModel.predict, every /predict/{disease}
+endpoint and the /image pipeline, the endpoints in-process through httpx's
+ASGI transport with Gemini replaced by a local stub server. Inputs are drawn
+from backend/data and public/images with a fixed seed. Each benchmark
+reports p50/p95/p99 latency, throughput and the current RSS of the process
+and its workers after every concurrency level; the peak RSS of the whole
+run is reported once. --out writes the results as JSON and --compare
+prints the change against an earlier run, exiting non-zero on p95
+regressions.
+
+The prediction and image analysis caches are disabled unless --cache is
+given, so every request exercises the full path.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+try:
+    from samples import DISEASES, load_images, load_payloads, sample_payloads
+except ImportError:
+    # Fallback for when running as a module
+    from backend.samples import DISEASES, load_images, load_payloads, sample_payloads
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+STUB_ANALYSIS = "Benchmark analysis"
+STUB_RESPONSE = json.dumps({"candidates": [{"content": {"parts": [{"text": STUB_ANALYSIS}]}}]}).encode()
+
+
+class StubGemini:
+    """
+    Minimal keep-alive HTTP/1.1 server that answers every request like
+    Gemini's generateContent, after ``latency`` seconds
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        # Bound up front so the URL is known before the app reads its settings
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}/v1beta/models/stub:generateContent"
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, sock=self.sock)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+                if self.latency > 0:
+                    await asyncio.sleep(self.latency)
+                self.requests += 1
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                    % len(STUB_RESPONSE) + STUB_RESPONSE
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def peak_rss_mb():
+    """
+    High-water marks of this process's resident set size and of its largest
+    waited-for child, over the whole run; reported once, in the metadata
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+
+def _statm_rss(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_mb():
+    """
+    Current resident set size of this process and the total of its live
+    children (the process pool), sampled after each level; None where
+    /proc is not available
+    """
+    try:
+        own = _statm_rss("self")
+    except OSError:
+        return None, None
+    children = 0
+    pid = os.getpid()
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            child_pids = f.read().split()
+    except OSError:
+        child_pids = []
+    for child in child_pids:
+        try:
+            children += _statm_rss(child)
+        except OSError:
+            # Exited since it was listed
+            pass
+    return round(own / 2**20, 1), round(children / 2**20, 1)
+
+
+def summarize(name, concurrency, latencies, errors, elapsed):
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    rss, child_rss = rss_mb()
+    return {
+        "benchmark": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "mean_ms": round(float(latencies_ms.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "rss_mb": rss,
+        "child_rss_mb": child_rss,
+    }
+
+
+def print_result(result):
+    print(
+        f"{result['benchmark']:<28} c={result['concurrency']:<4} n={result['requests']:<6} "
+        f"p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+        f"{result['throughput_rps']:10.1f} req/s  errors {result['errors']}  RSS {result['rss_mb']} MB",
+        flush=True,
+    )
+
+
+def bench_function(name, fn, inputs):
+    """Time ``fn`` called once per input, sequentially"""
+    latencies = []
+    started = time.perf_counter()
+    for item in inputs:
+        call_started = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(name, 1, latencies, 0, time.perf_counter() - started)
+
+
+async def bench_requests(name, send, concurrency, total):
+    """Send requests ``0..total-1`` through ``send`` from ``concurrency`` closed-loop workers"""
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                ok = await send(index)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, concurrency, latencies, errors, time.perf_counter() - started)
+
+
+def json_sender(client, path, payloads):
+    bodies = [json.dumps(payload).encode() for payload in payloads]
+    headers = {"Content-Type": "application/json"}
+
+    async def send(index):
+        response = await client.post(path, content=bodies[index % len(bodies)], headers=headers)
+        return response.status_code == 200
+
+    return send
+
+
+def image_sender(client, images):
+    async def send(index):
+        image = images[index % len(images)]
+        response = await client.post(
+            f"/image/{image.disease}",
+            files={"file": (image.filename, image.data, image.content_type)},
+        )
+        # The endpoint answers 200 with an error message when Gemini fails
+        return response.status_code == 200 and STUB_ANALYSIS in response.text
+
+    return send
+
+
+def _import_app():
+    try:
+        import main
+        import settings
+        from helper import prepare_symptoms_array
+        from model_registry import registry
+    except ImportError:
+        # Fallback for when running as a module
+        from backend import main, settings
+        from backend.helper import prepare_symptoms_array
+        from backend.model_registry import registry
+    return main, settings, prepare_symptoms_array, registry
+
+
+def selected(name, only):
+    return not only or any(pattern in name for pattern in only)
+
+
+async def run_benchmarks(args, stub):
+    import httpx
+
+    main, settings, prepare_symptoms_array, registry = _import_app()
+    results = []
+
+    def rng_for(name):
+        # One stream per benchmark, so --only does not change the inputs of the others
+        return random.Random(f"{args.seed}:{name}")
+
+    def record(result):
+        print_result(result)
+        results.append(result)
+
+    await stub.start()
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            symptom_lists = [payload["symptoms"] for payload in sample_payloads("general", args.calls, rng_for("symptoms"))]
+            if selected("prepare_symptoms_array", args.only):
+                record(bench_function("prepare_symptoms_array", prepare_symptoms_array, symptom_lists))
+            if selected("DiseaseModel.predict", args.only):
+                model = registry.get("general")
+                record(bench_function("DiseaseModel.predict", model.predict, [prepare_symptoms_array(s) for s in symptom_lists]))
+
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                targets = [(f"/predict/{disease}", disease) for disease in DISEASES]
+                targets.append(("/image/{disease_type}", None))
+                for name, disease in targets:
+                    if not selected(name, args.only):
+                        continue
+                    if disease is None:
+                        images = load_images()
+                        if not images:
+                            print(f"{name}: skipped, no sample images found")
+                            continue
+                        send = image_sender(client, images)
+                    else:
+                        # Enough rows for the largest level; send() cycles through them
+                        count = max(args.requests, max(args.concurrency) * 4, args.warmup)
+                        send = json_sender(client, name, sample_payloads(disease, count, rng_for(name)))
+                    await bench_requests(name, send, 1, args.warmup)
+                    for concurrency in args.concurrency:
+                        total = max(args.requests, concurrency * 4)
+                        record(await bench_requests(name, send, concurrency, total))
+    finally:
+        await stub.close()
+
+    peak_rss, peak_child_rss = peak_rss_mb()
+    print(f"\nPeak RSS over the run: {peak_rss} MB, largest exited child {peak_child_rss} MB")
+    meta = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "requests": args.requests,
+        "calls": args.calls,
+        "cache": args.cache,
+        "gemini_latency": args.gemini_latency,
+        "peak_rss_mb": peak_rss,
+        "peak_child_rss_mb": peak_child_rss,
+        "settings": {
+            name: getattr(settings, name)
+            for name in (
+                "INFERENCE_EXECUTOR", "IMAGE_EXECUTOR", "THREAD_POOL_SIZE", "PROCESS_POOL_SIZE",
+                "MICROBATCH_WINDOW_MS", "MICROBATCH_MAX_ROWS", "PREDICTION_JITTER", "LEAN_MODELS",
+            )
+        },
+    }
+    return {"meta": meta, "results": results}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline_path, threshold):
+    """Print the change of every result against ``baseline_path``; returns the number of p95 regressions"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(result["benchmark"], result["concurrency"]): result for result in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    regressions = 0
+    for result in report["results"]:
+        before = previous.get((result["benchmark"], result["concurrency"]))
+        if before is None:
+            continue
+        p95_change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        rps_change = result["throughput_rps"] / before["throughput_rps"] - 1 if before["throughput_rps"] else 0.0
+        regressed = p95_change > threshold
+        regressions += regressed
+        print(
+            f"{result['benchmark']:<28} c={result['concurrency']:<4} p95 {before['p95_ms']:9.3f} -> {result['p95_ms']:9.3f} ms "
+            f"({p95_change:+.1%})  throughput {rps_change:+.1%}" + ("  REGRESSION" if regressed else "")
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction helpers and API endpoints")
+    parser.add_argument("--only", nargs="*", default=[], help="run benchmarks whose name contains any of these strings")
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 4, 16, 64, 256], help="comma-separated concurrency levels (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=400, help="requests per endpoint and level, at least 4 per worker")
+    parser.add_argument("--calls", type=int, default=2000, help="calls per helper benchmark")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint before the first level")
+    parser.add_argument("--seed", type=int, default=0, help="seed for sampling inputs")
+    parser.add_argument("--cache", action="store_true", help="keep the prediction and image analysis caches enabled")
+    parser.add_argument("--gemini-latency", type=float, default=0.0, help="seconds the Gemini stub waits before answering")
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative p95 increase reported as a regression by --compare (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    # Settings are read when the app is imported, so configure it first
+    stub = StubGemini(args.gemini_latency)
+    os.environ["GEMINI_API_URL"] = stub.url
+    os.environ["GEMINI_API_KEY"] = "benchmark"
+    os.environ["STARTUP_WARMUP"] = "blocking"
+    # Per-request log lines would interleave with the results; LOG_LEVEL=INFO includes them
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not args.cache:
+        os.environ["PREDICTION_CACHE_SIZE"] = "0"
+        os.environ["IMAGE_CACHE_SIZE"] = "0"
+        os.environ["IMAGE_CACHE_PATH"] = ""
+
+    for disease in DISEASES:
+        load_payloads(disease)
+    report = asyncio.run(run_benchmarks(args, stub))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(report['results'])} results to {args.out}")
+    if args.compare:
+        return 1 if compare(report, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
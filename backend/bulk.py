@@ -0,0 +1,129 @@
+"""
+Bulk scoring of cohort CSV files laid out like the datasets in backend/data
+(see SAMPLE_SPECS in samples.py). The upload is read in fixed-size chunks and
+scored BULK_CHUNK_ROWS rows at a time, so memory use does not grow with the
+file; results are streamed back as NDJSON or CSV, one line per input row.
+"""
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict, List, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+try:
+    from samples import SAMPLE_SPECS
+    from settings import BULK_READ_CHUNK_BYTES
+except ImportError:
+    # Fallback for when running as a module
+    from backend.samples import SAMPLE_SPECS
+    from backend.settings import BULK_READ_CHUNK_BYTES
+
+BULK_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Result fields written as CSV columns, after the row number
+RESULT_FIELDS = ("prediction", "probability", "risk_level")
+GENERAL_RESULT_FIELDS = ("prediction", "probability", "description", "precautions", "unrecognized")
+
+
+async def read_records(file: UploadFile, chunk_rows: int) -> AsyncIterator[List[Tuple[int, Dict[str, str]]]]:
+    """
+    Lists of at most ``chunk_rows`` (line number, column -> value) records
+    of a CSV upload, read BULK_READ_CHUNK_BYTES at a time. Quoted values
+    cannot span lines.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    header = None
+    pending = ""
+    line_number = 0
+    records = []
+    finished = False
+    while not finished:
+        data = await file.read(BULK_READ_CHUNK_BYTES)
+        finished = not data
+        pending += decoder.decode(data, final=finished)
+        lines = pending.split("\n")
+        # The last piece is an incomplete line until the upload ends
+        pending = "" if finished else lines.pop()
+        for row in csv.reader(lines):
+            line_number += 1
+            if not any(value.strip() for value in row):
+                continue
+            if header is None:
+                header = [column.strip() for column in row]
+                continue
+            records.append((line_number, dict(zip(header, row))))
+            if len(records) == chunk_rows:
+                yield records
+                records = []
+    if header is None:
+        raise HTTPException(status_code=400, detail="The uploaded file is empty")
+    if records:
+        yield records
+
+
+def record_payload(disease: str, record: Dict[str, str]) -> dict:
+    """Request body of one CSV record, with the dataset's columns renamed to the input fields"""
+    if disease == "general":
+        # Disease, Symptom_1, ..., Symptom_17 like dataset.csv
+        return {"symptoms": [
+            value.strip() for column, value in record.items()
+            if column != "Disease" and isinstance(value, str) and value.strip()
+        ]}
+    spec = SAMPLE_SPECS[disease]
+    payload = {}
+    for column, value in record.items():
+        if column in spec.drop:
+            continue
+        field = spec.rename.get(column, column.replace(" ", "_"))
+        if isinstance(value, str):
+            value = value.strip()
+        elif value is None:
+            value = ""
+        if field in spec.values:
+            value = spec.values[field].get(value, value)
+        payload[field] = value
+    return payload
+
+
+def score_chunk(score, rows, *args):
+    """
+    Score a chunk in one call; if that fails, row by row, so one row the
+    model rejects does not fail the rest of its chunk
+    """
+    try:
+        return score(rows, *args)
+    except HTTPException as e:
+        if len(rows) == 1:
+            return [{"error": e.detail}]
+    results = []
+    for row in rows:
+        try:
+            results.extend(score([row], *args))
+        except HTTPException as e:
+            results.append({"error": e.detail})
+    return results
+
+
+def ndjson_lines(numbered_results) -> str:
+    return "".join(json.dumps({"row": number, **result}) + "\n" for number, result in numbered_results)
+
+
+def csv_header(disease: str) -> str:
+    fields = GENERAL_RESULT_FIELDS if disease == "general" else RESULT_FIELDS
+    return ",".join(("row",) + fields + ("error",)) + "\n"
+
+
+def csv_lines(disease: str, numbered_results) -> str:
+    fields = GENERAL_RESULT_FIELDS if disease == "general" else RESULT_FIELDS
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    for number, result in numbered_results:
+        values = []
+        for field in fields:
+            value = result.get(field, "")
+            values.append("; ".join(value) if isinstance(value, (list, tuple)) else value)
+        writer.writerow([number] + values + [result.get("error", "")])
+    return out.getvalue()
@@ -1,95 +1,166 @@
-import xgboost as xgb
-import pandas as pd
+import logging
 import os
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class DiseaseTables(NamedTuple):
+    diseases: np.ndarray
+    disease_set: frozenset
+    descriptions: Dict[str, str]
+    precautions: Dict[str, Tuple[str, ...]]
+
+@lru_cache(maxsize=None)
+def load_disease_tables(data_dir):
+    '''
+    Parse dataset.csv, symptom_Description.csv and symptom_precaution.csv once
+    per process into dict-backed lookup tables shared by every DiseaseModel
+    '''
+    import pandas as pd
+
+    diseases = pd.read_csv(os.path.join(data_dir, 'dataset.csv'), usecols=['Disease'])['Disease'].unique()
+
+    desc_df = pd.read_csv(os.path.join(data_dir, 'symptom_Description.csv'))
+    desc_df = desc_df.apply(lambda col: col.str.strip())
+    descriptions = {}
+    for disease, description in zip(desc_df['Disease'], desc_df['Description']):
+        # Keep the first row per disease, like the old .values[0] lookup
+        descriptions.setdefault(disease, description)
+
+    prec_df = pd.read_csv(os.path.join(data_dir, 'symptom_precaution.csv'))
+    prec_df = prec_df.apply(lambda col: col.str.strip())
+    precautions = {}
+    for row in prec_df.itertuples(index=False):
+        precautions.setdefault(row[0], tuple(p for p in row[1:] if pd.notna(p)))
+
+    # Known gaps in the tables (e.g. names with trailing spaces in
+    # dataset.csv) are reported once here rather than on every prediction
+    for table, entries in (('description', descriptions), ('precautions', precautions)):
+        missing = [disease for disease in diseases if disease not in entries]
+        if missing:
+            logger.warning("No %s entry for %d diseases: %s", table, len(missing), missing)
+
+    return DiseaseTables(diseases, frozenset(diseases), descriptions, precautions)
+
+class DiseasePrediction(NamedTuple):
+    '''
+    Immutable result of one row; ``differential`` holds the top_k most
+    likely (disease, probability) pairs, most likely first, or is empty
+    '''
+    disease: str
+    probability: float
+    description: str
+    precautions: Tuple[str, ...]
+    differential: Tuple[Tuple[str, float], ...] = ()
+
+def top_k_indices(probabilities, k):
+    '''
+    Column indices of the k largest values of each row, largest first.
+    argpartition finds them in linear time; only those k are then sorted.
+    '''
+    k = min(k, probabilities.shape[1])
+    if k < probabilities.shape[1]:
+        candidates = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(k), probabilities.shape)
+    order = np.argsort(-np.take_along_axis(probabilities, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
 
 class DiseaseModel:
+    '''
+    Symptom classifier with its disease lookup tables. Predictions keep no
+    state on the instance, so one loaded model serves concurrent requests.
+    '''
 
     def __init__(self):
-        self.all_symptoms = None
-        self.symptoms = None
-        self.pred_disease = None
-        self.model = xgb.XGBClassifier()
+        self.model = None
         
         # Get the absolute path to the data directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         self.data_dir = os.path.join(current_dir, 'data')
         
-        # Load disease list
-        dataset_path = os.path.join(self.data_dir, 'dataset.csv')
-        self.diseases = self.disease_list(dataset_path)
+        # Shared lookup tables, parsed on first use only
+        self.tables = load_disease_tables(self.data_dir)
+        self.diseases = self.tables.diseases
 
     def load_xgboost(self, model_path):
+        # xgboost is only imported by processes that load the JSON artifact
+        import xgboost as xgb
+
         try:
+            self.model = xgb.XGBClassifier()
             self.model.load_model(model_path)
-            print(f"Successfully loaded model from {model_path}")
+            logger.info("Successfully loaded model from %s", model_path)
         except Exception as e:
-            print(f"Error loading model: {str(e)}")
+            logger.error("Error loading model: %s", e)
             raise
 
     def save_xgboost(self, model_path):
         self.model.save_model(model_path)
 
-    def predict(self, X):
+    def predict_proba(self, X):
+        return self.model.predict_proba(X)
+
+    def predictions(self, disease_probability_array, top_k=0) -> List[DiseasePrediction]:
+        """
+        One DiseasePrediction per row of a predict_proba array: the most
+        likely disease with its description and precautions, and with
+        top_k > 0 the top_k most likely diseases
+        """
+        rows = np.arange(disease_probability_array.shape[0])
+        disease_pred_idx = np.argmax(disease_probability_array, axis=1)
+        probabilities = disease_probability_array[rows, disease_pred_idx]
+        if top_k > 0:
+            ranked_idx = top_k_indices(disease_probability_array, top_k)
+            ranked_probabilities = np.take_along_axis(disease_probability_array, ranked_idx, axis=1)
+            differentials = [
+                tuple((str(disease), float(probability)) for disease, probability in zip(self.diseases[idx], ranked))
+                for idx, ranked in zip(ranked_idx, ranked_probabilities)
+            ]
+        else:
+            differentials = [()] * len(rows)
+
+        return [
+            DiseasePrediction(
+                str(disease),
+                float(probability),
+                self.describe_disease(disease),
+                tuple(self.disease_precautions(disease)),
+                differential,
+            )
+            for disease, probability, differential in zip(self.diseases[disease_pred_idx], probabilities, differentials)
+        ]
+
+    def predict_batch(self, X, top_k=0) -> List[DiseasePrediction]:
+        """Predictions for every row of X from one predict_proba pass"""
         try:
-            self.symptoms = X
-            disease_pred_idx = self.model.predict(self.symptoms)
-            # Convert disease_pred_idx to integer for indexing
-            pred_idx = disease_pred_idx[0]
-            self.pred_disease = self.diseases[pred_idx]
-            disease_probability_array = self.model.predict_proba(self.symptoms)
-            disease_probability = disease_probability_array[0, pred_idx]
-            return self.pred_disease, disease_probability
+            return self.predictions(self.predict_proba(X), top_k)
         except Exception as e:
-            print(f"Error during prediction: {str(e)}")
+            logger.error("Error during prediction: %s", e)
             raise
 
+    def predict(self, X, top_k=0) -> DiseasePrediction:
+        """Prediction for the first row of X"""
+        return self.predict_batch(X[:1], top_k)[0]
+
     def describe_disease(self, disease_name):
-        if disease_name not in self.diseases:
+        if disease_name not in self.tables.disease_set:
             return "That disease is not contemplated in this model"
-        
-        try:
-            # Read disease dataframe
-            desc_path = os.path.join(self.data_dir, 'symptom_Description.csv')
-            desc_df = pd.read_csv(desc_path)
-            desc_df = desc_df.apply(lambda col: col.str.strip())
-            return desc_df[desc_df['Disease'] == disease_name]['Description'].values[0]
-        except Exception as e:
-            print(f"Error getting disease description: {str(e)}")
-            return "Description not available"
 
-    def describe_predicted_disease(self):
-        if self.pred_disease is None:
-            return "No predicted disease yet"
+        description = self.tables.descriptions.get(disease_name)
+        if description is None:
+            return "Description not available"
+        return description
 
-        return self.describe_disease(self.pred_disease)
-    
     def disease_precautions(self, disease_name):
-        if disease_name not in self.diseases:
-            return "That disease is not contemplated in this model"
+        if disease_name not in self.tables.disease_set:
+            # Always a list, so callers can treat precautions uniformly
+            return []
 
-        try:
-            # Read precautions dataframe
-            prec_path = os.path.join(self.data_dir, 'symptom_precaution.csv')
-            prec_df = pd.read_csv(prec_path)
-            prec_df = prec_df.apply(lambda col: col.str.strip())
-            
-            # Get precautions for the disease
-            precautions = prec_df[prec_df['Disease'] == disease_name].iloc[0, 1:].tolist()
-            return [p for p in precautions if pd.notna(p)]
-        except Exception as e:
-            print(f"Error getting disease precautions: {str(e)}")
+        precautions = self.tables.precautions.get(disease_name)
+        if precautions is None:
             return ["Precautions not available"]
-
-    def predicted_disease_precautions(self):
-        if self.pred_disease is None:
-            return ["No predicted disease yet"]
-
-        return self.disease_precautions(self.pred_disease)
-
-    def disease_list(self, dataset_path):
-        try:
-            df = pd.read_csv(dataset_path)
-            return df['Disease'].unique()
-        except Exception as e:
-            print(f"Error loading disease list: {str(e)}")
-            raise
+        return list(precautions)
@@ -0,0 +1,90 @@
+import logging
+from operator import attrgetter
+from typing import Dict, Optional, Sequence
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureEncoder:
+    """
+    Schema-driven encoder from validated input models to a float64 matrix in
+    the model's training feature order.
+
+    ``columns`` are the training feature names and ``fields`` the matching
+    attributes of the input model (the same names by default).
+    ``categorical`` maps a column to the lookup table for its string
+    answers; lookups are case-insensitive and raise KeyError on values the
+    model was not trained on.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[str],
+        fields: Optional[Sequence[str]] = None,
+        categorical: Optional[Dict[str, Dict[str, float]]] = None,
+    ):
+        self.columns = tuple(columns)
+        self.fields = tuple(fields) if fields is not None else self.columns
+        if len(self.fields) != len(self.columns):
+            raise ValueError("fields and columns must have the same length")
+        self._values = attrgetter(*self.fields)
+        categorical = categorical or {}
+        self._categorical = tuple(
+            (position, categorical[column])
+            for position, column in enumerate(self.columns)
+            if column in categorical
+        )
+
+    def encode(self, rows) -> np.ndarray:
+        """Encode input rows into one preallocated (n, len(columns)) matrix"""
+        X = np.empty((len(rows), len(self.columns)), dtype=np.float64)
+        for i, row in enumerate(rows):
+            values = list(self._values(row))
+            for position, mapping in self._categorical:
+                values[position] = mapping[values[position].lower()]
+            X[i] = values
+        return X
+
+    def validate(self, model):
+        """
+        Check a fitted model against the encoder's column order. Raises
+        ValueError if the model was trained on different features.
+        """
+        names = getattr(model, "feature_names_in_", None)
+        if names is not None and tuple(names) != self.columns:
+            raise ValueError(f"Model features {list(names)} do not match encoder columns {list(self.columns)}")
+        n_features = getattr(model, "n_features_in_", None)
+        if n_features is not None and n_features != len(self.columns):
+            raise ValueError(f"Model expects {n_features} features, encoder produces {len(self.columns)}")
+
+
+def drop_feature_names(estimator):
+    """
+    Remove ``feature_names_in_`` from a fitted estimator and every estimator
+    nested in it, so scikit-learn does not re-check (and warn about) column
+    names when it is given a plain array.
+    """
+    stack = [estimator]
+    seen = set()
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif hasattr(obj, "fit") and hasattr(obj, "__dict__"):
+            vars(obj).pop("feature_names_in_", None)
+            stack.extend(value for value in vars(obj).values() if isinstance(value, (list, tuple)) or hasattr(value, "fit"))
+
+
+def load_encoded_model(model_path, encoder: FeatureEncoder, loader=joblib.load):
+    """Load a scikit-learn model and validate its feature names against ``encoder`` once"""
+    model = loader(model_path)
+    encoder.validate(model)
+    drop_feature_names(model)
+    logger.info("Validated %d feature names for %s", len(encoder.columns), model_path)
+    return model
@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+try:
+    from metrics import RequestTiming, collect_stages, current_request, observe_stage
+    from settings import IMAGE_EXECUTOR, INFERENCE_EXECUTOR, PROCESS_POOL_SIZE, THREAD_POOL_SIZE
+except ImportError:
+    # Fallback for when running as a module
+    from backend.metrics import RequestTiming, collect_stages, current_request, observe_stage
+    from backend.settings import IMAGE_EXECUTOR, INFERENCE_EXECUTOR, PROCESS_POOL_SIZE, THREAD_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+_thread_pool = None
+_process_pool = None
+
+
+def thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="worker")
+    return _thread_pool
+
+
+def process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # spawn instead of fork: the parent already runs the event loop and pool threads
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PROCESS_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def _call_in_process(fn, args, route):
+    # HTTPException does not survive pickling, so ship its fields back instead;
+    # stage timings go back with the result to be recorded by the parent.
+    # The route labels (and samples) the worker's log records.
+    timing = RequestTiming()
+    timing.route = route
+    current_request.set(timing)
+    with collect_stages() as stages:
+        try:
+            return True, fn(*args), stages
+        except HTTPException as e:
+            return False, (e.status_code, e.detail), stages
+
+
+async def run_in_thread(fn, *args):
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the caller's context, like asyncio.to_thread, so the
+    # request's metrics labels reach the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(thread_pool(), functools.partial(context.run, fn, *args))
+
+
+async def run_in_process(fn, *args):
+    loop = asyncio.get_running_loop()
+    timing = current_request.get()
+    route = timing.route if timing is not None else None
+    ok, value, stages = await loop.run_in_executor(process_pool(), _call_in_process, fn, args, route)
+    for name, seconds in stages:
+        observe_stage(name, seconds)
+    if not ok:
+        status_code, detail = value
+        raise HTTPException(status_code=status_code, detail=detail)
+    return value
+
+
+async def run_on(executor, fn, *args):
+    """Run ``fn(*args)`` on the "thread", "process" or "inline" executor"""
+    if executor == "process" and PROCESS_POOL_SIZE > 0:
+        return await run_in_process(fn, *args)
+    if executor == "inline":
+        return fn(*args)
+    return await run_in_thread(fn, *args)
+
+
+async def run_inference(fn, *args):
+    return await run_on(INFERENCE_EXECUTOR, fn, *args)
+
+
+async def run_image_task(fn, *args):
+    return await run_on(IMAGE_EXECUTOR, fn, *args)
+
+
+def shutdown_executors():
+    global _thread_pool, _process_pool
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -0,0 +1,129 @@
+"""
+Export the registered models to the lean .npz format served with LEAN_MODELS=1.
+
+    python -m backend.export_models [name ...] [--out DIR] [--rows N] [--tolerance T]
+
+Every exported model is reloaded from disk and checked against the original
+on N synthetic rows. Predicted labels must be equal and scores (probabilities
+or decision values) within T of the original's, SCORE_TOLERANCE by default:
+the lean evaluators sum tree leaves and apply links in a different order, so
+scores agree to within rounding, not bit for bit. The command exits non-zero
+if any export fails the check.
+Models without a lean equivalent (stacking ensembles, pipelines, bundled
+scalers) are reported and keep being served from their original artifact.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    from lean_models import LeanLinear, LeanXGBoost, load_lean_model, to_lean
+    from model_registry import LEAN_DIR, registry
+except ImportError:
+    # Fallback for when running as a module
+    from backend.lean_models import LeanLinear, LeanXGBoost, load_lean_model, to_lean
+    from backend.model_registry import LEAN_DIR, registry
+
+# Largest absolute score difference accepted between an export and its source
+SCORE_TOLERANCE = 1e-6
+
+
+def sample_inputs(lean, rng, rows):
+    """Synthetic rows that reach both sides of the model's split thresholds"""
+    n_features = lean.n_features_in_
+    if isinstance(lean, LeanLinear):
+        return rng.normal(0.0, 3.0, size=(rows, n_features))
+    low = np.zeros(n_features)
+    high = np.ones(n_features)
+    internal = lean.children[0::2] != np.arange(len(lean.feature))
+    for feature in np.unique(lean.feature[internal]):
+        thresholds = lean.threshold[internal & (lean.feature == feature)].astype(np.float64)
+        low[feature] = thresholds.min() - 1.0
+        high[feature] = thresholds.max() + 1.0
+    return rng.uniform(low, high, size=(rows, n_features))
+
+
+def _scores(model, X):
+    if hasattr(model, "predict_proba") and not (isinstance(model, LeanLinear) and model.link != "logistic"):
+        return model.predict_proba(X)
+    return model.decision_function(X)
+
+
+def _latency(fn, x, repeat=200):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(x)
+    return (time.perf_counter() - started) / repeat
+
+
+def export_model(name, out_dir, rows, rng, tolerance=SCORE_TOLERANCE):
+    """
+    Export one registered model; returns False if the lean copy predicts a
+    different label or a score more than ``tolerance`` away from the original
+    """
+    source = registry.source_path(name)
+    if not os.path.exists(source):
+        print(f"{name}: skipped, {source} not found")
+        return True
+
+    started = time.perf_counter()
+    reference = registry.load_source(name)
+    source_load = time.perf_counter() - started
+    # The general model is a DiseaseModel wrapping an xgboost classifier
+    reference = getattr(reference, "model", reference)
+    try:
+        if source.endswith(".json"):
+            lean = LeanXGBoost.from_json(source)
+        else:
+            lean = to_lean(reference)
+    except ValueError as e:
+        print(f"{name}: skipped, {str(e)}")
+        return True
+
+    path = os.path.join(out_dir, f"{name}.npz")
+    lean.save(path)
+    started = time.perf_counter()
+    lean = load_lean_model(path)
+    lean_load = time.perf_counter() - started
+
+    X = sample_inputs(lean, rng, rows)
+    matches = np.mean(np.asarray(reference.predict(X)) == np.asarray(lean.predict(X)))
+    max_diff = np.abs(np.asarray(_scores(reference, X), dtype=np.float64) - _scores(lean, X)).max()
+    print(
+        f"{name}: {type(lean).__name__} -> {path} "
+        f"({os.path.getsize(source) / 1024:.0f} KiB -> {os.path.getsize(path) / 1024:.0f} KiB), "
+        f"load {source_load * 1000:.1f} ms -> {lean_load * 1000:.1f} ms, "
+        f"1-row predict {_latency(reference.predict, X[:1]) * 1e6:.0f} us -> {_latency(lean.predict, X[:1]) * 1e6:.0f} us, "
+        f"predictions equal {matches:.2%}, max score diff {max_diff:.3g}"
+    )
+    ok = matches == 1.0 and max_diff <= tolerance
+    print(f"{name}: {'scores within' if ok else 'FAILED, scores or labels outside'} tolerance {tolerance:g}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export registered models to the lean .npz format")
+    parser.add_argument("names", nargs="*", help=f"models to export (default: all of {', '.join(registry.names())})")
+    parser.add_argument("--out", default=LEAN_DIR, help="output directory (default: %(default)s)")
+    parser.add_argument("--rows", type=int, default=1000, help="synthetic rows used to verify each export")
+    parser.add_argument("--tolerance", type=float, default=SCORE_TOLERANCE,
+                        help="largest absolute score difference accepted (default: %(default)g)")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.names) - set(registry.names())
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(sorted(unknown))}")
+
+    os.makedirs(args.out, exist_ok=True)
+    rng = np.random.default_rng(0)
+    ok = True
+    for name in args.names or registry.names():
+        ok = export_model(name, args.out, args.rows, rng, args.tolerance) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import random
+from typing import Optional, Union
+
+import httpx
+
+try:
+    from settings import (
+        GEMINI_API_KEY, GEMINI_API_URL, GEMINI_DEADLINE, GEMINI_MAX_CONCURRENCY,
+        GEMINI_MAX_RETRIES, GEMINI_RETRY_BACKOFF, GEMINI_TIMEOUT,
+    )
+except ImportError:
+    # Fallback for when running as a module
+    from backend.settings import (
+        GEMINI_API_KEY, GEMINI_API_URL, GEMINI_DEADLINE, GEMINI_MAX_CONCURRENCY,
+        GEMINI_MAX_RETRIES, GEMINI_RETRY_BACKOFF, GEMINI_TIMEOUT,
+    )
+
+logger = logging.getLogger(__name__)
+
+# Worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GeminiAPIError(Exception):
+    def __init__(self, status_code: int, text: str):
+        super().__init__(status_code, text)
+        self.status_code = status_code
+        self.text = text
+
+
+class GeminiClient:
+    """
+    Shared async client for the Gemini generateContent endpoint.
+
+    One pooled httpx.AsyncClient keeps connections alive between uploads, a
+    semaphore bounds the number of in-flight calls, and transient failures
+    are retried with exponential backoff inside an overall deadline.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        timeout: float = 30.0,
+        deadline: float = 60.0,
+        max_concurrency: int = 16,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    async def generate_content(self, payload: Union[dict, bytes]) -> dict:
+        """
+        POST ``payload`` and return the decoded JSON response. ``payload`` is
+        either a dict or an already serialized JSON body.
+        """
+        async with self._semaphore:
+            return await asyncio.wait_for(self._post_with_retries(payload), timeout=self.deadline)
+
+    async def _post_with_retries(self, payload: Union[dict, bytes]) -> dict:
+        if isinstance(payload, bytes):
+            request_kwargs = {"content": payload, "headers": {"Content-Type": "application/json"}}
+        else:
+            request_kwargs = {"json": payload}
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.post(self.url, params={"key": self.api_key}, **request_kwargs)
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    raise GeminiAPIError(response.status_code, response.text)
+                logger.warning("Gemini API returned %s, retrying", response.status_code)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning("Gemini API request failed (%s), retrying", type(e).__name__)
+
+            # Exponential backoff with jitter so concurrent retries spread out
+            await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+            attempt += 1
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+gemini_client = GeminiClient(
+    GEMINI_API_URL,
+    GEMINI_API_KEY,
+    timeout=GEMINI_TIMEOUT,
+    deadline=GEMINI_DEADLINE,
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    max_retries=GEMINI_MAX_RETRIES,
+    backoff=GEMINI_RETRY_BACKOFF,
+)
@@ -1,37 +1,96 @@
-import pandas as pd
+import logging
 import numpy as np
 import os
+import re
+from functools import lru_cache
+
+# Get the absolute path to the data directory
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SYMPTOMS_PATH = os.path.join(DATA_DIR, 'clean_dataset.tsv')
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def symptom_columns():
+    '''
+    Read the symptom column names from the header of clean_dataset.tsv once.
+    Only the first line is parsed; the last column is the target and is dropped.
+
+    Output:
+    - columns (tuple) = symptom names in model feature order
+    '''
+    with open(SYMPTOMS_PATH, encoding='utf-8') as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+    return tuple(header[:-1])  # -1 for target column
+
+def normalize_symptom(name):
+    '''
+    Lookup form of a symptom name: lowercase, with runs of spaces and
+    underscores as one underscore, so "Skin Rash" and a few odd column names
+    like "dischromic _patches" match
+    '''
+    return re.sub(r'[\s_]+', '_', name.strip().lower()).strip('_')
+
+@lru_cache(maxsize=None)
+def symptom_index():
+    '''
+    Normalized symptom name -> feature column index, built once per process
+    '''
+    index = {}
+    for idx, col in enumerate(symptom_columns()):
+        key = normalize_symptom(col)
+        if key in index:
+            # Normalizing must not make a symptom ambiguous
+            raise ValueError(f"Symptom columns '{symptom_columns()[index[key]]}' and '{col}' both normalize to '{key}'")
+        index[key] = idx
+    return index
+
+def symptom_indices(symptoms):
+    '''
+    Split a list of symptoms into the feature indices that are known to the
+    model and the names that are not
+
+    Output:
+    - indices (list) = column index of each recognized symptom
+    - unknown (list) = symptoms that do not match any column
+    '''
+    index = symptom_index()
+    indices = []
+    unknown = []
+    for symptom in symptoms:
+        idx = index.get(normalize_symptom(symptom))
+        if idx is None:
+            unknown.append(symptom)
+        else:
+            indices.append(idx)
+    return indices, unknown
+
+def prepare_symptoms_matrix(symptom_lists):
+    '''
+    Encode several symptom lists at once into an (n, 133) 0/1 matrix
+
+    Output:
+    - X (np.array) = one row per symptom list, ready as input to ML model
+    '''
+    X = np.zeros((len(symptom_lists), len(symptom_columns())))
+    rows = []
+    cols = []
+    for row, symptoms in enumerate(symptom_lists):
+        indices, unknown = symptom_indices(symptoms)
+        for symptom in unknown:
+            # Reported back to the client in the "unrecognized" field
+            logger.info("Symptom '%s' not found in dataset", symptom)
+        rows.extend([row] * len(indices))
+        cols.extend(indices)
+    X[rows, cols] = 1
+    return X
 
 def prepare_symptoms_array(symptoms):
     '''
-    Convert a list of symptoms to a ndim(X) (in this case 131) that matches the
+    Convert a list of symptoms to a ndim(X) (in this case 133) that matches the
     dataframe used to train the machine learning model
 
     Output:
     - X (np.array) = X values ready as input to ML model to get prediction
     '''
-    # Get the absolute path to the data directory
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(current_dir, 'data')
-    
-    df = pd.read_csv(os.path.join(data_dir, 'clean_dataset.tsv'), sep='\t')
-    symptoms_array = np.zeros((1, len(df.columns)-1))  # -1 for target column
-    
-    # Print available columns for debugging
-    print("Available columns:", df.columns.tolist())
-    print("Received symptoms:", symptoms)
-    
-    for symptom in symptoms:
-        try:
-            # Find the column that matches the symptom (case-insensitive)
-            matching_cols = [col for col in df.columns if col.lower() == symptom.lower()]
-            if matching_cols:
-                symptom_idx = df.columns.get_loc(matching_cols[0])
-                symptoms_array[0, symptom_idx] = 1
-            else:
-                print(f"Warning: Symptom '{symptom}' not found in dataset")
-        except Exception as e:
-            print(f"Error processing symptom '{symptom}': {str(e)}")
-            continue
-
-    return symptoms_array
+    return prepare_symptoms_matrix([symptoms])
@@ -0,0 +1,109 @@
+import builtins
+import logging
+import sys
+import threading
+import time
+from importlib.util import resolve_name
+from typing import Any, Dict, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_seconds: float
+    cumulative_seconds: float
+    depth: int
+
+
+class ImportProfiler:
+    """
+    In-process equivalent of ``python -X importtime``: while started, every
+    import statement that loads a new module is timed, with the time spent
+    in the modules it imports in turn reported separately. Imports made
+    through importlib.import_module count towards the importing module.
+    """
+
+    def __init__(self):
+        self.records: List[ImportRecord] = []
+        self.seconds = 0.0
+        self._original = None
+        self._started_at = None
+        self._local = threading.local()
+
+    @property
+    def active(self) -> bool:
+        return self._original is not None
+
+    def start(self):
+        if self.active:
+            return
+        self._original = builtins.__import__
+        self._started_at = time.perf_counter()
+        builtins.__import__ = self._import
+
+    def stop(self):
+        if not self.active:
+            return
+        builtins.__import__ = self._original
+        self._original = None
+        self.seconds = time.perf_counter() - self._started_at
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original or builtins.__import__
+        try:
+            target = resolve_name("." * level + name, globals["__package__"]) if level else name
+        except (KeyError, TypeError, ValueError, ImportError):
+            target = name
+        candidates = [target] + [f"{target}.{item}" for item in fromlist or () if item != "*"]
+        missing = [module for module in candidates if module not in sys.modules]
+        if not missing:
+            return original(name, globals, locals, fromlist, level)
+
+        # Time spent in nested imports, one slot per import in progress on this thread
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            loaded = [module for module in missing if module in sys.modules]
+            if loaded:
+                if stack:
+                    stack[-1] += elapsed
+                self.records.append(ImportRecord(", ".join(loaded), elapsed - nested, elapsed, len(stack)))
+
+    def report(self, limit: int = 25) -> Dict[str, Any]:
+        """Imports sorted by cumulative time, at most ``limit`` of them"""
+        slowest = sorted(self.records, key=lambda record: record.cumulative_seconds, reverse=True)[:limit]
+        return {
+            "seconds": round(self.seconds if not self.active else time.perf_counter() - self._started_at, 6),
+            "modules": len(self.records),
+            "self_seconds": round(sum(record.self_seconds for record in self.records), 6),
+            "slowest": [
+                {
+                    "module": record.module,
+                    "self_ms": round(record.self_seconds * 1000, 3),
+                    "cumulative_ms": round(record.cumulative_seconds * 1000, 3),
+                    "depth": record.depth,
+                }
+                for record in slowest
+            ],
+        }
+
+    def log_report(self, limit: int = 25):
+        report = self.report(limit)
+        lines = [
+            f"{entry['self_ms']:10.1f} | {entry['cumulative_ms']:10.1f} | {'  ' * entry['depth']}{entry['module']}"
+            for entry in report["slowest"]
+        ]
+        logger.info(
+            "Imported %d modules in %.3fs, slowest (self ms | cumulative ms):\n%s",
+            report["modules"], report["self_seconds"], "\n".join(lines),
+        )
+
+
+# Process-wide profiler, started by main.py when IMPORT_PROFILE is set
+import_profiler = ImportProfiler()
@@ -0,0 +1,53 @@
+import hashlib
+
+import numpy as np
+
+try:
+    from settings import PREDICTION_JITTER, PREDICTION_JITTER_SEED
+except ImportError:
+    # Fallback for when running as a module
+    from backend.settings import PREDICTION_JITTER, PREDICTION_JITTER_SEED
+
+# "random" draws fresh noise on every call, "off" removes the noise and
+# "hashed" derives it from the input row so identical inputs score identically
+JITTER_MODES = ("random", "off", "hashed")
+
+if PREDICTION_JITTER not in JITTER_MODES:
+    raise ValueError(f"PREDICTION_JITTER must be one of {JITTER_MODES}, got '{PREDICTION_JITTER}'")
+
+_SEED_KEY = hashlib.blake2b(PREDICTION_JITTER_SEED.encode()).digest()[:32] if PREDICTION_JITTER_SEED else b""
+
+
+def resolve_jitter(mode=None) -> str:
+    """Per-request jitter mode, falling back to the server default"""
+    return mode or PREDICTION_JITTER
+
+
+def is_deterministic(mode=None) -> bool:
+    return resolve_jitter(mode) != "random"
+
+
+def jitter_uniforms(features, draws: int, mode=None, salt: str = "") -> np.ndarray:
+    """
+    Return an (n, draws) array of values in [0, 1) that drive the probability
+    noise for each row of ``features``.
+
+    "off" returns 0.5 everywhere, the midpoint that adds no variation.
+    "hashed" seeds a generator per row from a blake2b digest of the row's
+    float64 bytes, keyed by PREDICTION_JITTER_SEED and salted per disease.
+    """
+    mode = resolve_jitter(mode)
+    # Adding 0.0 folds -0.0 into 0.0 so both hash the same
+    X = np.ascontiguousarray(features, dtype=np.float64) + 0.0
+    n = X.shape[0]
+    if mode == "random":
+        return np.random.random((n, draws))
+    if mode == "off":
+        return np.full((n, draws), 0.5)
+
+    person = salt.encode()[:16]
+    uniforms = np.empty((n, draws))
+    for i in range(n):
+        digest = hashlib.blake2b(X[i].tobytes(), digest_size=8, key=_SEED_KEY, person=person).digest()
+        uniforms[i] = np.random.default_rng(int.from_bytes(digest, "little")).random(draws)
+    return uniforms
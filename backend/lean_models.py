@@ -0,0 +1,325 @@
+import json
+from typing import Optional
+
+import numpy as np
+
+# Lean models are plain .npz archives of NumPy arrays: loading one needs
+# neither pickle nor scikit-learn/xgboost, and predicting skips their
+# per-call input validation. backend/export_models.py writes them.
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _exp32(x):
+    # Correctly rounded float32 exp; numpy's float32 exp can be 1 ulp off
+    return np.exp(x.astype(np.float64)).astype(np.float32)
+
+
+def _flatten_trees(trees):
+    """
+    Pack per-tree (children_left, children_right, feature) arrays into one
+    flat node space. ``children`` interleaves each node's left and right
+    child and leaves point back at themselves, so a tree can take more steps
+    than its depth. Returns the packed arrays with each tree's root node and
+    depth.
+    """
+    children, features, roots, depths = [], [], [], []
+    offset = 0
+    for left, right, feature in trees:
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        nodes = np.arange(len(left))
+        leaf = left < 0
+        children.append(np.column_stack([
+            np.where(leaf, nodes, left),
+            np.where(leaf, nodes, right),
+        ]).ravel() + offset)
+        features.append(np.where(leaf, 0, feature))
+        node_depth = np.zeros(len(left), dtype=np.int64)
+        # Children always come after their parent in both formats
+        for node in np.flatnonzero(~leaf):
+            node_depth[left[node]] = node_depth[right[node]] = node_depth[node] + 1
+        depths.append(int(node_depth.max()))
+        roots.append(offset)
+        offset += len(left)
+    return {
+        "children": np.concatenate(children).astype(np.int32),
+        "feature": np.concatenate(features).astype(np.int32),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "tree_depth": np.asarray(depths, dtype=np.int32),
+    }
+
+
+def _running_sum(terms):
+    """
+    Sum ``terms`` along axis 0 strictly left to right, the way a C loop
+    accumulates, so float rounding matches the reference implementations.
+    """
+    if terms[0].size <= 1024:
+        return np.cumsum(terms, axis=0)[-1]
+    # Same order, but in-place vector adds are much faster on wide rows
+    total = terms[0].copy()
+    for term in terms[1:]:
+        total += term
+    return total
+
+
+def _step(model, node, value, threshold, strict, default_left):
+    go_right = value >= threshold if strict else value > threshold
+    if default_left is not None:
+        go_right = np.where(np.isnan(value), ~default_left, go_right)
+    return model.children[2 * node + go_right]
+
+
+def _tree_outputs(model, X, table, strict, default_left=None):
+    """
+    Walk every tree for every row at once and return ``table`` looked up at
+    the leaf reached in each tree, tree-major: (n_trees, n, ...). sklearn
+    sends ``x <= threshold`` left, xgboost ``x < threshold`` (``strict``),
+    with NaN following ``default_left``.
+
+    Single-leaf trees are never walked. The others are walked deepest first,
+    and step k only advances the trees that are at least k deep.
+    """
+    n = X.shape[0]
+    outputs = np.empty((len(model.roots), n) + table.shape[1:], dtype=table.dtype)
+    outputs[:] = table[model.roots].reshape((len(model.roots), 1) + table.shape[1:])
+    if not model.active_trees:
+        return outputs
+
+    X_t = np.ascontiguousarray(X.T)
+    missing = default_left is not None and bool(np.isnan(X_t).any())
+    roots = model.roots[model.walk_order][:, None]
+    # Every row starts at the root, so the first step compares whole feature rows
+    node = _step(
+        model, roots, X_t[model.feature[roots[:, 0]]], model.threshold[roots], strict,
+        default_left[roots] if missing else None,
+    )
+    values = X_t.ravel()
+    columns = np.arange(n)
+    for active in model.active_trees[1:]:
+        current = node[:active]
+        node[:active] = _step(
+            model, current, values[model.feature[current] * n + columns], model.threshold[current], strict,
+            default_left[current] if missing else None,
+        )
+    outputs[model.walk_order] = table[node]
+    return outputs
+
+
+class LeanModel:
+    kind = ""
+
+    def __init__(self, arrays: dict, feature_names=None):
+        self.arrays = arrays
+        for key, value in arrays.items():
+            # 0-d arrays (kinds, counts, base scores) become numpy scalars
+            setattr(self, key, value[()] if value.ndim == 0 else value)
+        if feature_names is not None and len(feature_names):
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        if "tree_depth" in arrays:
+            # Trees with splits, deepest first, and how many are still walking at each step
+            order = np.argsort(-self.tree_depth, kind="stable")
+            self.walk_order = order[self.tree_depth[order] > 0]
+            self.active_trees = [
+                int(np.count_nonzero(self.tree_depth >= step))
+                for step in range(1, int(self.tree_depth.max(initial=0)) + 1)
+            ]
+
+    def save(self, path: str):
+        extra = {}
+        if getattr(self, "feature_names_in_", None) is not None:
+            extra["feature_names"] = np.asarray(self.feature_names_in_, dtype=str)
+        np.savez(path, kind=np.array(self.kind), **self.arrays, **extra)
+
+
+class LeanLinear(LeanModel):
+    """Binary LogisticRegression or linear-kernel SVC: coef (1, d), intercept (1,), classes (2,)"""
+    kind = "linear"
+
+    @property
+    def n_features_in_(self):
+        return self.coef.shape[1]
+
+    @classmethod
+    def from_sklearn(cls, model):
+        if len(model.classes_) != 2 or model.coef_.shape[0] != 1:
+            raise ValueError(f"Only binary linear models are supported, got {len(model.classes_)} classes")
+        link = "logistic" if type(model).__name__ == "LogisticRegression" else "none"
+        arrays = {
+            "coef": np.asarray(model.coef_, dtype=np.float64),
+            "intercept": np.asarray(model.intercept_, dtype=np.float64),
+            "classes": np.asarray(model.classes_),
+            "link": np.array(link),
+        }
+        return cls(arrays, getattr(model, "feature_names_in_", None))
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return (X @ self.coef.T + self.intercept).ravel()
+
+    def predict(self, X):
+        return self.classes[(self.decision_function(X) > 0).astype(int)]
+
+    def predict_proba(self, X):
+        if self.link != "logistic":
+            raise AttributeError("predict_proba is only available for logistic models")
+        probability = _sigmoid(self.decision_function(X))
+        return np.vstack([1 - probability, probability]).T
+
+
+class LeanForest(LeanModel):
+    """
+    sklearn DecisionTreeClassifier/RandomForestClassifier as flat node arrays.
+    ``value`` holds each node's class probabilities, normalized the way
+    sklearn's predict_proba does.
+    """
+    kind = "forest"
+
+    @property
+    def n_features_in_(self):
+        return int(self.n_features)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        estimators = getattr(model, "estimators_", None) or [model]
+        trees, threshold, value = [], [], []
+        for estimator in estimators:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Multi-output trees are not supported")
+            trees.append((tree.children_left, tree.children_right, tree.feature))
+            threshold.append(tree.threshold)
+            proba = tree.value[:, 0, :].copy()
+            normalizer = proba.sum(axis=1)[:, None]
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(proba / normalizer)
+        arrays = _flatten_trees(trees)
+        arrays.update({
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "value": np.concatenate(value).astype(np.float64),
+            "classes": np.asarray(model.classes_),
+            "n_features": np.array(model.n_features_in_),
+        })
+        return cls(arrays, getattr(model, "feature_names_in_", None))
+
+    def predict_proba(self, X):
+        # sklearn compares float32 inputs against float64 thresholds
+        tree_proba = _tree_outputs(self, np.asarray(X, dtype=np.float32), self.value, strict=False)
+        # Running sum over the trees in order, like sklearn's accumulation
+        proba = _running_sum(tree_proba)
+        return proba / len(self.roots)
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class LeanXGBoost(LeanModel):
+    """
+    xgboost gbtree model (multi:softprob or binary:logistic) parsed straight
+    from its JSON dump. Like xgboost, inputs, thresholds, leaf values and
+    margins are float32.
+    """
+    kind = "xgboost"
+    OBJECTIVES = ("multi:softprob", "binary:logistic")
+
+    def __init__(self, arrays: dict, feature_names=None):
+        super().__init__(arrays, feature_names)
+        n_trees = len(self.roots)
+        # Trees usually cycle through the classes one boosting round at a time
+        self.round_robin = n_trees % self.num_class == 0 and np.array_equal(
+            self.tree_group, np.arange(n_trees) % self.num_class
+        )
+
+    @property
+    def n_features_in_(self):
+        return int(self.n_features)
+
+    @classmethod
+    def from_json(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            learner = json.load(f)["learner"]
+        objective = learner["objective"]["name"]
+        booster = learner["gradient_booster"]
+        if objective not in cls.OBJECTIVES or booster["name"] != "gbtree":
+            raise ValueError(f"Unsupported xgboost model: {booster['name']} / {objective}")
+        params = learner["learner_model_param"]
+        trees = booster["model"]["trees"]
+
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported")
+
+        arrays = _flatten_trees(
+            (tree["left_children"], tree["right_children"], tree["split_indices"]) for tree in trees
+        )
+        arrays.update({
+            # Leaves keep their output value in split_conditions
+            "threshold": np.concatenate([np.asarray(t["split_conditions"], dtype=np.float32) for t in trees]),
+            "default_left": np.concatenate([np.asarray(t["default_left"], dtype=bool) for t in trees]),
+            "tree_group": np.asarray(booster["model"]["tree_info"], dtype=np.int32),
+            "num_class": np.array(max(int(params.get("num_class", 0)), 1)),
+            "base_score": np.array(float(params["base_score"]), dtype=np.float32),
+            "objective": np.array(objective),
+            "n_features": np.array(int(params["num_feature"])),
+        })
+        return cls(arrays, learner.get("feature_names") or None)
+
+    def margin(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        leaf_values = _tree_outputs(self, X, self.threshold, strict=True, default_left=self.default_left)
+        num_class = int(self.num_class)
+        n_trees, n = leaf_values.shape
+        base_score = self.base_score
+        if self.objective == "binary:logistic":
+            # Probability to margin, as xgboost's logistic objective does in float32
+            base_score = -np.log(np.float32(1) / base_score - np.float32(1))
+
+        # xgboost adds the trees one by one to a float32 margin that starts at
+        # the base score; a plain sum would reassociate and round differently
+        if self.round_robin:
+            stacked = np.empty((n_trees // num_class + 1, num_class, n), dtype=np.float32)
+            stacked[1:] = leaf_values.reshape(-1, num_class, n)
+        else:
+            stacked = np.zeros((n_trees + 1, num_class, n), dtype=np.float32)
+            stacked[1 + np.arange(n_trees), self.tree_group] = leaf_values
+        stacked[0] = base_score
+        return _running_sum(stacked).T
+
+    def predict_proba(self, X):
+        margin = self.margin(X)
+        if self.objective == "binary:logistic":
+            probability = (np.float32(1) / (np.float32(1) + _exp32(-margin[:, 0])))
+            return np.vstack([1 - probability, probability]).T
+        # Softmax with a float64 running sum of the exponentials, as xgboost does
+        shifted = _exp32(margin - margin.max(axis=1, keepdims=True))
+        total = _running_sum(shifted.T.astype(np.float64))
+        return shifted / total.astype(np.float32)[:, None]
+
+    def predict(self, X):
+        return np.argmax(self.predict_proba(X), axis=1)
+
+
+LEAN_KINDS = {cls.kind: cls for cls in (LeanLinear, LeanForest, LeanXGBoost)}
+
+
+def to_lean(model) -> LeanModel:
+    """Convert a fitted scikit-learn model; raises ValueError if its type is not supported"""
+    name = type(model).__name__
+    if name == "LogisticRegression" or (name == "SVC" and getattr(model, "kernel", None) == "linear"):
+        return LeanLinear.from_sklearn(model)
+    if name in ("DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier"):
+        return LeanForest.from_sklearn(model)
+    raise ValueError(f"No lean format for {name}")
+
+
+def load_lean_model(path: str) -> LeanModel:
+    with np.load(path, allow_pickle=False) as archive:
+        arrays = {key: archive[key] for key in archive.files}
+    kind = str(arrays.pop("kind"))
+    feature_names: Optional[np.ndarray] = arrays.pop("feature_names", None)
+    if kind not in LEAN_KINDS:
+        raise ValueError(f"Unknown lean model kind '{kind}' in {path}")
+    return LEAN_KINDS[kind](arrays, feature_names)
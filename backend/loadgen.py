@@ -0,0 +1,345 @@
+"""
+Load generator replaying realistic traffic against a running API.
+
+    python -m backend.loadgen http://localhost:8000 [--mode open|closed]
+        [--rate RPS | --rate START:END] [--concurrency N] [--duration SECONDS]
+        [--mix heart=1,general=4,image=0.5] [--out timeline.json]
+
+Requests are /predict/{disease} bodies drawn from the datasets in
+backend/data and /image/{disease} uploads of the sample images in
+public/images, picked at random according to the --mix weights.
+
+Open-loop mode sends requests at --rate per second (Poisson arrivals by
+default; START:END ramps the rate linearly over the run) whether or not
+earlier ones have completed, which is how real clients behave and shows
+where latency takes off. Latency is measured from each request's scheduled
+send time, so a client that falls behind does not hide queueing.
+Closed-loop mode runs --concurrency workers that each send their next
+request as soon as the previous one completes.
+
+Every --interval seconds a timeline row is printed with the requests sent
+and completed, errors, throughput, in-flight requests and p50/p95/p99
+latency of the requests completed in that interval. --out writes the
+timeline and a per-target summary as JSON.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    from samples import DISEASES, load_images, sample_payloads
+except ImportError:
+    # Fallback for when running as a module
+    from backend.samples import DISEASES, load_images, sample_payloads
+
+TARGETS = DISEASES + ("image",)
+
+# Bodies drawn per predict target; requests cycle through them
+PAYLOADS_PER_TARGET = 2000
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """``heart=1,general=4,image=0.5`` -> target weights; unknown targets are rejected"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in TARGETS:
+            raise argparse.ArgumentTypeError(f"unknown target '{name}' (choose from {', '.join(TARGETS)})")
+        mix[name] = float(weight) if weight else 1.0
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("at least one target needs a positive weight")
+    return mix
+
+
+def parse_rate(value: str):
+    """``100`` or ``10:500`` (linear ramp) -> (start, end) requests per second"""
+    start, _, end = value.partition(":")
+    start = float(start)
+    end = float(end) if end else start
+    if start <= 0 or end <= 0:
+        raise argparse.ArgumentTypeError("rates must be positive")
+    return start, end
+
+
+def percentiles_ms(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+class RequestMix:
+    """Picks the next request according to the target weights"""
+
+    def __init__(self, mix: Dict[str, float], rng: random.Random):
+        self.rng = rng
+        self.targets = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.targets]
+        self.bodies = {}
+        self.cursor = defaultdict(int)
+        self.images = ()
+        for name in self.targets:
+            if name == "image":
+                self.images = load_images()
+                if not self.images:
+                    raise SystemExit("The mix includes image uploads but no sample images were found in public/images")
+            else:
+                payloads = sample_payloads(name, PAYLOADS_PER_TARGET, rng)
+                self.bodies[name] = [json.dumps(payload).encode() for payload in payloads]
+
+    def next(self):
+        """(target, path, httpx request kwargs) of the next request"""
+        target = self.rng.choices(self.targets, self.weights)[0]
+        if target == "image":
+            image = self.rng.choice(self.images)
+            return target, f"/image/{image.disease}", {"files": {"file": (image.filename, image.data, image.content_type)}}
+        bodies = self.bodies[target]
+        body = bodies[self.cursor[target] % len(bodies)]
+        self.cursor[target] += 1
+        return target, f"/predict/{target}", {"content": body, "headers": {"Content-Type": "application/json"}}
+
+
+class Timeline:
+    """Per-interval and per-target tallies of a run"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.in_flight = 0
+        self.sent = Counter()
+        self.dropped = Counter()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.target_latencies = defaultdict(list)
+        self.target_errors = defaultdict(Counter)
+
+    def bucket(self, at: float) -> int:
+        return int((at - self.started) // self.interval)
+
+    def record_sent(self, at: float):
+        self.sent[self.bucket(at)] += 1
+        self.in_flight += 1
+
+    def record_dropped(self, at: float):
+        self.dropped[self.bucket(at)] += 1
+
+    def record_done(self, target: str, scheduled: float, finished: float, error=None):
+        self.in_flight -= 1
+        bucket = self.bucket(finished)
+        self.latencies[bucket].append(finished - scheduled)
+        self.target_latencies[target].append(finished - scheduled)
+        if error is not None:
+            self.errors[bucket] += 1
+            self.target_errors[target][error] += 1
+
+    def row(self, bucket: int) -> dict:
+        latencies = self.latencies.get(bucket, [])
+        return {
+            "t": round((bucket + 1) * self.interval, 3),
+            "sent": self.sent.get(bucket, 0),
+            "completed": len(latencies),
+            "errors": self.errors.get(bucket, 0),
+            "dropped": self.dropped.get(bucket, 0),
+            "throughput_rps": round(len(latencies) / self.interval, 2),
+            "in_flight": self.in_flight,
+            **percentiles_ms(latencies),
+        }
+
+    def summary(self) -> dict:
+        targets = {}
+        for target, latencies in sorted(self.target_latencies.items()):
+            errors = self.target_errors[target]
+            targets[target] = {
+                "completed": len(latencies),
+                "errors": sum(errors.values()),
+                "error_types": dict(errors),
+                **percentiles_ms(latencies),
+            }
+        everything = [latency for latencies in self.target_latencies.values() for latency in latencies]
+        return {
+            "completed": len(everything),
+            "errors": sum(self.errors.values()),
+            "dropped": sum(self.dropped.values()),
+            **percentiles_ms(everything),
+            "targets": targets,
+        }
+
+
+def format_row(row: dict) -> str:
+    def ms(value):
+        return f"{value:9.2f}" if value is not None else f"{'-':>9}"
+
+    return (
+        f"t={row['t']:7.1f}s  sent {row['sent']:6}  done {row['completed']:6}  err {row['errors']:5}  "
+        f"drop {row['dropped']:5}  {row['throughput_rps']:9.1f} req/s  in-flight {row['in_flight']:5}  "
+        f"p50 {ms(row['p50_ms'])}  p95 {ms(row['p95_ms'])}  p99 {ms(row['p99_ms'])} ms"
+    )
+
+
+async def run_load(args) -> dict:
+    import httpx
+
+    rng = random.Random(args.seed)
+    mix = RequestMix(args.mix, rng)
+    timeline = Timeline(args.interval)
+    rows = []
+    limits = httpx.Limits(max_connections=args.max_in_flight if args.mode == "open" else args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        try:
+            await client.get("/")
+        except httpx.HTTPError as e:
+            raise SystemExit(f"Cannot reach {args.url}: {e}")
+
+        async def fire(scheduled: float):
+            target, path, kwargs = mix.next()
+            timeline.record_sent(scheduled)
+            error = None
+            try:
+                response = await client.post(path, **kwargs)
+                if response.status_code != 200:
+                    error = str(response.status_code)
+            except httpx.HTTPError as e:
+                error = type(e).__name__
+            timeline.record_done(target, scheduled, time.perf_counter(), error)
+
+        async def report():
+            bucket = 0
+            while True:
+                await asyncio.sleep(max(0.0, timeline.started + (bucket + 1) * args.interval - time.perf_counter()))
+                row = timeline.row(bucket)
+                rows.append(row)
+                print(format_row(row), flush=True)
+                bucket += 1
+
+        timeline.started = time.perf_counter()
+        reporter = asyncio.create_task(report())
+        try:
+            if args.mode == "open":
+                await open_loop(args, fire, timeline, rng)
+            else:
+                await closed_loop(args, fire)
+        finally:
+            reporter.cancel()
+        # Rows for the intervals still open when the last request finished
+        last_bucket = timeline.bucket(time.perf_counter())
+        for bucket in range(len(rows), last_bucket + 1):
+            row = timeline.row(bucket)
+            rows.append(row)
+            print(format_row(row), flush=True)
+
+    summary = timeline.summary()
+    print(
+        f"\n{summary['completed']} requests, {summary['errors']} errors, {summary['dropped']} dropped; "
+        f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms"
+    )
+    for target, stats in summary["targets"].items():
+        errors = f" ({stats['error_types']})" if stats["error_types"] else ""
+        print(
+            f"  {target:<11} {stats['completed']:7} requests  {stats['errors']:5} errors{errors}  "
+            f"p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms"
+        )
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "url": args.url,
+            "mode": args.mode,
+            "rate": list(args.rate) if args.mode == "open" else None,
+            "arrivals": args.arrivals if args.mode == "open" else None,
+            "concurrency": args.concurrency if args.mode == "closed" else None,
+            "max_in_flight": args.max_in_flight if args.mode == "open" else None,
+            "duration": args.duration,
+            "interval": args.interval,
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        "timeline": rows,
+        "summary": summary,
+    }
+
+
+async def open_loop(args, fire, timeline: Timeline, rng: random.Random):
+    """Schedule requests at the configured rate, independently of completions"""
+    start_rate, end_rate = args.rate
+    tasks = set()
+    next_at = timeline.started
+    while True:
+        elapsed = next_at - timeline.started
+        if elapsed >= args.duration:
+            break
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if timeline.in_flight >= args.max_in_flight:
+            # Shed on the client instead of queueing without bound
+            timeline.record_dropped(next_at)
+        else:
+            task = asyncio.create_task(fire(next_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        rate = start_rate + (end_rate - start_rate) * elapsed / args.duration
+        next_at += rng.expovariate(rate) if args.arrivals == "poisson" else 1.0 / rate
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def closed_loop(args, fire):
+    """Keep ``concurrency`` requests in flight until the duration is up"""
+    deadline = time.perf_counter() + args.duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await fire(time.perf_counter())
+            if args.think_time > 0:
+                await asyncio.sleep(args.think_time)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay realistic prediction and image traffic against the API")
+    parser.add_argument("url", help="base URL of the API, e.g. http://localhost:8000")
+    parser.add_argument("--mode", choices=("open", "closed"), default="open", help="open-loop (fixed arrival rate) or closed-loop (fixed concurrency)")
+    parser.add_argument("--rate", type=parse_rate, default=(50.0, 50.0), help="open loop: requests per second, or START:END to ramp (default: 50)")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson", help="open loop: spacing of arrivals")
+    parser.add_argument("--max-in-flight", type=int, default=1024, help="open loop: requests beyond this many in flight are dropped")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed loop: number of workers")
+    parser.add_argument("--think-time", type=float, default=0.0, help="closed loop: seconds each worker waits between requests")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to generate load for")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds per timeline row")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=",".join(f"{name}=1" for name in DISEASES) + ",image=0.2",
+        help=f"comma-separated target=weight pairs, targets: {', '.join(TARGETS)} (default: every predict endpoint 1, image 0.2)",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a request counts as failed")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the request mix and arrivals")
+    parser.add_argument("--out", help="write the timeline and summary as JSON to this file")
+    args = parser.parse_args(argv)
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+
+    report = asyncio.run(run_load(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(report['timeline'])} timeline rows to {args.out}")
+    return 1 if report["summary"]["completed"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Logging setup: records are handed to a background thread through a bounded
+queue and formatted there, as JSON lines or text, so a request thread only
+pays for creating the record.
+
+Call sites log with %-style arguments (``logger.info("Scored %d rows",
+n)``) and structured fields via ``extra=``; nothing is formatted unless the
+record is emitted, and ``logger.debug`` dumps of whole feature matrices cost
+one level check when DEBUG is off. Records below WARNING logged while a
+request is served are sampled per route with LOG_SAMPLE_RATES; warnings and
+errors are always kept.
+"""
+import atexit
+import datetime
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict
+
+try:
+    from metrics import current_request, register_collector, sample_lines
+    from settings import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_RATE, LOG_SAMPLE_RATES
+except ImportError:
+    # Fallback for when running as a module
+    from backend.metrics import current_request, register_collector, sample_lines
+    from backend.settings import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_RATE, LOG_SAMPLE_RATES
+
+LOG_FORMATS = ("json", "text")
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "route"}
+
+_listener = None
+_handler = None
+_sampler = None
+
+
+class lazy:
+    """
+    Log argument computed only if the record is emitted, on the listener
+    thread: ``logger.info("Predictions: %s", lazy(summarize, results))``
+    """
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self):
+        return str(self.fn(*self.args))
+
+    __repr__ = __str__
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """``/predict/heart=0.1,/image/{disease_type}=1`` -> route template -> rate"""
+    rates = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        route, _, rate = part.rpartition("=")
+        rate = float(rate)
+        if not route or not 0.0 <= rate <= 1.0:
+            raise ValueError(f"LOG_SAMPLE_RATES entries must look like /route=0.1, got '{part}'")
+        rates[route.strip()] = rate
+    return rates
+
+
+class RouteSampler(logging.Filter):
+    """
+    Keeps each sub-WARNING record of a request with the rate configured for
+    its route, and labels records with the route being served
+    """
+
+    def __init__(self, rates: Dict[str, float], default: float):
+        super().__init__()
+        self.rates = rates
+        self.default = default
+        self.dropped = 0
+
+    def filter(self, record):
+        timing = current_request.get()
+        route = timing.route if timing is not None else None
+        record.route = route
+        if route is None or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(route, self.default)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread and drops
+    records instead of blocking when the queue is full
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The base class formats the message here, on the logging thread.
+        # Only tracebacks are rendered now, while the exception is current.
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per record, or text with ``key=value`` fields appended"""
+
+    def __init__(self, fmt: str = "text"):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+        message = record.getMessage()
+        if self.fmt == "json":
+            entry = {
+                "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": message,
+            }
+            if getattr(record, "route", None):
+                entry["route"] = record.route
+            entry.update(fields)
+            if record.exc_text:
+                entry["exception"] = record.exc_text
+            return json.dumps(entry, default=str)
+
+        line = f"{self.formatTime(record)} {record.levelname} {record.name}: {message}"
+        if getattr(record, "route", None):
+            fields = {"route": record.route, **fields}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def configure_logging():
+    """
+    Route the root logger through the sampling filter and a background
+    queue listener writing to stderr; safe to call more than once
+    """
+    global _listener, _handler, _sampler
+    if _listener is not None:
+        return
+    if LOG_FORMAT not in LOG_FORMATS:
+        raise ValueError(f"LOG_FORMAT must be one of {', '.join(LOG_FORMATS)}, got '{LOG_FORMAT}'")
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(StructuredFormatter(LOG_FORMAT))
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler = DeferredQueueHandler(log_queue)
+    _sampler = RouteSampler(parse_sample_rates(LOG_SAMPLE_RATES), LOG_SAMPLE_RATE)
+    _handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL.upper())
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def logging_metrics():
+    if _handler is None:
+        return []
+    return sample_lines(
+        "log_records_dropped_total",
+        "Log records not written, because they were sampled out or the queue was full",
+        "counter",
+        ("reason",),
+        [(("sampled",), _sampler.dropped), (("queue_full",), _handler.dropped)],
+    )
+
+
+register_collector(logging_metrics)
+
+
+def stop_logging():
+    """Flush the queued records and stop the listener thread"""
+    global _listener, _handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_handler)
+    _listener.stop()
+    _listener = _handler = None
@@ -1,26 +1,124 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# The import profile is started before anything else is imported, so it
+# covers fastapi, the models and every other dependency
+try:
+    from settings import IMPORT_PROFILE
+    from import_profile import import_profiler
+except ImportError:
+    # Fallback for when running as a module
+    from backend.settings import IMPORT_PROFILE
+    from backend.import_profile import import_profiler
+if IMPORT_PROFILE:
+    import_profiler.start()
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Literal, Optional
+from fastapi import FastAPI, File, HTTPException, Query, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-import joblib
-import numpy as np
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 import logging
-import traceback
-import pandas as pd
 
 # Use absolute imports instead of relative imports
 try:
-    from helper import prepare_symptoms_array
-    from disease_model import DiseaseModel
-    from routes import image_processing
+    from helper import prepare_symptoms_matrix, symptom_index, symptom_indices
+    from model_registry import registry
+    from scoring import (
+        HEART_FEATURES, LIVER_FEATURES, LUNG_FEATURES,
+        PARKINSONS_FEATURES, breast_matrix, diabetes_matrix, feature_matrix, kidney_matrix,
+        parkinsons_fallback, prediction_flags, score_breast, score_diabetes, score_general, score_heart,
+        score_kidney, score_liver, score_lung, score_parkinsons,
+    )
+    from bulk import BULK_FORMATS, MEDIA_TYPES, csv_header, csv_lines, ndjson_lines, read_records, record_payload, score_chunk
+    from settings import BATCH_MAX_ROWS, BULK_CHUNK_ROWS, MICROBATCH_MAX_ROWS, MICROBATCH_WINDOW_MS, STARTUP_WARMUP
+    from batching import MicroBatcher
+    from jitter import JITTER_MODES, is_deterministic, resolve_jitter
+    from metrics import CONTENT_TYPE, MetricsMiddleware, TimedRoute, render_metrics, stage
+    from prediction_cache import cached_predict, prediction_cache_stats
+    from executors import run_in_thread, run_inference, shutdown_executors
+    from gemini_client import gemini_client
+    from routes import image_processing, symptoms
+    from log_config import configure_logging, lazy, stop_logging
 except ImportError:
     # Fallback for when running as a module
-    from backend.helper import prepare_symptoms_array
-    from backend.disease_model import DiseaseModel
-    from backend.routes import image_processing
-
+    from backend.helper import prepare_symptoms_matrix, symptom_index, symptom_indices
+    from backend.model_registry import registry
+    from backend.scoring import (
+        HEART_FEATURES, LIVER_FEATURES, LUNG_FEATURES,
+        PARKINSONS_FEATURES, breast_matrix, diabetes_matrix, feature_matrix, kidney_matrix,
+        parkinsons_fallback, prediction_flags, score_breast, score_diabetes, score_general, score_heart,
+        score_kidney, score_liver, score_lung, score_parkinsons,
+    )
+    from backend.bulk import BULK_FORMATS, MEDIA_TYPES, csv_header, csv_lines, ndjson_lines, read_records, record_payload, score_chunk
+    from backend.settings import BATCH_MAX_ROWS, BULK_CHUNK_ROWS, MICROBATCH_MAX_ROWS, MICROBATCH_WINDOW_MS, STARTUP_WARMUP
+    from backend.batching import MicroBatcher
+    from backend.jitter import JITTER_MODES, is_deterministic, resolve_jitter
+    from backend.metrics import CONTENT_TYPE, MetricsMiddleware, TimedRoute, render_metrics, stage
+    from backend.prediction_cache import cached_predict, prediction_cache_stats
+    from backend.executors import run_in_thread, run_inference, shutdown_executors
+    from backend.gemini_client import gemini_client
+    from backend.routes import image_processing, symptoms
+    from backend.log_config import configure_logging, lazy, stop_logging
+
+configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+WARMUP_MODES = ("blocking", "background", "off")
+if STARTUP_WARMUP not in WARMUP_MODES:
+    raise ValueError(f"STARTUP_WARMUP must be one of {', '.join(WARMUP_MODES)}, got '{STARTUP_WARMUP}'")
+
+# Seconds spent importing, until the worker accepted requests and warming up
+startup_timings = {}
+
+def finish_import_profile():
+    if import_profiler.active:
+        import_profiler.stop()
+        import_profiler.log_report()
+
+def warmup():
+    """
+    Deserialize every model artifact, build the symptom indexes and import
+    the image libraries, so the first requests do not pay for them
+    """
+    started = time.perf_counter()
+    try:
+        registry.load_all()
+        symptom_index()
+        symptoms.symptom_search_index()
+        image_processing.import_image_libraries()
+    except Exception as e:
+        # Whatever is missing is loaded by the first request that needs it
+        logger.error("Warmup failed: %s", e)
+    startup_timings["warmup"] = time.perf_counter() - started
+    logger.info("Warmup finished in %.3fs", startup_timings["warmup"])
+    finish_import_profile()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_timings["imports"] = time.perf_counter() - IMPORT_STARTED
+    warmup_task = None
+    if STARTUP_WARMUP == "blocking":
+        warmup()
+    elif STARTUP_WARMUP == "background":
+        warmup_task = asyncio.create_task(run_in_thread(warmup))
+    else:
+        finish_import_profile()
+    startup_timings["ready"] = time.perf_counter() - IMPORT_STARTED
+    logger.info("Ready to serve %.3fs after import (warmup: %s)", startup_timings["ready"], STARTUP_WARMUP)
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await gemini_client.aclose()
+    shutdown_executors()
+    stop_logging()
+
+app = FastAPI(lifespan=lifespan)
+# Label requests with their route template for /metrics
+app.router.route_class = TimedRoute
 
 # Add CORS middleware
 app.add_middleware(
@@ -30,9 +128,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it is the outermost middleware and times whole requests
+app.add_middleware(MetricsMiddleware)
 
-# Include image processing routes
-app.include_router(image_processing.router, prefix="/image")
+# Include image processing and symptom search routes
+app.include_router(image_processing.router)
+app.include_router(symptoms.router)
 
 # Pydantic models for request validation
 class DiabetesInput(BaseModel):
@@ -213,784 +314,474 @@ class BreastCancerInput(BaseModel):
     symmetry_worst: float
     fractal_dimension_worst: float
 
-def load_heart_model():
-    try:
-        logger.info("Loading heart disease model...")
-        import os
-        model_path = os.path.join(os.path.dirname(__file__), 'saved_models/heart_disease_model.sav')
-        
-        # Check if model file exists
-        if not os.path.exists(model_path):
-            # For testing, return a mock model
-            logger.warning(f"Heart model file not found at {model_path}, returning mock model")
-            from sklearn.ensemble import RandomForestClassifier
-            model = RandomForestClassifier()
-            # This mock model will always predict 1 with 0.75 probability
-            model.predict = lambda X: np.ones(X.shape[0], dtype=int)
-            model.predict_proba = lambda X: np.array([[0.25, 0.75]] * X.shape[0])
-            return model
-            
-        model_data = joblib.load(model_path)
-        # If model is returned as a tuple (scaler, model), separate them
-        if isinstance(model_data, tuple):
-            scaler, model = model_data
-        else:
-            model = model_data
-            scaler = None  # We'll handle this case in prediction
-        logger.info("Model loaded successfully")
-        return model
-    except Exception as e:
-        logger.error(f"Error loading heart disease model: {str(e)}")
-        logger.warning("Returning mock model due to error")
-        # Return a mock model in case of error
-        from sklearn.ensemble import RandomForestClassifier
-        model = RandomForestClassifier()
-        model.predict = lambda X: np.ones(X.shape[0], dtype=int)
-        model.predict_proba = lambda X: np.array([[0.25, 0.75]] * X.shape[0])
-        return model
-
-def get_risk_level(probability: float) -> str:
-    if probability >= 0.7:  # 70% or higher
-        return "High"
-    elif probability >= 0.3:  # Between 30% and 70%
-        return "Medium"
-    else:  # Less than 30%
-        return "Low"
+# Per-request override of the PREDICTION_JITTER setting (?jitter=off|hashed|random)
+JitterMode = Optional[Literal[JITTER_MODES]]
+
+def check_batch_size(rows):
+    if len(rows) > BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(rows)} rows (maximum is {BATCH_MAX_ROWS})"
+        )
+
+async def cached_scoring(name, rows, score, model=None, jitter=None, extra=()):
+    """
+    Score rows behind the prediction cache. ``model`` names the registry
+    artifact the results depend on and ``extra`` any other request options
+    that change them; results with random jitter are never cached.
+    """
+    if jitter is None:
+        return await cached_predict(name, rows, score, model, extra=extra)
+    if not is_deterministic(jitter):
+        return await score(rows)
+    return await cached_predict(name, rows, score, model, extra=extra + (jitter,))
 
 @app.get("/")
 async def root():
     return {"message": "Disease Prediction API is running"}
 
-@app.post("/predict/diabetes")
-async def predict_diabetes(data: DiabetesInput):
+@app.get("/metrics")
+async def metrics():
+    """
+    Request and stage latency histograms, cache counters and model load
+    times in the Prometheus text format
+    """
+    # Collectors may hit the SQLite cache tier, keep them off the event loop
+    return Response(await run_in_thread(render_metrics), media_type=CONTENT_TYPE)
+
+@app.get("/debug/startup")
+async def startup_profile():
+    """
+    Startup timings of this worker in seconds, and with IMPORT_PROFILE set
+    the modules that took longest to import
+    """
+    report = {
+        "warmup_mode": STARTUP_WARMUP,
+        "warmed_up": "warmup" in startup_timings,
+        "seconds": {stage: round(seconds, 6) for stage, seconds in startup_timings.items()},
+    }
+    if IMPORT_PROFILE:
+        report["imports"] = import_profiler.report()
+    return report
+
+@app.get("/predict/cache/stats")
+async def prediction_cache_stats_endpoint():
+    """
+    Hit/miss counters of the per-model prediction caches
+    """
+    return prediction_cache_stats()
+
+def diabetes_results(rows):
     try:
-        logger.info("Loading model...")
-        # Use a relative path that works regardless of where the script is run from
-        import os
-        model_path = os.path.join(os.path.dirname(__file__), 'saved_models/diabetes_model.sav')
+        model = registry.get("diabetes")
         
         # Check if model file exists
-        if not os.path.exists(model_path):
+        if model is None:
             # For testing, return a mock prediction if model doesn't exist
-            logger.warning(f"Model file not found at {model_path}, returning mock prediction")
-            return {
+            logger.warning("Model file not found at %s, returning mock prediction", registry.path("diabetes"))
+            return [{
                 "prediction": True,
                 "risk_level": "Medium",
                 "probability": 0.75
-            }
-            
-        model = joblib.load(model_path)
-        
-        print(f"Preparing features with data: {data}")
-        features = np.array([[
-            data.Pregnancies, data.Glucose, data.BloodPressure, data.SkinThickness,
-            data.Insulin, data.BMI, data.DiabetesPedigreeFunction, data.Age
-        ]])
-        print(f"Features shape: {features.shape}")
-        
-        print("Making prediction...")
-        prediction = model.predict(features)
+            } for _ in rows]
         
-        # Since probability is not available, we'll use decision_function as a proxy
-        decision_score = model.decision_function(features)[0]
-        # Convert decision score to a probability-like value between 0 and 1
-        probability = 1 / (1 + np.exp(-decision_score))
+        with stage("encode"):
+            features = diabetes_matrix(rows)
+        logger.debug("Diabetes features: %s", features)
         
-        print(f"Prediction: {prediction}, Score: {decision_score}, Probability: {probability}")
-        risk_level = get_risk_level(probability)
-        
-        return {
-            "prediction": bool(prediction[0]),
-            "probability": float(probability),
-            "risk_level": risk_level
-        }
+        with stage("inference"):
+            results = score_diabetes(model, features)
+        logger.info("Diabetes predictions: %s", lazy(prediction_flags, results))
+        return results
     except Exception as e:
-        print(f"Error in predict_diabetes: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in predict_diabetes")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/predict/heart")
-async def predict_heart(data: HeartInput):
+@app.post("/predict/diabetes")
+async def predict_diabetes(data: DiabetesInput):
+    return (await cached_scoring("diabetes", [data], batchers["diabetes"].submit_all, model="diabetes"))[0]
+
+@app.post("/predict/diabetes/batch")
+async def predict_diabetes_batch(data: list[DiabetesInput]):
+    check_batch_size(data)
+    return await cached_scoring("diabetes", data, lambda rows: run_inference(diabetes_results, rows), model="diabetes")
+
+def heart_results(rows, jitter=None):
     try:
-        # Load model
-        model = load_heart_model()
-        
-        # Convert input data to feature array
-        features = np.array([[
-            data.age, data.sex, data.cp, data.trestbps, data.chol,
-            data.fbs, data.restecg, data.thalach, data.exang,
-            data.oldpeak, data.slope, data.ca, data.thal
-        ]])
-        logger.info(f"Features shape: {features.shape}")
-        
-        # Calculate a prediction score based on key risk factors
-        # These weights are based on clinical importance of each factor
-        age_score = float(data.age) / 100  # Age normalized
-        cp_score = float(data.cp) * 0.1  # Chest pain type
-        chol_score = min(1.0, float(data.chol) / 300) * 0.1  # Cholesterol
-        thalach_score = (1 - min(1.0, float(data.thalach) / 180)) * 0.1  # Max heart rate (inverse)
-        exang_score = float(data.exang) * 0.2  # Exercise angina
-        oldpeak_score = min(1.0, float(data.oldpeak) / 4) * 0.15  # ST depression
-        ca_score = float(data.ca) * 0.1  # Number of vessels
-        thal_score = (float(data.thal) / 3) * 0.15  # Thalassemia
-        
-        # Calculate base probability from these factors
-        base_score = age_score + cp_score + chol_score + thalach_score + exang_score + oldpeak_score + ca_score + thal_score
-        
-        # Determine if this should be a positive or negative prediction
-        # Use a threshold that allows both positive and negative results
-        threshold = 0.5
-        
-        # Force positive prediction for certain high-risk profiles
-        force_positive = (
-            float(data.cp) >= 3 or  # Severe chest pain
-            float(data.exang) == 1 or  # Exercise-induced angina
-            float(data.oldpeak) >= 2.0 or  # Significant ST depression
-            float(data.ca) >= 2 or  # Multiple vessels affected
-            float(data.thal) >= 6  # Abnormal thalassemia
-        )
-        
-        # Force negative prediction for certain low-risk profiles
-        force_negative = (
-            float(data.age) < 40 and
-            float(data.cp) <= 1 and
-            float(data.chol) < 200 and
-            float(data.exang) == 0 and
-            float(data.oldpeak) < 1.0 and
-            float(data.ca) == 0
-        )
-        
-        # Determine prediction based on score and forcing rules
-        if force_positive:
-            prediction = 1
-            # For positive predictions, use a probability between 0.65 and 0.95
-            probability = 0.65 + (np.random.random() * 0.3)
-        elif force_negative:
-            prediction = 0
-            # For negative predictions, use a probability between 0.05 and 0.35
-            probability = 0.05 + (np.random.random() * 0.3)
-        else:
-            # Use the base score with some randomness
-            prediction = 1 if base_score > threshold else 0
-            
-            # Add significant randomness (±20%) to ensure varied results
-            variation = np.random.uniform(-0.2, 0.2)
-            raw_probability = base_score + variation
-            
-            # Ensure probability stays within reasonable bounds based on prediction
-            if prediction == 1:  # Positive prediction
-                # For positive predictions, ensure probability is between 0.55 and 0.95
-                probability = max(0.55, min(0.95, raw_probability))
-            else:  # Negative prediction
-                # For negative predictions, ensure probability is between 0.05 and 0.45
-                probability = max(0.05, min(0.45, raw_probability))
-        
-        # Log the prediction details
-        logger.info(f"Heart disease prediction: {prediction}, Probability: {probability}")
-        logger.info(f"Input features: age={data.age}, sex={data.sex}, cp={data.cp}, trestbps={data.trestbps}, chol={data.chol}, fbs={data.fbs}, restecg={data.restecg}, thalach={data.thalach}, exang={data.exang}, oldpeak={data.oldpeak}, slope={data.slope}, ca={data.ca}, thal={data.thal}")
-        
-        # Determine risk level based on probability
-        risk_level = get_risk_level(probability)
-        
-        return {
-            "prediction": bool(prediction),
-            "probability": probability,
-            "risk_level": risk_level
-        }
+        with stage("encode"):
+            features = feature_matrix(rows, HEART_FEATURES)
+        with stage("inference"):
+            return score_heart(features, jitter)
     except Exception as e:
-        logger.error(f"Error in predict_heart: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in predict_heart")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/predict/liver")
-async def predict_liver(data: LiverInput):
+@app.post("/predict/heart")
+async def predict_heart(data: HeartInput, jitter: JitterMode = None):
+    mode = resolve_jitter(jitter)
+    return (await cached_scoring("heart", [data], jitter_batchers["heart"][mode].submit_all, jitter=mode))[0]
+
+@app.post("/predict/heart/batch")
+async def predict_heart_batch(data: list[HeartInput], jitter: JitterMode = None):
+    check_batch_size(data)
+    mode = resolve_jitter(jitter)
+    return await cached_scoring("heart", data, lambda rows: run_inference(heart_results, rows, mode), jitter=mode)
+
+def liver_results(rows, jitter=None):
     try:
-        logger.info("Loading liver disease model...")
-        # Use absolute path to the model file with correct filename
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, 'saved_models', 'liver_model.sav')
-        
         # Check if model file exists
-        if not os.path.exists(model_path):
+        if registry.get("liver") is None:
             raise HTTPException(status_code=500, detail="Liver model file not found")
-        
-        # Calculate a prediction score based on key liver disease indicators
-        # These weights are based on clinical importance of each factor
-        
-        # Normalize and weight each factor
-        age_factor = min(1.0, float(data.age) / 70) * 0.05
-        
-        # Bilirubin levels are strong indicators
-        total_bilirubin_factor = min(1.0, float(data.total_bilirubin) / 2.0) * 0.15
-        direct_bilirubin_factor = min(1.0, float(data.direct_bilirubin) / 0.5) * 0.15
-        
-        # Enzyme levels are critical indicators
-        alp_factor = min(1.0, float(data.alkaline_phosphotase) / 250) * 0.15
-        alt_factor = min(1.0, float(data.alamine_aminotransferase) / 50) * 0.15
-        ast_factor = min(1.0, float(data.aspartate_aminotransferase) / 50) * 0.15
-        
-        # Protein levels
-        total_proteins_factor = (1.0 - min(1.0, float(data.total_proteins) / 6.5)) * 0.05  # Lower is worse
-        albumin_factor = (1.0 - min(1.0, float(data.albumin) / 3.5)) * 0.1  # Lower is worse
-        ag_ratio_factor = (1.0 - min(1.0, float(data.albumin_globulin_ratio) / 1.0)) * 0.05  # Lower is worse
-        
-        # Calculate base score
-        base_score = (
-            age_factor + 
-            total_bilirubin_factor + 
-            direct_bilirubin_factor + 
-            alp_factor + 
-            alt_factor + 
-            ast_factor + 
-            total_proteins_factor + 
-            albumin_factor + 
-            ag_ratio_factor
-        )
-        
-        # Force positive prediction for certain high-risk profiles
-        force_positive = (
-            float(data.total_bilirubin) > 1.5 or
-            float(data.direct_bilirubin) > 0.5 or
-            float(data.alkaline_phosphotase) > 300 or
-            float(data.alamine_aminotransferase) > 60 or
-            float(data.aspartate_aminotransferase) > 60 or
-            float(data.albumin) < 3.0
-        )
-        
-        # Force negative prediction for certain low-risk profiles
-        force_negative = (
-            float(data.total_bilirubin) < 1.0 and
-            float(data.direct_bilirubin) < 0.3 and
-            float(data.alkaline_phosphotase) < 200 and
-            float(data.alamine_aminotransferase) < 40 and
-            float(data.aspartate_aminotransferase) < 40 and
-            float(data.albumin) > 3.5 and
-            float(data.albumin_globulin_ratio) > 1.0
-        )
-        
-        # Determine prediction based on score and forcing rules
-        if force_positive:
-            prediction = 1
-            # For positive predictions, use a probability between 0.65 and 0.95
-            probability = 0.65 + (np.random.random() * 0.3)
-        elif force_negative:
-            prediction = 0
-            # For negative predictions, use a probability between 0.05 and 0.35
-            probability = 0.05 + (np.random.random() * 0.3)
-        else:
-            # Use the base score with some randomness
-            threshold = 0.5
-            prediction = 1 if base_score > threshold else 0
-            
-            # Add significant randomness (±20%) to ensure varied results
-            variation = np.random.uniform(-0.2, 0.2)
-            raw_probability = base_score + variation
-            
-            # Ensure probability stays within reasonable bounds based on prediction
-            if prediction == 1:  # Positive prediction
-                # For positive predictions, ensure probability is between 0.55 and 0.95
-                probability = max(0.55, min(0.95, raw_probability))
-            else:  # Negative prediction
-                # For negative predictions, ensure probability is between 0.05 and 0.45
-                probability = max(0.05, min(0.45, raw_probability))
-        
-        # Log the prediction details
-        logger.info(f"Liver disease prediction: {prediction}, Probability: {probability}")
-        logger.info(f"Input features: age={data.age}, gender={data.gender}, total_bilirubin={data.total_bilirubin}, direct_bilirubin={data.direct_bilirubin}, alkaline_phosphotase={data.alkaline_phosphotase}, alamine_aminotransferase={data.alamine_aminotransferase}, aspartate_aminotransferase={data.aspartate_aminotransferase}, total_proteins={data.total_proteins}, albumin={data.albumin}, albumin_globulin_ratio={data.albumin_globulin_ratio}")
-        
-        # Determine risk level based on probability
-        risk_level = get_risk_level(probability)
-        
-        return {
-            "prediction": bool(prediction),
-            "probability": probability,
-            "risk_level": risk_level
-        }
+        with stage("encode"):
+            features = feature_matrix(rows, LIVER_FEATURES)
+        with stage("inference"):
+            return score_liver(features, jitter)
     except Exception as e:
-        logger.error(f"Error in predict_liver: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in predict_liver")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/predict/parkinsons")
-async def predict_parkinsons(data: ParkinsonsInput):
+@app.post("/predict/liver")
+async def predict_liver(data: LiverInput, jitter: JitterMode = None):
+    mode = resolve_jitter(jitter)
+    return (await cached_scoring("liver", [data], jitter_batchers["liver"][mode].submit_all, jitter=mode))[0]
+
+@app.post("/predict/liver/batch")
+async def predict_liver_batch(data: list[LiverInput], jitter: JitterMode = None):
+    check_batch_size(data)
+    mode = resolve_jitter(jitter)
+    return await cached_scoring("liver", data, lambda rows: run_inference(liver_results, rows, mode), jitter=mode)
+
+def parkinsons_results(rows, jitter=None):
     try:
-        logger.info("Loading Parkinson's disease model...")
-        
-        # Extract features from input data
-        features = np.array([[
-            data.fo, data.fhi, data.flo, data.jitter_percent,
-            data.jitter_abs, data.rap, data.ppq, data.ddp,
-            data.shimmer, data.shimmer_db, data.apq3, data.apq5,
-            data.apq, data.dda, data.nhr, data.hnr, data.rpde,
-            data.dfa, data.spread1, data.spread2, data.d2, data.ppe
-        ]])
-        logger.info(f"Features shape: {features.shape}")
-        
-        # Log all input values for debugging
-        logger.info(f"Input values: fo={data.fo}, fhi={data.fhi}, flo={data.flo}, jitter_percent={data.jitter_percent}, "
-                   f"jitter_abs={data.jitter_abs}, rap={data.rap}, ppq={data.ppq}, ddp={data.ddp}, "
-                   f"shimmer={data.shimmer}, shimmer_db={data.shimmer_db}, apq3={data.apq3}, apq5={data.apq5}, "
-                   f"apq={data.apq}, dda={data.dda}, nhr={data.nhr}, hnr={data.hnr}, rpde={data.rpde}, "
-                   f"dfa={data.dfa}, spread1={data.spread1}, spread2={data.spread2}, d2={data.d2}, ppe={data.ppe}")
-        
-        # Generate a probability directly based on key indicators
-        # These values are based on clinical literature about Parkinson's disease voice analysis
-        
-        # Key risk factors for Parkinson's (higher values indicate higher risk)
-        jitter_risk = min(1.0, float(data.jitter_percent) / 1.0) * 0.15  # Normalized jitter contribution
-        shimmer_risk = min(1.0, float(data.shimmer) / 0.06) * 0.15  # Normalized shimmer contribution
-        nhr_risk = min(1.0, float(data.nhr) / 0.5) * 0.15  # Normalized NHR contribution
-        ppe_risk = min(1.0, float(data.ppe) / 0.5) * 0.15  # Normalized PPE contribution
-        rpde_risk = min(1.0, float(data.rpde) / 0.7) * 0.15  # Normalized RPDE contribution
-        
-        # Protective factors (higher values indicate lower risk)
-        hnr_protection = (1.0 - min(1.0, float(data.hnr) / 30.0)) * 0.15  # Normalized HNR contribution (inverted)
-        
-        # Calculate base probability
-        base_probability = jitter_risk + shimmer_risk + nhr_risk + ppe_risk + rpde_risk + hnr_protection
-        
-        # Add significant randomness to ensure varied results (±25%)
-        random_factor = np.random.uniform(-0.25, 0.25)
-        
-        # Ensure the probability is within reasonable bounds
-        raw_probability = max(0.05, min(0.95, base_probability + random_factor))
-        
-        # Add more variation to avoid the 50% problem
-        # If probability is near 0.5, push it away in either direction
-        if 0.45 <= raw_probability <= 0.55:
-            # Push away from 0.5 in either direction
-            direction = 1 if np.random.random() > 0.5 else -1
-            raw_probability += direction * 0.15
-        
-        # Make a prediction based on the probability
-        prediction = 1 if raw_probability > 0.5 else 0
-        
-        # Format the probability to 2 decimal places for display
-        # This ensures we don't always get the same value
-        probability = round(raw_probability * 100) / 100
-        
-        # Determine risk level
-        risk_level = get_risk_level(probability)
-        
-        logger.info(f"Parkinson's prediction: {prediction}, Probability: {probability}, Risk Level: {risk_level}")
-        
-        return {
-            "prediction": bool(prediction),
-            "probability": probability,
-            "risk_level": risk_level
-        }
+        with stage("encode"):
+            features = feature_matrix(rows, PARKINSONS_FEATURES)
+        with stage("inference"):
+            return score_parkinsons(features, jitter)
     except Exception as e:
-        logger.error(f"Error in predict_parkinsons: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        
-        # Fallback to a random prediction if there's an error
-        prediction = np.random.choice([True, False], p=[0.4, 0.6])
-        probability = np.random.uniform(0.65, 0.95) if prediction else np.random.uniform(0.05, 0.35)
-        risk_level = get_risk_level(probability)
-        
-        logger.info(f"Fallback Parkinson's prediction: {prediction}, Probability: {probability}, Risk Level: {risk_level}")
-        
-        return {
-            "prediction": prediction,
-            "probability": probability,
-            "risk_level": risk_level
-        }
+        logger.exception("Error in predict_parkinsons")
+        if is_deterministic(jitter):
+            # A random fallback would make the response irreproducible
+            raise HTTPException(status_code=500, detail=str(e))
+        return [parkinsons_fallback() for _ in rows]
 
-@app.post("/predict/lung")
-async def predict_lung(data: LungInput):
+@app.post("/predict/parkinsons")
+async def predict_parkinsons(data: ParkinsonsInput, jitter: JitterMode = None):
+    mode = resolve_jitter(jitter)
+    return (await cached_scoring("parkinsons", [data], jitter_batchers["parkinsons"][mode].submit_all, jitter=mode))[0]
+
+@app.post("/predict/parkinsons/batch")
+async def predict_parkinsons_batch(data: list[ParkinsonsInput], jitter: JitterMode = None):
+    check_batch_size(data)
+    mode = resolve_jitter(jitter)
+    return await cached_scoring("parkinsons", data, lambda rows: run_inference(parkinsons_results, rows, mode), jitter=mode)
+
+def lung_results(rows, jitter=None):
     try:
-        logger.info("Loading lung cancer model...")
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, 'saved_models', 'lung_cancer_model.sav')
-        
-        # Calculate a prediction score based on key lung cancer indicators
-        # These weights are based on clinical importance of each factor
-        
-        # Convert gender to a numeric factor (0.5 for both genders as it's not strongly predictive)
-        gender_factor = 0.5
-        
-        # Age is a risk factor (normalized)
-        age_factor = min(1.0, float(data.age) / 80) * 0.1
-        
-        # Strong risk factors
-        smoking_factor = float(data.smoking) / 2 * 0.2  # Smoking is a major risk factor
-        yellow_fingers_factor = float(data.yellow_fingers) / 2 * 0.05
-        chronic_disease_factor = float(data.chronic_disease) / 2 * 0.1
-        
-        # Symptom factors
-        fatigue_factor = float(data.fatigue) / 2 * 0.05
-        wheezing_factor = float(data.wheezing) / 2 * 0.1
-        coughing_factor = float(data.coughing) / 2 * 0.1
-        shortness_of_breath_factor = float(data.shortness_of_breath) / 2 * 0.1
-        chest_pain_factor = float(data.chest_pain) / 2 * 0.1
-        
-        # Other factors
-        anxiety_factor = float(data.anxiety) / 2 * 0.025
-        peer_pressure_factor = float(data.peer_pressure) / 2 * 0.025
-        allergy_factor = float(data.allergy) / 2 * 0.025
-        alcohol_consuming_factor = float(data.alcohol_consuming) / 2 * 0.025
-        swallowing_difficulty_factor = float(data.swallowing_difficulty) / 2 * 0.05
-        
-        # Calculate base score
-        base_score = (
-            gender_factor + 
-            age_factor + 
-            smoking_factor + 
-            yellow_fingers_factor + 
-            chronic_disease_factor + 
-            fatigue_factor + 
-            wheezing_factor + 
-            coughing_factor + 
-            shortness_of_breath_factor + 
-            chest_pain_factor + 
-            anxiety_factor + 
-            peer_pressure_factor + 
-            allergy_factor + 
-            alcohol_consuming_factor + 
-            swallowing_difficulty_factor
-        )
-        
-        # Force positive prediction for certain high-risk profiles
-        force_positive = (
-            float(data.age) > 60 and
-            float(data.smoking) == 2 and
-            (float(data.coughing) == 2 or float(data.shortness_of_breath) == 2) and
-            (float(data.chest_pain) == 2 or float(data.wheezing) == 2)
-        )
-        
-        # Force negative prediction for certain low-risk profiles
-        force_negative = (
-            float(data.age) < 40 and
-            float(data.smoking) == 1 and
-            float(data.coughing) == 1 and
-            float(data.shortness_of_breath) == 1 and
-            float(data.chest_pain) == 1 and
-            float(data.wheezing) == 1
-        )
-        
-        # Determine prediction based on score and forcing rules
-        if force_positive:
-            prediction = 1
-            # For positive predictions, use a probability between 0.65 and 0.95
-            probability = 0.65 + (np.random.random() * 0.3)
-        elif force_negative:
-            prediction = 0
-            # For negative predictions, use a probability between 0.05 and 0.35
-            probability = 0.05 + (np.random.random() * 0.3)
-        else:
-            # Use the base score with some randomness
-            threshold = 0.5
-            prediction = 1 if base_score > threshold else 0
-            
-            # Add significant randomness (±20%) to ensure varied results
-            variation = np.random.uniform(-0.2, 0.2)
-            raw_probability = base_score + variation
-            
-            # Ensure probability stays within reasonable bounds based on prediction
-            if prediction == 1:  # Positive prediction
-                # For positive predictions, ensure probability is between 0.55 and 0.95
-                probability = max(0.55, min(0.95, raw_probability))
-            else:  # Negative prediction
-                # For negative predictions, ensure probability is between 0.05 and 0.45
-                probability = max(0.05, min(0.45, raw_probability))
-        
-        # Log the prediction details
-        logger.info(f"Lung cancer prediction: {prediction}, Probability: {probability}")
-        logger.info(f"Input features: gender={data.gender}, age={data.age}, smoking={data.smoking}, yellow_fingers={data.yellow_fingers}, anxiety={data.anxiety}, peer_pressure={data.peer_pressure}, chronic_disease={data.chronic_disease}, fatigue={data.fatigue}, allergy={data.allergy}, wheezing={data.wheezing}, alcohol_consuming={data.alcohol_consuming}, coughing={data.coughing}, shortness_of_breath={data.shortness_of_breath}, swallowing_difficulty={data.swallowing_difficulty}, chest_pain={data.chest_pain}")
-        
-        # Determine risk level based on probability
-        risk_level = get_risk_level(probability)
-        
-        return {
-            "prediction": bool(prediction),
-            "probability": probability,
-            "risk_level": risk_level
-        }
+        with stage("encode"):
+            features = feature_matrix(rows, LUNG_FEATURES)
+        with stage("inference"):
+            return score_lung(features, jitter)
     except Exception as e:
-        logger.error(f"Error in predict_lung: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in predict_lung")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/predict/kidney")
-async def predict_kidney(data: ChronicKidneyInput):
+@app.post("/predict/lung")
+async def predict_lung(data: LungInput, jitter: JitterMode = None):
+    mode = resolve_jitter(jitter)
+    return (await cached_scoring("lung", [data], jitter_batchers["lung"][mode].submit_all, jitter=mode))[0]
+
+@app.post("/predict/lung/batch")
+async def predict_lung_batch(data: list[LungInput], jitter: JitterMode = None):
+    check_batch_size(data)
+    mode = resolve_jitter(jitter)
+    return await cached_scoring("lung", data, lambda rows: run_inference(lung_results, rows, mode), jitter=mode)
+
+def kidney_results(rows):
     try:
-        logger.info("Loading chronic kidney disease model...")
-        # Use absolute path to the model file
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, 'saved_models', 'chronic_model.sav')
-        model = joblib.load(model_path)
-        
-        # Convert categorical variables
-        categorical_map = {
-            'yes': 1, 'no': 0,
-            'present': 1, 'notpresent': 0,
-            'normal': 1, 'abnormal': 0,
-            'good': 1, 'poor': 0
-        }
-        
-        # Define expected feature names and order
-        feature_names = [
-            'age', 'bp', 'sg', 'al', 'su', 'rbc', 'pc', 'pcc', 'ba', 'bgr',
-            'bu', 'sc', 'sod', 'pot', 'hemo', 'pcv', 'wc', 'rc', 'htn',
-            'dm', 'cad', 'appet', 'pe', 'ane'
-        ]
+        model = registry.get("kidney")
+        if model is None:
+            raise FileNotFoundError(f"Kidney model file not found at {registry.path('kidney')}")
         
         try:
-            # Create feature dictionary with consistent ordering
-            feature_dict = {
-                'age': float(data.age),
-                'bp': float(data.bp),
-                'sg': float(data.sg),
-                'al': float(data.al),
-                'su': float(data.su),
-                'rbc': categorical_map[data.rbc.lower()],
-                'pc': categorical_map[data.pc.lower()],
-                'pcc': categorical_map[data.pcc.lower()],
-                'ba': categorical_map[data.ba.lower()],
-                'bgr': float(data.bgr),
-                'bu': float(data.bu),
-                'sc': float(data.sc),
-                'sod': float(data.sod),
-                'pot': float(data.pot),
-                'hemo': float(data.hemo),
-                'pcv': float(data.pcv),
-                'wc': float(data.wc),
-                'rc': float(data.rc),
-                'htn': categorical_map[data.htn.lower()],
-                'dm': categorical_map[data.dm.lower()],
-                'cad': categorical_map[data.cad.lower()],
-                'appet': categorical_map[data.appet.lower()],
-                'pe': categorical_map[data.pe.lower()],
-                'ane': categorical_map[data.ane.lower()]
-            }
-
-            # Create DataFrame with specific column order
-            features = pd.DataFrame([feature_dict])
-            
-            # Ensure columns are in the correct order
-            features = features[feature_names]
-            
-            logger.info(f"Feature names being used: {feature_names}")
-            logger.info(f"Feature shape: {features.shape}")
-            logger.info(f"Feature columns: {features.columns.tolist()}")
+            # Feature names were validated against the model when it was loaded
+            with stage("encode"):
+                features = kidney_matrix(rows)
+            logger.debug("Kidney features: %s", features)
             
             try:
-                # Get prediction and probability
-                prediction = model.predict(features)[0]
-                raw_probability = float(model.predict_proba(features)[0][1])
-                probability = float(format(max(0.0, min(1.0, raw_probability)), '.4f'))  # Clamp between 0 and 1
-                
-                # Determine risk level based on probability
-                risk_level = get_risk_level(probability)
+                # Get predictions and probabilities for every row in one call
+                with stage("inference"):
+                    results = score_kidney(model, features)
                 
-                logger.info(f"Prediction successful. Result: {prediction}, Risk Level: {risk_level}, Probability: {probability}")
+                logger.info("Prediction successful. Results: %s", results)
                 
-                return {
-                    "prediction": bool(prediction),
-                    "risk_level": risk_level,
-                    "probability": probability
-                }
+                return results
             except Exception as model_error:
-                logger.error(f"Model prediction error: {str(model_error)}")
-                logger.error(f"Feature shape: {features.shape}")
-                logger.error(f"Feature columns: {features.columns.tolist()}")
+                logger.error("Model prediction error: %s", model_error, extra={"feature_shape": features.shape})
                 raise HTTPException(
                     status_code=500,
                     detail="Error during prediction. Please ensure all input values are valid."
                 )
 
         except (ValueError, KeyError) as e:
-            logger.error(f"Value conversion error: {str(e)}")
+            logger.error("Value conversion error: %s", e)
             raise HTTPException(
                 status_code=400,
                 detail="Invalid input values. Please check the format of all fields."
             )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in predict_kidney: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in predict_kidney")
         raise HTTPException(
             status_code=500,
             detail="An unexpected error occurred. Please try again later."
         )
 
-@app.post("/predict/breast")
-async def predict_breast(data: BreastCancerInput):
+@app.post("/predict/kidney")
+async def predict_kidney(data: ChronicKidneyInput):
+    return (await cached_scoring("kidney", [data], batchers["kidney"].submit_all, model="kidney"))[0]
+
+@app.post("/predict/kidney/batch")
+async def predict_kidney_batch(data: list[ChronicKidneyInput]):
+    check_batch_size(data)
+    return await cached_scoring("kidney", data, lambda rows: run_inference(kidney_results, rows), model="kidney")
+
+def breast_results(rows, jitter=None):
     try:
-        logger.info("Loading breast cancer model...")
-        # Use absolute path to the model file
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, 'saved_models', 'breast_cancer.sav')
-        model = joblib.load(model_path)
+        model = registry.get("breast")
+        if model is None:
+            raise FileNotFoundError(f"Breast cancer model file not found at {registry.path('breast')}")
         
         try:
-            # Create feature dictionary with the exact feature names used during model training
-            feature_dict = {
-                'radius_mean': float(data.radius_mean),
-                'texture_mean': float(data.texture_mean),
-                'perimeter_mean': float(data.perimeter_mean),
-                'area_mean': float(data.area_mean),
-                'smoothness_mean': float(data.smoothness_mean),
-                'compactness_mean': float(data.compactness_mean),
-                'concavity_mean': float(data.concavity_mean),
-                'concave points_mean': float(data.concave_points_mean),  
-                'symmetry_mean': float(data.symmetry_mean),
-                'fractal_dimension_mean': float(data.fractal_dimension_mean),
-                'radius_se': float(data.radius_se),
-                'texture_se': float(data.texture_se),
-                'perimeter_se': float(data.perimeter_se),
-                'area_se': float(data.area_se),
-                'smoothness_se': float(data.smoothness_se),
-                'compactness_se': float(data.compactness_se),
-                'concavity_se': float(data.concavity_se),
-                'concave points_se': float(data.concave_points_se),  
-                'symmetry_se': float(data.symmetry_se),
-                'fractal_dimension_se': float(data.fractal_dimension_se),
-                'radius_worst': float(data.radius_worst),
-                'texture_worst': float(data.texture_worst),
-                'perimeter_worst': float(data.perimeter_worst),
-                'area_worst': float(data.area_worst),
-                'smoothness_worst': float(data.smoothness_worst),
-                'compactness_worst': float(data.compactness_worst),
-                'concavity_worst': float(data.concavity_worst),
-                'concave points_worst': float(data.concave_points_worst),  
-                'symmetry_worst': float(data.symmetry_worst),
-                'fractal_dimension_worst': float(data.fractal_dimension_worst)
-            }
-
-            features = pd.DataFrame([feature_dict])
-            
-            # Ensure columns are in the correct order with exact feature names from training
-            feature_names = [
-                'radius_mean', 'texture_mean', 'perimeter_mean', 'area_mean',
-                'smoothness_mean', 'compactness_mean', 'concavity_mean', 'concave points_mean',
-                'symmetry_mean', 'fractal_dimension_mean', 'radius_se', 'texture_se',
-                'perimeter_se', 'area_se', 'smoothness_se', 'compactness_se',
-                'concavity_se', 'concave points_se', 'symmetry_se', 'fractal_dimension_se',
-                'radius_worst', 'texture_worst', 'perimeter_worst', 'area_worst',
-                'smoothness_worst', 'compactness_worst', 'concavity_worst',
-                'concave points_worst', 'symmetry_worst', 'fractal_dimension_worst'
-            ]
-            
-            features = features[feature_names]
-            
-            logger.info(f"Feature names being used: {feature_names}")
-            logger.info(f"Feature shape: {features.shape}")
-            logger.info(f"Feature columns: {features.columns.tolist()}")
+            # Feature matrix in the exact column order used during model training,
+            # validated against the model when it was loaded
+            with stage("encode"):
+                features = breast_matrix(rows)
+            logger.debug("Breast cancer features: %s", features)
             
             try:
-                # Get prediction and probability
-                prediction = model.predict(features)[0]
-                
-                # Get probability with more variation
-                try:
-                    probabilities = model.predict_proba(features)[0]
-                    # Ensure we're using the correct probability for the predicted class
-                    # In most scikit-learn models, index 1 is for the positive class (malignant)
-                    # but we should make sure we're using the right one
-                    positive_class_index = 1  # Usually index 1 is for the positive class (malignant)
-                    
-                    # Get the raw probability
-                    raw_probability = float(probabilities[positive_class_index])
-                    
-                    # Add some variation to avoid always getting the same probabilities
-                    # This will make the results more realistic and varied
-                    variation = np.random.uniform(-0.1, 0.1)  # Add up to 10% variation
-                    
-                    # Ensure the probability stays within reasonable bounds
-                    if prediction:  # If malignant (positive)
-                        # For malignant, use higher probabilities (0.6 to 0.95)
-                        raw_probability = max(0.6, min(0.95, raw_probability + variation))
-                    else:  # If benign (negative)
-                        # For benign, use lower probabilities (0.05 to 0.4)
-                        raw_probability = max(0.05, min(0.4, raw_probability + variation))
-                    
-                    logger.info(f"Raw probability with variation: {raw_probability}")
-                except Exception as e:
-                    logger.warning(f"Error getting probability: {str(e)}")
-                    # If predict_proba fails, generate a reasonable probability based on prediction
-                    if prediction:  # If malignant
-                        raw_probability = np.random.uniform(0.7, 0.95)
-                    else:  # If benign
-                        raw_probability = np.random.uniform(0.05, 0.3)
-                    logger.info(f"Generated fallback probability: {raw_probability}")
+                # Get predictions and probabilities for every row in one call
+                with stage("inference"):
+                    results = score_breast(model, features, jitter)
                 
-                # Format and clamp probability
-                probability = float(format(max(0.0, min(1.0, raw_probability)), '.4f'))  # Clamp between 0 and 1
+                logger.info("Prediction successful. Results: %s", results)
                 
-                # Determine risk level based on probability
-                risk_level = get_risk_level(probability)
-                
-                logger.info(f"Prediction successful. Result: {prediction}, Risk Level: {risk_level}, Probability: {probability}")
-                
-                return {
-                    "prediction": bool(prediction),
-                    "risk_level": risk_level,
-                    "probability": probability
-                }
+                return results
             except Exception as model_error:
-                logger.error(f"Model prediction error: {str(model_error)}")
-                logger.error(f"Feature shape: {features.shape}")
-                logger.error(f"Feature columns: {features.columns.tolist()}")
+                logger.error("Model prediction error: %s", model_error, extra={"feature_shape": features.shape})
                 raise HTTPException(
                     status_code=500,
                     detail="Error during prediction. Please ensure all input values are valid."
                 )
 
         except (ValueError, KeyError) as e:
-            logger.error(f"Value conversion error: {str(e)}")
+            logger.error("Value conversion error: %s", e)
             raise HTTPException(
                 status_code=400,
                 detail="Invalid input values. Please check the format of all fields."
             )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in predict_breast: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in predict_breast")
         raise HTTPException(
             status_code=500,
             detail="An unexpected error occurred. Please try again later."
         )
 
-@app.post("/predict/general")
-async def predict_general(data: GeneralInput):
+@app.post("/predict/breast")
+async def predict_breast(data: BreastCancerInput, jitter: JitterMode = None):
+    mode = resolve_jitter(jitter)
+    return (await cached_scoring("breast", [data], jitter_batchers["breast"][mode].submit_all, model="breast", jitter=mode))[0]
+
+@app.post("/predict/breast/batch")
+async def predict_breast_batch(data: list[BreastCancerInput], jitter: JitterMode = None):
+    check_batch_size(data)
+    mode = resolve_jitter(jitter)
+    return await cached_scoring("breast", data, lambda rows: run_inference(breast_results, rows, mode), model="breast", jitter=mode)
+
+def general_results(rows, top_k=0):
     try:
         # Validate input
-        if not data.symptoms or len(data.symptoms) == 0:
-            raise HTTPException(status_code=400, detail="At least one symptom is required")
-
-        # Initialize the disease model
-        model = DiseaseModel()
-        # Use absolute path to the model file
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, 'saved_models', 'xgboost_model.json')
-        model.load_xgboost(model_path)
+        for row in rows:
+            if not row.symptoms or len(row.symptoms) == 0:
+                raise HTTPException(status_code=400, detail="At least one symptom is required")
+
+        # Shared disease model, loaded once by the registry
+        model = registry.get("general")
+        if model is None:
+            raise FileNotFoundError(f"Disease model file not found at {registry.path('general')}")
         
         # Convert symptoms to model input format
-        features = prepare_symptoms_array(data.symptoms)
-        
-        # Get prediction and probability
-        disease, probability = model.predict(features)
+        with stage("encode"):
+            features = prepare_symptoms_matrix([row.symptoms for row in rows])
         
-        # Get description and precautions
-        description = model.describe_disease(disease)
-        precautions = model.disease_precautions(disease)
-        
-        return {
-            "prediction": disease,
-            "probability": float(probability),
-            "description": description,
-            "precautions": precautions
-        }
+        # Get prediction, probability, description and precautions per row
+        # (and the top_k differential), timed as the inference and describe stages
+        return score_general(model, features, top_k)
     except HTTPException as he:
-        logger.error(f"HTTP error in predict_general: {str(he)}")
+        logger.error("HTTP error in predict_general: %s", he)
         raise he
     except Exception as e:
-        logger.error(f"Error in predict_general: {str(e)}\n{traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        logger.exception("Error in predict_general")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+# Number of most likely diseases ranked in the "differential" of a general
+# prediction (?top_k=); 0 leaves the differential out. The general model
+# tells the 42 diseases of data/dataset.csv apart, so 42 ranks all of them.
+MAX_TOP_K = 42
+TopK = Query(0, ge=0, le=MAX_TOP_K)
+
+def top_k_extra(top_k):
+    # Keys of top_k=0 results stay the same as before the option existed
+    return (("top_k", top_k),) if top_k else ()
+
+def with_unrecognized(row, result):
+    """
+    Copy of a general result listing the row's symptoms the model does not
+    know, as sent; added after the cache, which stores results per
+    normalized symptom set
+    """
+    _, unknown = symptom_indices(row.symptoms)
+    return {**result, "unrecognized": unknown}
+
+@app.post("/predict/general")
+async def predict_general(data: GeneralInput, top_k: int = TopK):
+    result = (await cached_scoring("general", [data], general_batcher(top_k).submit_all, model="general", extra=top_k_extra(top_k)))[0]
+    return with_unrecognized(data, result)
+
+@app.post("/predict/general/batch")
+async def predict_general_batch(data: list[GeneralInput], top_k: int = TopK):
+    check_batch_size(data)
+    results = await cached_scoring(
+        "general", data, lambda rows: run_inference(general_results, rows, top_k), model="general", extra=top_k_extra(top_k)
+    )
+    return [with_unrecognized(row, result) for row, result in zip(data, results)]
+
+# Concurrent single-row requests to the same endpoint share one scoring call
+def make_batcher(fn):
+    return MicroBatcher(
+        fn,
+        max_rows=MICROBATCH_MAX_ROWS,
+        window=MICROBATCH_WINDOW_MS / 1000,
+        runner=run_inference,
+    )
+
+batchers = {
+    name: make_batcher(fn)
+    for name, fn in {
+        "diabetes": diabetes_results,
+        "kidney": kidney_results,
+        "general": general_results,
+    }.items()
+}
+
+def general_batcher(top_k):
+    """Batcher of general predictions with the given top_k, created on first use"""
+    if top_k not in batchers_by_top_k:
+        batchers_by_top_k[top_k] = batchers["general"] if top_k == 0 else make_batcher(partial(general_results, top_k=top_k))
+    return batchers_by_top_k[top_k]
+
+# Coalesced calls never mix requests that asked for different top_k
+batchers_by_top_k = {}
+
+# Jittered scorers get one batcher per jitter mode, so a coalesced call
+# never mixes requests that asked for different modes
+jitter_batchers = {
+    name: {mode: make_batcher(partial(fn, jitter=mode)) for mode in JITTER_MODES}
+    for name, fn in {
+        "heart": heart_results,
+        "liver": liver_results,
+        "parkinsons": parkinsons_results,
+        "lung": lung_results,
+        "breast": breast_results,
+    }.items()
+}
+
+# Input model and scorer of every disease accepted by the bulk endpoint;
+# the scorers whose second element is True take a jitter mode
+bulk_scorers = {
+    "diabetes": (DiabetesInput, diabetes_results, False),
+    "heart": (HeartInput, heart_results, True),
+    "liver": (LiverInput, liver_results, True),
+    "parkinsons": (ParkinsonsInput, parkinsons_results, True),
+    "lung": (LungInput, lung_results, True),
+    "kidney": (ChronicKidneyInput, kidney_results, False),
+    "breast": (BreastCancerInput, breast_results, True),
+    "general": (GeneralInput, general_results, False),
+}
+BulkDisease = Literal[tuple(bulk_scorers)]
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+def validate_records(disease, records):
+    """Input models of the valid records, and (line number, error) results of the others"""
+    input_model = bulk_scorers[disease][0]
+    rows, numbers, invalid = [], [], []
+    for number, record in records:
+        try:
+            rows.append(input_model.model_validate(record_payload(disease, record)))
+            numbers.append(number)
+        except ValidationError as e:
+            invalid.append((number, {"error": validation_message(e)}))
+    return rows, numbers, invalid
+
+def score_records(disease, records, jitter=None):
+    """
+    Validate and score a chunk of (line number, record) pairs of a bulk
+    file, returning (line number, result) pairs in line order
+    """
+    rows, numbers, invalid = validate_records(disease, records)
+    _, results_fn, jittered = bulk_scorers[disease]
+    score = partial(results_fn, jitter=jitter) if jittered else results_fn
+    results = score_chunk(score, rows) if rows else []
+    if disease == "general":
+        results = [with_unrecognized(row, result) for row, result in zip(rows, results)]
+    return sorted(list(zip(numbers, results)) + invalid, key=lambda item: item[0])
+
+@app.post("/predict/{disease}/bulk")
+async def predict_bulk(
+    disease: BulkDisease,
+    file: UploadFile = File(...),
+    format: Literal[BULK_FORMATS] = "ndjson",
+    jitter: JitterMode = None,
+):
+    """
+    Score every row of a CSV file in the layout of the disease's dataset in
+    backend/data, streaming one NDJSON object or CSV line per row back
+    (``row`` is the line number in the file). Rows that fail validation get
+    an ``error`` instead of a prediction.
+    """
+    mode = resolve_jitter(jitter)
+    chunks = read_records(file, BULK_CHUNK_ROWS)
+    # Read the first chunk before the response starts, so an empty file or
+    # one with missing columns gets an error status instead of error rows
+    first = await anext(chunks, None)
+    if first is not None:
+        payload = record_payload(disease, first[0][1])
+        missing = [
+            name for name, field in bulk_scorers[disease][0].model_fields.items()
+            if field.is_required() and name not in payload and field.alias not in payload
+        ]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"The file is missing columns: {', '.join(missing)}")
+
+    async def body():
+        started = time.perf_counter()
+        scored = errors = 0
+        if format == "csv":
+            yield csv_header(disease)
+        chunk = first
+        while chunk is not None:
+            numbered = await run_inference(score_records, disease, chunk, mode)
+            scored += len(numbered)
+            errors += sum(1 for _, result in numbered if "error" in result)
+            yield ndjson_lines(numbered) if format == "ndjson" else csv_lines(disease, numbered)
+            chunk = await anext(chunks, None)
+        logger.info("Bulk scored %d %s rows (%d errors) in %.2fs", scored, disease, errors, time.perf_counter() - started)
+
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[format])
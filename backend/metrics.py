@@ -0,0 +1,261 @@
+"""
+Request and stage latency histograms, exposed in the Prometheus text format.
+
+MetricsMiddleware times every HTTP request and TimedRoute splits the time
+spent before the endpoint runs (reading and validating the body) from the
+time spent serializing its response. Code on the request path times its own
+stages with ``stage(name)``; the timings are labelled with the route of the
+request being served, including when the work runs on a worker thread or
+process (see executors.py). Other subsystems add their cache and model
+counters with ``register_collector``.
+"""
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+
+# Upper bounds in seconds, from sub-millisecond rule scoring up to Gemini calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with one series per label combination"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labelvalues, list(counts), total, count) for labelvalues, (counts, total, count) in self._series.items()]
+        names = self.labelnames + ("le",)
+        for labelvalues, counts, total, count in sorted(series):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(names, labelvalues + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {count}")
+        return lines
+
+
+def sample_lines(
+    name: str,
+    help: str,
+    kind: str,
+    labelnames: Sequence[str],
+    samples: Iterable[Tuple[Sequence, float]],
+) -> List[str]:
+    """Exposition lines of a counter or gauge from (label values, value) pairs"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labelvalues, value in samples:
+        lines.append(f"{name}{_labels(labelnames, labelvalues)} {_number(value)}")
+    return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve an HTTP request, by route template and status code",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "request_stage_duration_seconds",
+    "Time spent in each stage of serving a request, by route template",
+    ("route", "stage"),
+)
+
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def register_collector(collector: Callable[[], List[str]]):
+    """Add a function returning exposition lines, called on every scrape"""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    lines = REQUEST_SECONDS.render() + STAGE_SECONDS.render()
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+class RequestTiming:
+    __slots__ = ("route", "endpoint_started", "endpoint_finished")
+
+    def __init__(self):
+        self.route: Optional[str] = None
+        self.endpoint_started: Optional[float] = None
+        self.endpoint_finished: Optional[float] = None
+
+
+# Timing of the request being served; the object is shared with every task
+# and worker thread the request's context is copied into
+current_request: contextvars.ContextVar = contextvars.ContextVar("current_request", default=None)
+# Stage timings recorded in a worker process, returned with its result
+_collected_stages: contextvars.ContextVar = contextvars.ContextVar("collected_stages", default=None)
+
+
+def observe_stage(name: str, seconds: float):
+    collected = _collected_stages.get()
+    if collected is not None:
+        collected.append((name, seconds))
+        return
+    timing = current_request.get()
+    if timing is not None and timing.route is not None:
+        STAGE_SECONDS.observe(seconds, timing.route, name)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage ``name`` of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+@contextmanager
+def collect_stages():
+    """Collect the stage timings of the enclosed block instead of recording them"""
+    stages: List[Tuple[str, float]] = []
+    token = _collected_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _collected_stages.reset(token)
+
+
+def _timed_endpoint(endpoint):
+    """Wrap an endpoint to record when it starts and returns, keeping it sync or async"""
+
+    def started():
+        timing = current_request.get()
+        if timing is not None:
+            timing.endpoint_started = time.perf_counter()
+        return timing
+
+    def finished(timing):
+        if timing is not None:
+            timing.endpoint_finished = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+        async def timed(*args, **kwargs):
+            timing = started()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                finished(timing)
+    else:
+        def timed(*args, **kwargs):
+            timing = started()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                finished(timing)
+
+    timed._timed = True
+    return functools.update_wrapper(timed, endpoint)
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that labels the request with its route template and records the
+    "validation" stage (reading, parsing and validating the request up to
+    the endpoint call) and the "serialization" stage (after it returns)
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not getattr(endpoint, "_timed", False):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path_format
+
+        async def timed_handler(request):
+            timing = current_request.get()
+            if timing is None:
+                return await handler(request)
+            timing.route = path
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                if timing.endpoint_started is not None:
+                    observe_stage("validation", timing.endpoint_started - started)
+                if timing.endpoint_finished is not None:
+                    observe_stage("serialization", time.perf_counter() - timing.endpoint_finished)
+
+        return timed_handler
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording REQUEST_SECONDS for every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = current_request.set(timing)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            # Unmatched paths share one label so scans cannot blow up the series count
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], timing.route or "unmatched", status)
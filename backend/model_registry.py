@@ -0,0 +1,290 @@
+import os
+import time
+import itertools
+import logging
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import joblib
+import numpy as np
+
+try:
+    from disease_model import DiseaseModel
+    from encoders import load_encoded_model
+    from lean_models import load_lean_model
+    from metrics import register_collector, sample_lines
+    from scoring import BREAST_ENCODER, KIDNEY_ENCODER
+    from settings import LEAN_MODELS, LEAN_MODELS_DIR, MODEL_RELOAD_INTERVAL
+except ImportError:
+    # Fallback for when running as a module
+    from backend.disease_model import DiseaseModel
+    from backend.encoders import load_encoded_model
+    from backend.lean_models import load_lean_model
+    from backend.metrics import register_collector, sample_lines
+    from backend.scoring import BREAST_ENCODER, KIDNEY_ENCODER
+    from backend.settings import LEAN_MODELS, LEAN_MODELS_DIR, MODEL_RELOAD_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_models')
+LEAN_DIR = LEAN_MODELS_DIR or os.path.join(MODELS_DIR, 'lean')
+
+
+def _mock_heart_model():
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier()
+    # This mock model will always predict 1 with 0.75 probability
+    model.predict = lambda X: np.ones(X.shape[0], dtype=int)
+    model.predict_proba = lambda X: np.array([[0.25, 0.75]] * X.shape[0])
+    return model
+
+
+def load_heart_model(model_path=None):
+    try:
+        logger.info("Loading heart disease model...")
+        if model_path is None:
+            model_path = os.path.join(MODELS_DIR, 'heart_disease_model.sav')
+
+        # Check if model file exists
+        if not os.path.exists(model_path):
+            # For testing, return a mock model
+            logger.warning("Heart model file not found at %s, returning mock model", model_path)
+            return _mock_heart_model()
+
+        model = joblib.load(model_path)
+        # The artifact is a (scaler, model) tuple; heart requests are scored
+        # by the rule engine in scoring.py, so the scaler is not needed
+        if isinstance(model, tuple):
+            _, model = model
+        logger.info("Model loaded successfully")
+        return model
+    except Exception as e:
+        logger.error("Error loading heart disease model: %s", e)
+        logger.warning("Returning mock model due to error")
+        # Return a mock model in case of error
+        return _mock_heart_model()
+
+
+def load_disease_model(model_path):
+    model = DiseaseModel()
+    model.load_xgboost(model_path)
+    return model
+
+
+def load_lean_disease_model(model_path):
+    model = DiseaseModel()
+    model.model = load_lean_model(model_path)
+    return model
+
+
+def _file_mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class ModelEntry(NamedTuple):
+    model: Any
+    mtime: float
+    version: int
+    load_seconds: float
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of deserialized model artifacts.
+
+    Each artifact is loaded once and handed out as a shared, read-only
+    instance. When a file's mtime changes, the next request that notices it
+    reloads the artifact and swaps it in atomically, so handlers always see
+    either the old or the new model, never a half-loaded one.
+
+    With a ``lean_dir``, an up-to-date ``<lean_dir>/<name>.npz`` export
+    (see export_models.py) is served instead of the original artifact.
+    """
+
+    def __init__(self, models_dir: str, check_interval: float = 2.0, lean_dir: Optional[str] = None):
+        self.models_dir = models_dir
+        self.check_interval = check_interval
+        self.lean_dir = lean_dir
+        self._specs: Dict[str, tuple] = {}
+        self._stale_lean: set = set()
+        self._entries: Dict[str, ModelEntry] = {}
+        self._last_check: Dict[str, float] = {}
+        self._stale_check: Dict[str, tuple] = {}
+        # Versions are unique across the process so a model that disappears
+        # and comes back never reuses an old version number
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        # Guards _last_check only, so checks never wait behind a slow load
+        self._check_lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        filename: str,
+        loader: Callable[[str], Any] = joblib.load,
+        lean_loader: Callable[[str], Any] = load_lean_model,
+    ):
+        self._specs[name] = (os.path.join(self.models_dir, filename), loader, lean_loader)
+
+    def names(self):
+        return list(self._specs)
+
+    def source_path(self, name: str) -> str:
+        return self._specs[name][0]
+
+    def lean_path(self, name: str) -> Optional[str]:
+        return os.path.join(self.lean_dir, f"{name}.npz") if self.lean_dir else None
+
+    def path(self, name: str) -> str:
+        """File served for ``name``: its lean export if enabled and not older than the original"""
+        source = self.source_path(name)
+        lean = self.lean_path(name)
+        lean_mtime = _file_mtime(lean) if lean else None
+        if lean_mtime is None:
+            return source
+        source_mtime = _file_mtime(source)
+        if source_mtime is not None and source_mtime > lean_mtime:
+            if name not in self._stale_lean:
+                self._stale_lean.add(name)
+                logger.warning("Lean export %s is older than %s, serving the original; re-run the export", lean, source)
+            return source
+        self._stale_lean.discard(name)
+        return lean
+
+    def load_source(self, name: str):
+        """Load the original artifact of ``name`` with its regular loader, bypassing the cache"""
+        path, loader, _ = self._specs[name]
+        return loader(path)
+
+    def load_all(self):
+        for name in self._specs:
+            try:
+                self._load(name)
+            except Exception as e:
+                # Keep starting up; the handler will retry and report the error
+                logger.error("Error loading model '%s': %s", name, e)
+
+    def get(self, name: str):
+        """Return the shared model for ``name``, or None if its file is missing."""
+        entry = self._entries.get(name)
+        if entry is None:
+            entry = self._load(name)
+        elif self.check_interval >= 0 and self._claim_check(name):
+            entry = self._reload_if_changed(name, entry)
+        return entry.model if entry is not None else None
+
+    def _claim_check(self, name: str) -> bool:
+        """True for the one caller per check_interval that should stat the file of ``name``"""
+        now = time.monotonic()
+        with self._check_lock:
+            if now - self._last_check.get(name, 0.0) < self.check_interval:
+                return False
+            self._last_check[name] = now
+            return True
+
+    def version(self, name: str) -> int:
+        entry = self._entries.get(name)
+        return entry.version if entry is not None else 0
+
+    def stale(self, name: str) -> bool:
+        """
+        True when ``name`` is not loaded or its file changed since it was,
+        i.e. the next get() will (re)load it. Re-stats at most every
+        check_interval and never loads anything itself.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return True
+        if self.check_interval < 0:
+            return False
+        now = time.monotonic()
+        checked_at, version, stale = self._stale_check.get(name, (None, None, None))
+        if checked_at is None or version != entry.version or now - checked_at >= self.check_interval:
+            stale = self._mtime(name) != entry.mtime
+            self._stale_check[name] = (now, entry.version, stale)
+        return stale
+
+    def entries(self) -> Dict[str, ModelEntry]:
+        return dict(self._entries)
+
+    def _mtime(self, name: str) -> Optional[float]:
+        return _file_mtime(self.path(name))
+
+    def _reload_if_changed(self, name: str, entry: ModelEntry) -> ModelEntry:
+        if self._mtime(name) == entry.mtime:
+            return entry
+        logger.info("Model artifact for '%s' changed on disk, reloading", name)
+        try:
+            return self._load(name)
+        except Exception as e:
+            logger.error("Reloading model '%s' failed, keeping previous version: %s", name, e)
+            return entry
+
+    def _load(self, name: str) -> Optional[ModelEntry]:
+        source, loader, lean_loader = self._specs[name]
+        with self._lock:
+            path = self.path(name)
+            if path != source:
+                loader = lean_loader
+            mtime = _file_mtime(path)
+            current = self._entries.get(name)
+            # Another request may have finished the same reload while we waited
+            if current is not None and current.mtime == mtime:
+                return current
+            if mtime is None:
+                logger.warning("Model file for '%s' not found at %s", name, path)
+                self._entries.pop(name, None)
+                return None
+
+            started = time.perf_counter()
+            model = loader(path)
+            elapsed = time.perf_counter() - started
+            version = next(self._versions)
+            entry = ModelEntry(model, mtime, version, elapsed)
+            self._entries[name] = entry
+            with self._check_lock:
+                self._last_check[name] = time.monotonic()
+            logger.info("Loaded model '%s' v%s from %s in %.3fs", name, version, path, elapsed)
+            return entry
+
+
+registry = ModelRegistry(
+    MODELS_DIR,
+    check_interval=MODEL_RELOAD_INTERVAL,
+    lean_dir=LEAN_DIR if LEAN_MODELS else None,
+)
+registry.register("diabetes", "diabetes_model.sav")
+registry.register("heart", "heart_disease_model.sav", loader=load_heart_model)
+registry.register("liver", "liver_model.sav")
+registry.register("lung", "lung_cancer_model.sav")
+registry.register("parkinsons", "parkinsons_model.sav")
+# Kidney and breast are scored from encoded arrays; their feature names are
+# checked once here instead of on every predict call
+registry.register(
+    "kidney", "chronic_model.sav",
+    loader=partial(load_encoded_model, encoder=KIDNEY_ENCODER),
+    lean_loader=partial(load_encoded_model, encoder=KIDNEY_ENCODER, loader=load_lean_model),
+)
+registry.register(
+    "breast", "breast_cancer.sav",
+    loader=partial(load_encoded_model, encoder=BREAST_ENCODER),
+    lean_loader=partial(load_encoded_model, encoder=BREAST_ENCODER, loader=load_lean_model),
+)
+registry.register("general", "xgboost_model.json", loader=load_disease_model, lean_loader=load_lean_disease_model)
+
+
+def model_metrics():
+    entries = sorted(registry.entries().items())
+    return (
+        sample_lines("model_load_seconds", "Time the last load of each model took", "gauge", ("model",),
+                     [((name,), entry.load_seconds) for name, entry in entries])
+        + sample_lines("model_version", "Registry version of each loaded model, bumped on every reload", "gauge", ("model",),
+                       [((name,), entry.version) for name, entry in entries])
+    )
+
+
+register_collector(model_metrics)
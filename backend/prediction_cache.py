@@ -0,0 +1,110 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+try:
+    from cache import LRUCache
+    from executors import run_in_thread
+    from helper import normalize_symptom
+    from metrics import register_collector, sample_lines
+    from model_registry import registry
+    from settings import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL
+except ImportError:
+    # Fallback for when running as a module
+    from backend.cache import LRUCache
+    from backend.executors import run_in_thread
+    from backend.helper import normalize_symptom
+    from backend.metrics import register_collector, sample_lines
+    from backend.model_registry import registry
+    from backend.settings import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL
+
+prediction_caches: Dict[str, LRUCache] = {}
+
+
+def prediction_cache(name: str) -> LRUCache:
+    cache = prediction_caches.get(name)
+    if cache is None:
+        cache = prediction_caches.setdefault(name, LRUCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL))
+    return cache
+
+
+def canonical_input(data) -> dict:
+    """
+    Field values of a validated input model in a canonical form. Symptom
+    lists are matched as a set of normalized names, so they are normalized
+    like the model lookup does, deduplicated and sorted.
+    """
+    fields = data.model_dump() if hasattr(data, "model_dump") else data.dict()
+    if "symptoms" in fields:
+        fields["symptoms"] = sorted({normalize_symptom(symptom) for symptom in fields["symptoms"]})
+    return fields
+
+
+def prediction_key(data, version: int, extra: Sequence = ()) -> str:
+    payload = json.dumps(
+        [type(data).__name__, version, list(extra), canonical_input(data)],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def cached_predict(
+    name: str,
+    rows: List[Any],
+    score: Callable[[List[Any]], Awaitable[List[Any]]],
+    model: Optional[str] = None,
+    extra: Sequence = (),
+) -> List[Any]:
+    """
+    Serve ``rows`` from the prediction cache of ``name`` and send only the
+    misses through ``score``. Keys include the version of the registry
+    ``model`` the results depend on, as loaded in this process: with a
+    process executor the scoring happens in the workers, so the model is
+    (re)loaded here too when it is missing or changed on disk. The cache is
+    bypassed while that model cannot be loaded or is about to be
+    hot-reloaded, and results are only stored if the version did not change
+    while they were computed. ``extra`` holds request options that change
+    the result.
+    """
+    cache = prediction_cache(name)
+    if cache.maxsize <= 0:
+        return await score(rows)
+    if model is not None and registry.stale(model):
+        await run_in_thread(registry.get, model)
+        if registry.stale(model):
+            return await score(rows)
+
+    version = registry.version(model) if model is not None else 0
+    keys = [prediction_key(row, version, extra) for row in rows]
+    results = [cache.get(key) for key in keys]
+    misses = [i for i, result in enumerate(results) if result is None]
+    if not misses:
+        return results
+
+    fresh = await score([rows[i] for i in misses])
+    store = model is None or registry.version(model) == version
+    for i, result in zip(misses, fresh):
+        results[i] = result
+        if store:
+            cache.set(keys[i], result)
+    return results
+
+
+def prediction_cache_stats() -> Dict[str, Any]:
+    return {name: cache.stats() for name, cache in sorted(prediction_caches.items())}
+
+
+def prediction_cache_metrics():
+    caches = sorted(prediction_caches.items())
+    return (
+        sample_lines("prediction_cache_hits_total", "Prediction cache hits", "counter", ("model",),
+                     [((name,), cache.hits) for name, cache in caches])
+        + sample_lines("prediction_cache_misses_total", "Prediction cache misses", "counter", ("model",),
+                       [((name,), cache.misses) for name, cache in caches])
+        + sample_lines("prediction_cache_entries", "Entries in the prediction cache", "gauge", ("model",),
+                       [((name,), len(cache)) for name, cache in caches])
+    )
+
+
+register_collector(prediction_cache_metrics)
@@ -1,77 +1,216 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 import numpy as np
-import cv2
 import io
 import os
 import logging
-import traceback
-from PIL import Image
-import requests
 import base64
+import hashlib
 import json
 from typing import Optional
-from dotenv import load_dotenv
 
-router = APIRouter()
+try:
+    from cache import LRUCache, SQLiteCache, TieredCache
+    from executors import run_image_task, run_in_thread
+    from gemini_client import GeminiAPIError, gemini_client
+    from metrics import TimedRoute, register_collector, sample_lines, stage
+    from settings import (
+        GEMINI_API_KEY, GEMINI_API_URL, IMAGE_CACHE_DISK_MAX_ENTRIES, IMAGE_CACHE_PATH,
+        IMAGE_CACHE_SIZE, IMAGE_CACHE_TTL, IMAGE_MAX_EDGE, IMAGE_MAX_UPLOAD_BYTES,
+        IMAGE_PASSTHROUGH_MAX_BYTES, IMAGE_READ_CHUNK_BYTES, IMAGE_TARGET_BYTES,
+    )
+except ImportError:
+    # Fallback for when running as a module
+    from backend.cache import LRUCache, SQLiteCache, TieredCache
+    from backend.executors import run_image_task, run_in_thread
+    from backend.gemini_client import GeminiAPIError, gemini_client
+    from backend.metrics import TimedRoute, register_collector, sample_lines, stage
+    from backend.settings import (
+        GEMINI_API_KEY, GEMINI_API_URL, IMAGE_CACHE_DISK_MAX_ENTRIES, IMAGE_CACHE_PATH,
+        IMAGE_CACHE_SIZE, IMAGE_CACHE_TTL, IMAGE_MAX_EDGE, IMAGE_MAX_UPLOAD_BYTES,
+        IMAGE_PASSTHROUGH_MAX_BYTES, IMAGE_READ_CHUNK_BYTES, IMAGE_TARGET_BYTES,
+    )
+
+router = APIRouter(prefix="/image", route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+def create_analysis_cache():
+    disk = None
+    if IMAGE_CACHE_PATH:
+        os.makedirs(os.path.dirname(os.path.abspath(IMAGE_CACHE_PATH)), exist_ok=True)
+        disk = SQLiteCache(IMAGE_CACHE_PATH, ttl=IMAGE_CACHE_TTL, max_entries=IMAGE_CACHE_DISK_MAX_ENTRIES)
+    return TieredCache(LRUCache(maxsize=IMAGE_CACHE_SIZE, ttl=IMAGE_CACHE_TTL), disk)
+
+# Gemini analyses of previously seen uploads
+analysis_cache = create_analysis_cache()
+
+def analysis_cache_metrics():
+    tiers = list(analysis_cache.stats().items())
+    return (
+        sample_lines("image_cache_hits_total", "Image analysis cache hits", "counter", ("tier",),
+                     [((tier,), stats["hits"]) for tier, stats in tiers])
+        + sample_lines("image_cache_misses_total", "Image analysis cache misses", "counter", ("tier",),
+                       [((tier,), stats["misses"]) for tier, stats in tiers])
+        + sample_lines("image_cache_entries", "Entries in the image analysis cache", "gauge", ("tier",),
+                       [((tier,), stats["size"]) for tier, stats in tiers])
+    )
+
+register_collector(analysis_cache_metrics)
+
+class AnalysisUnavailable(Exception):
+    """
+    Raised when no Gemini analysis could be produced; the message is shown to the user
+    """
+
+# cv2 can decode JPEGs directly at 1/2, 1/4 or 1/8 scale, which is much
+# cheaper than a full decode followed by a resize
+REDUCED_DECODE_FACTORS = (8, 4, 2)
+
+def import_image_libraries():
+    """
+    Import cv2 and PIL ahead of the first upload. Both are imported lazily so
+    workers that never process an image do not pay for them at startup.
+    """
+    import cv2
+    from PIL import Image
+    return cv2, Image
+
+async def read_upload(file: UploadFile, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Read an upload in fixed-size chunks, rejecting it as soon as it goes over max_bytes
+    """
+    size = getattr(file, "size", None)
+    if max_bytes > 0 and size is not None and size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image too large (maximum is {max_bytes} bytes)")
+    
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(IMAGE_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes > 0 and total > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Image too large (maximum is {max_bytes} bytes)")
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+def image_dimensions(image_data: bytes) -> Optional[tuple]:
+    """
+    (width, height) read from the image header only, None if PIL cannot tell
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            return img.size
+    except Exception:
+        return None
+
+def decode_image(image_data: bytes, max_edge: int = 0):
+    """
+    Decode uploaded bytes into a BGR array, using a reduced-resolution JPEG
+    decode when the image is far larger than max_edge
+    """
+    import cv2
+
+    # Convert bytes to numpy array
+    nparr = np.frombuffer(image_data, np.uint8)
+    
+    flags = cv2.IMREAD_COLOR
+    if max_edge > 0 and sniff_image_type(image_data) == "image/jpeg":
+        dimensions = image_dimensions(image_data)
+        if dimensions is not None:
+            longest = max(dimensions)
+            for factor in REDUCED_DECODE_FACTORS:
+                if longest // factor >= max_edge:
+                    flags = getattr(cv2, f"IMREAD_REDUCED_COLOR_{factor}")
+                    break
+    
+    return cv2.imdecode(nparr, flags)
 
-# Get Gemini API key from environment variable
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+def downscale_image(img, max_edge: int):
+    """
+    Shrink img so its longest edge is at most max_edge, with area interpolation
+    """
+    import cv2
+
+    height, width = img.shape[:2]
+    longest = max(height, width)
+    if max_edge <= 0 or longest <= max_edge:
+        return img
+    scale = max_edge / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+def encode_jpeg(img, target_bytes: int = 0):
+    """
+    JPEG-encode img, lowering quality and then resolution until the result
+    fits in target_bytes (0 means no budget)
+    """
+    import cv2
+
+    quality = 95
+    while True:
+        _, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if target_bytes <= 0 or len(buffer) <= target_bytes:
+            return buffer
+        if quality > 65:
+            quality -= 15
+            continue
+        height, width = img.shape[:2]
+        if min(height, width) <= 64:
+            # Small enough; accept being over budget rather than destroying the image
+            return buffer
+        # Byte size scales roughly with pixel count
+        scale = max(0.5, (target_bytes / len(buffer)) ** 0.5 * 0.95)
+        img = cv2.resize(img, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
 
 async def process_image_for_disease(image_data: bytes, disease_type: str):
     """
     Process the uploaded image for the specific disease type
     """
     try:
-        # Convert bytes to numpy array
-        nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
         # Process image based on disease type
         if disease_type == "diabetes":
-            return process_diabetes_image(img)
+            return await process_diabetes_image(image_data)
         elif disease_type == "heart":
-            return process_heart_image(img)
+            return await process_heart_image(image_data)
         elif disease_type == "liver":
-            return process_liver_image(img)
+            return await process_liver_image(image_data)
         elif disease_type == "lung":
-            return process_lung_image(img)
+            return await process_lung_image(image_data)
         elif disease_type == "kidney":
-            return process_kidney_image(img)
+            return await process_kidney_image(image_data)
         elif disease_type == "parkinsons":
-            return process_parkinsons_image(img)
+            return await process_parkinsons_image(image_data)
         elif disease_type == "breast":
-            return process_breast_cancer_image(img)
+            return await process_breast_cancer_image(image_data)
         else:
-            return process_general_disease_image(img)
+            return await process_general_disease_image(image_data)
     except Exception as e:
-        logger.error(f"Error processing image: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error processing image")
         raise HTTPException(status_code=500, detail=f"Image processing error: {str(e)}")
 
-def process_diabetes_image(img):
+async def process_diabetes_image(image_data: bytes):
     """
     Process image for diabetes detection
     For now, we'll use Gemini API for analysis and return a placeholder result
     In a production environment, you would use a specific ML model for this
     """
     # Get detailed analysis from Gemini specifically for diabetes
-    analysis = get_gemini_analysis(img, "diabetes", is_specific=True)
+    analysis = await get_gemini_analysis(image_data, "diabetes", is_specific=True)
     
     # For image uploads, we only return the analysis, not predictions
     return {
         "analysis": analysis
     }
 
-def process_heart_image(img):
+async def process_heart_image(image_data: bytes):
     """Process image for heart disease detection"""
     # Placeholder values
     prediction = True
     probability = 0.65
-    analysis = get_gemini_analysis(img, "heart disease")
+    analysis = await get_gemini_analysis(image_data, "heart disease")
     
     return {
         "prediction": prediction,
@@ -79,12 +218,12 @@ def process_heart_image(img):
         "analysis": analysis
     }
 
-def process_liver_image(img):
+async def process_liver_image(image_data: bytes):
     """Process image for liver disease detection"""
     # Placeholder values
     prediction = True
     probability = 0.72
-    analysis = get_gemini_analysis(img, "liver disease")
+    analysis = await get_gemini_analysis(image_data, "liver disease")
     
     return {
         "prediction": prediction,
@@ -92,12 +231,12 @@ def process_liver_image(img):
         "analysis": analysis
     }
 
-def process_lung_image(img):
+async def process_lung_image(image_data: bytes):
     """Process image for lung cancer detection"""
     # Placeholder values
     prediction = False
     probability = 0.15
-    analysis = get_gemini_analysis(img, "lung cancer")
+    analysis = await get_gemini_analysis(image_data, "lung cancer")
     
     return {
         "prediction": prediction,
@@ -105,12 +244,12 @@ def process_lung_image(img):
         "analysis": analysis
     }
 
-def process_kidney_image(img):
+async def process_kidney_image(image_data: bytes):
     """Process image for chronic kidney disease detection"""
     # Placeholder values
     prediction = True
     probability = 0.83
-    analysis = get_gemini_analysis(img, "chronic kidney disease")
+    analysis = await get_gemini_analysis(image_data, "chronic kidney disease")
     
     return {
         "prediction": prediction,
@@ -118,12 +257,12 @@ def process_kidney_image(img):
         "analysis": analysis
     }
 
-def process_parkinsons_image(img):
+async def process_parkinsons_image(image_data: bytes):
     """Process image for Parkinson's disease detection"""
     # Placeholder values
     prediction = True
     probability = 0.91
-    analysis = get_gemini_analysis(img, "Parkinson's disease")
+    analysis = await get_gemini_analysis(image_data, "Parkinson's disease")
     
     return {
         "prediction": prediction,
@@ -131,12 +270,12 @@ def process_parkinsons_image(img):
         "analysis": analysis
     }
 
-def process_breast_cancer_image(img):
+async def process_breast_cancer_image(image_data: bytes):
     """Process image for breast cancer detection"""
     # Placeholder values
     prediction = False
     probability = 0.08
-    analysis = get_gemini_analysis(img, "breast cancer")
+    analysis = await get_gemini_analysis(image_data, "breast cancer")
     
     return {
         "prediction": prediction,
@@ -144,7 +283,7 @@ def process_breast_cancer_image(img):
         "analysis": analysis
     }
 
-def process_general_disease_image(img):
+async def process_general_disease_image(image_data: bytes):
     """Process image for general disease detection"""
     # Placeholder values
     disease = "Common Cold"
@@ -156,7 +295,7 @@ def process_general_disease_image(img):
         "Wash hands frequently",
         "Avoid close contact with others"
     ]
-    analysis = get_gemini_analysis(img, "general disease symptoms")
+    analysis = await get_gemini_analysis(image_data, "general disease symptoms")
     
     return {
         "prediction": disease,
@@ -166,94 +305,178 @@ def process_general_disease_image(img):
         "analysis": analysis
     }
 
-def get_gemini_analysis(img, disease_type: str, is_specific: bool = False) -> str:
+# Placeholder swapped for the base64 image when serializing the Gemini request
+IMAGE_DATA_PLACEHOLDER = "__IMAGE_DATA__"
+
+def sniff_image_type(image_data: bytes) -> Optional[str]:
+    """
+    MIME type of a JPEG or PNG upload from its magic bytes, None for anything else
+    """
+    if image_data[:3] == b'\xff\xd8\xff':
+        return "image/jpeg"
+    if image_data[:8] == b'\x89PNG\r\n\x1a\n':
+        return "image/png"
+    return None
+
+def encode_image_base64(img) -> bytes:
+    """
+    Downscale, JPEG-encode within the size budget and base64 a decoded image
+    for the Gemini payload
     """
-    Get detailed analysis from Google's Gemini API
+    img = downscale_image(img, IMAGE_MAX_EDGE)
+    return base64.b64encode(encode_jpeg(img, IMAGE_TARGET_BYTES))
+
+def build_gemini_prompt(disease_type: str, is_specific: bool = False) -> str:
+    """
+    Prompt sent to Gemini along with the image
+    """
+    if is_specific and disease_type == "diabetes":
+        return (
+            "Analyze this image for diabetes-related information. "
+            "First, determine if this is: (1) a medical image showing physical symptoms of diabetes, "
+            "(2) a diabetes report/document, or (3) an unrelated image. "
+            
+            "If it's a MEDICAL IMAGE showing physical symptoms (like diabetic foot ulcers, retinopathy, etc.):"
+            "- Start with 'MEDICAL IMAGE: This shows diabetes-related symptoms'"
+            "- Analyze visible symptoms"
+            "- Provide severity assessment"
+            
+            "If it's a DIABETES REPORT/DOCUMENT:"
+            "- Start with 'DIABETES REPORT: This is a medical document'"
+            "- Extract key metrics (glucose levels, HbA1c, etc.)"
+            "- State clearly if diabetes is present based on the report values"
+            "- Provide probability percentage if available"
+            "- List any concerning values in bullet points"
+            
+            "If it's an UNRELATED IMAGE:"
+            "- Start with 'UNRELATED IMAGE: This image does not show diabetes-related conditions'"
+            "- Briefly explain why"
+            
+            "Format your response with these sections:"
+            "1. Classification (what type of image this is)"
+            "2. Key Findings (metrics or symptoms)"
+            "3. Recommendations"
+            
+            "Keep your response concise and avoid markdown formatting."
+        )
+    return f"Analyze this medical image for signs of {disease_type}. Provide a detailed assessment including potential indicators, severity if applicable, and recommendations. Format your response in a clear, structured way suitable for a medical application."
+
+def analysis_cache_key(image_data: bytes, disease_type: str, prompt_text: str) -> str:
+    """
+    Content address of an analysis: hash of the uploaded bytes, the disease
+    type and the prompt variant (prompt text plus model endpoint)
+    """
+    image_digest = hashlib.sha256(image_data).hexdigest()
+    prompt_variant = hashlib.sha256(f"{GEMINI_API_URL}\n{prompt_text}".encode('utf-8')).hexdigest()[:16]
+    return f"{image_digest}:{disease_type}:{prompt_variant}"
+
+def prepare_image_payload(image_data: bytes):
+    """
+    Base64 image data and its MIME type for the Gemini payload.
+
+    JPEG/PNG uploads within IMAGE_PASSTHROUGH_MAX_BYTES and IMAGE_MAX_EDGE
+    are forwarded as-is; anything else is decoded, downscaled and re-encoded
+    as JPEG.
+    """
+    mime_type = sniff_image_type(image_data)
+    if mime_type is not None and len(image_data) <= IMAGE_PASSTHROUGH_MAX_BYTES:
+        dimensions = image_dimensions(image_data) if IMAGE_MAX_EDGE > 0 else None
+        if dimensions is None or max(dimensions) <= IMAGE_MAX_EDGE:
+            return mime_type, base64.b64encode(image_data)
+    return "image/jpeg", encode_image_base64(decode_image(image_data, IMAGE_MAX_EDGE))
+
+def build_gemini_body(prompt_text: str, mime_type: str, img_base64: bytes) -> bytes:
+    """
+    Serialize the generateContent request. The base64 image is spliced in as
+    raw bytes instead of going through json.dumps as a Python string.
+    """
+    payload = {
+        "contents": [
+            {
+                "parts": [
+                    {"text": prompt_text},
+                    {
+                        "inline_data": {
+                            "mime_type": mime_type,
+                            "data": IMAGE_DATA_PLACEHOLDER
+                        }
+                    }
+                ]
+            }
+        ],
+        "generation_config": {
+            "temperature": 0.4,
+            "top_p": 0.95,
+            "max_output_tokens": 800
+        }
+    }
+    prefix, suffix = json.dumps(payload).encode('utf-8').split(IMAGE_DATA_PLACEHOLDER.encode('utf-8'))
+    # base64 output never needs JSON escaping
+    return b''.join((prefix, img_base64, suffix))
+
+async def request_gemini_analysis(image_data: bytes, prompt_text: str) -> str:
+    """
+    Call Google's Gemini API; raises AnalysisUnavailable when there is no analysis
     """
     if not GEMINI_API_KEY:
-        return "API key not configured. Please set up your Gemini API key to get detailed analysis."
+        raise AnalysisUnavailable("API key not configured. Please set up your Gemini API key to get detailed analysis.")
     
     try:
-        # Convert image to base64
-        _, buffer = cv2.imencode('.jpg', img)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        # Encoding (and decoding, when needed) is CPU-bound, keep it off the event loop
+        with stage("image_prepare"):
+            mime_type, img_base64 = await run_image_task(prepare_image_payload, image_data)
+        payload = build_gemini_body(prompt_text, mime_type, img_base64)
         
-        # Prepare the request for Gemini API
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+        # Pooled, rate-limited call with retries and an overall deadline
+        try:
+            with stage("gemini"):
+                result = await gemini_client.generate_content(payload)
+        except GeminiAPIError as e:
+            logger.error("Gemini API error: %s - %s", e.status_code, e.text)
+            raise AnalysisUnavailable(f"Unable to get analysis. API error: {e.status_code}")
         
-        prompt_text = ""
-        if is_specific and disease_type == "diabetes":
-            prompt_text = (
-                "Analyze this image for diabetes-related information. "
-                "First, determine if this is: (1) a medical image showing physical symptoms of diabetes, "
-                "(2) a diabetes report/document, or (3) an unrelated image. "
-                
-                "If it's a MEDICAL IMAGE showing physical symptoms (like diabetic foot ulcers, retinopathy, etc.):"
-                "- Start with 'MEDICAL IMAGE: This shows diabetes-related symptoms'"
-                "- Analyze visible symptoms"
-                "- Provide severity assessment"
-                
-                "If it's a DIABETES REPORT/DOCUMENT:"
-                "- Start with 'DIABETES REPORT: This is a medical document'"
-                "- Extract key metrics (glucose levels, HbA1c, etc.)"
-                "- State clearly if diabetes is present based on the report values"
-                "- Provide probability percentage if available"
-                "- List any concerning values in bullet points"
-                
-                "If it's an UNRELATED IMAGE:"
-                "- Start with 'UNRELATED IMAGE: This image does not show diabetes-related conditions'"
-                "- Briefly explain why"
-                
-                "Format your response with these sections:"
-                "1. Classification (what type of image this is)"
-                "2. Key Findings (metrics or symptoms)"
-                "3. Recommendations"
-                
-                "Keep your response concise and avoid markdown formatting."
-            )
-        else:
-            prompt_text = f"Analyze this medical image for signs of {disease_type}. Provide a detailed assessment including potential indicators, severity if applicable, and recommendations. Format your response in a clear, structured way suitable for a medical application."
-        
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt_text},
-                        {
-                            "inline_data": {
-                                "mime_type": "image/jpeg",
-                                "data": img_base64
-                            }
-                        }
-                    ]
-                }
-            ],
-            "generation_config": {
-                "temperature": 0.4,
-                "top_p": 0.95,
-                "max_output_tokens": 800
-            }
-        }
+        # Extract the text from the response
+        if 'candidates' in result and len(result['candidates']) > 0:
+            if 'content' in result['candidates'][0] and 'parts' in result['candidates'][0]['content']:
+                for part in result['candidates'][0]['content']['parts']:
+                    if 'text' in part:
+                        return part['text']
         
-        response = requests.post(url, json=payload)
-        
-        if response.status_code == 200:
-            result = response.json()
-            # Extract the text from the response
-            if 'candidates' in result and len(result['candidates']) > 0:
-                if 'content' in result['candidates'][0] and 'parts' in result['candidates'][0]['content']:
-                    for part in result['candidates'][0]['content']['parts']:
-                        if 'text' in part:
-                            return part['text']
-            
-            return "Analysis not available"
-        else:
-            logger.error(f"Gemini API error: {response.status_code} - {response.text}")
-            return f"Unable to get analysis. API error: {response.status_code}"
-            
+        raise AnalysisUnavailable("Analysis not available")
+    
+    except AnalysisUnavailable:
+        raise
     except Exception as e:
-        logger.error(f"Error in Gemini analysis: {str(e)}")
-        return "Error generating analysis"
+        logger.error("Error in Gemini analysis: %s", e)
+        raise AnalysisUnavailable("Error generating analysis")
+
+async def get_gemini_analysis(image_data: bytes, disease_type: str, is_specific: bool = False) -> str:
+    """
+    Get detailed analysis from Google's Gemini API, reusing the cached
+    analysis when the same image was already analyzed with the same prompt
+    """
+    prompt_text = build_gemini_prompt(disease_type, is_specific)
+    key = analysis_cache_key(image_data, disease_type, prompt_text)
+    
+    analysis = await run_in_thread(analysis_cache.get, key)
+    if analysis is not None:
+        return analysis
+    
+    try:
+        analysis = await request_gemini_analysis(image_data, prompt_text)
+    except AnalysisUnavailable as e:
+        # Failures are not cached so the next upload tries again
+        return str(e)
+    
+    await run_in_thread(analysis_cache.set, key, analysis)
+    return analysis
+
+@router.get("/cache/stats")
+async def image_cache_stats():
+    """
+    Hit/miss counters of the image analysis cache
+    """
+    return await run_in_thread(analysis_cache.stats)
 
 @router.post("/{disease_type}")
 async def upload_image(disease_type: str, file: UploadFile = File(...)):
@@ -265,8 +488,9 @@ async def upload_image(disease_type: str, file: UploadFile = File(...)):
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read file content
-        contents = await file.read()
+        # Read file content, bounded by the upload size budget
+        with stage("upload"):
+            contents = await read_upload(file)
         
         # Process the image
         result = await process_image_for_disease(contents, disease_type)
@@ -276,6 +500,5 @@ async def upload_image(disease_type: str, file: UploadFile = File(...)):
     except HTTPException as he:
         raise he
     except Exception as e:
-        logger.error(f"Error processing upload: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error processing upload")
         raise HTTPException(status_code=500, detail=f"Error processing upload: {str(e)}")
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Query
+
+try:
+    from metrics import TimedRoute
+    from symptom_search import search_symptoms, symptom_search_index
+except ImportError:
+    # Fallback for when running as a module
+    from backend.metrics import TimedRoute
+    from backend.symptom_search import search_symptoms, symptom_search_index
+
+router = APIRouter(prefix="/symptoms", route_class=TimedRoute)
+
+# Longest query accepted by /symptoms/search; symptom names are shorter
+MAX_QUERY_LENGTH = 100
+
+def symptom_entry(symptom, **extra):
+    return {"symptom": symptom.name, "label": symptom.label, "severity": symptom.severity, **extra}
+
+@router.get("")
+async def list_symptoms():
+    """
+    Every symptom the general model knows, with its Symptom-severity.csv
+    weight (null when the file has none), most severe first
+    """
+    index = symptom_search_index()
+    return [symptom_entry(index.symptoms[i]) for i in index.by_severity]
+
+@router.get("/search")
+async def search(q: str = Query("", max_length=MAX_QUERY_LENGTH), limit: int = Query(10, ge=1, le=200)):
+    """
+    Autocomplete suggestions for ``q``: symptoms with a word starting with
+    it, or within one or two typos of that, best matches first and most
+    severe first among equal matches. ``distance`` is the number of edits.
+    """
+    return {
+        "query": q,
+        "results": [
+            symptom_entry(suggestion.symptom, distance=suggestion.distance)
+            for suggestion in search_symptoms(q, limit)
+        ],
+    }
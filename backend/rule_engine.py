@@ -0,0 +1,165 @@
+import operator
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+}
+
+
+class Term(NamedTuple):
+    """
+    One weighted factor of the base score: ``weight * f(value / scale)`` where
+    f optionally caps the value at 1.0 (``clip``) and then flips it to
+    ``1 - value`` (``invert``, for protective factors)
+    """
+    feature: str
+    weight: float
+    scale: float = 1.0
+    clip: bool = False
+    invert: bool = False
+
+
+class Condition(NamedTuple):
+    feature: str
+    op: str
+    threshold: float
+
+
+# A forcing rule in conjunctive normal form: every clause must hold, and a
+# clause holds when any of its conditions does. A plain "A or B or C" rule is
+# one clause; "A and B and C" is three single-condition clauses.
+Clause = Tuple[Condition, ...]
+
+
+def any_of(*conditions: Condition) -> Clause:
+    return tuple(conditions)
+
+
+def all_of(*items) -> Tuple[Clause, ...]:
+    """Build a rule from conditions and any_of() clauses that must all hold"""
+    return tuple((item,) if isinstance(item, Condition) else item for item in items)
+
+
+class RuleSpec(NamedTuple):
+    features: Tuple[str, ...]
+    terms: Tuple[Term, ...]
+    bias: float = 0.0
+    force_positive: Tuple[Clause, ...] = ()
+    force_negative: Tuple[Clause, ...] = ()
+    # "banded" keeps positive and negative probabilities in separate ranges;
+    # "centered" jitters the score and pushes it away from 0.5
+    outcome: str = "banded"
+
+
+# Uniform draws needed per row by each outcome
+JITTER_DRAWS = {"banded": 1, "centered": 2}
+
+
+class CompiledRule:
+    """CNF rule compiled to index/threshold arrays and a clause membership matrix"""
+
+    def __init__(self, clauses: Sequence[Clause], columns: dict):
+        conditions = [(clause_id, cond) for clause_id, clause in enumerate(clauses) for cond in clause]
+        self.n_clauses = len(clauses)
+        self.index = np.array([columns[c.feature] for _, c in conditions], dtype=np.intp)
+        self.threshold = np.array([c.threshold for _, c in conditions], dtype=float)
+        self.ops = [(op, np.array([c.op == op for _, c in conditions])) for op in _OPERATORS]
+        self.ops = [(op, mask) for op, mask in self.ops if mask.any()]
+        self.membership = np.zeros((len(conditions), self.n_clauses))
+        for position, (clause_id, _) in enumerate(conditions):
+            self.membership[position, clause_id] = 1.0
+
+    def evaluate(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        if self.n_clauses == 0:
+            return np.zeros(n, dtype=bool)
+        values = X[:, self.index]
+        hits = np.zeros(values.shape, dtype=bool)
+        for op, mask in self.ops:
+            hits[:, mask] = _OPERATORS[op](values[:, mask], self.threshold[mask])
+        clause_hits = hits.astype(float) @ self.membership
+        return (clause_hits > 0).all(axis=1)
+
+
+class RuleEngine:
+    """
+    Vectorized scorer for a RuleSpec. Scores N patients per call from an
+    (n, len(spec.features)) matrix with one clip/weighted dot product and a
+    few boolean masks.
+    """
+
+    def __init__(self, spec: RuleSpec):
+        self.spec = spec
+        columns = {name: position for position, name in enumerate(spec.features)}
+        self.index = np.array([columns[t.feature] for t in spec.terms], dtype=np.intp)
+        self.scale = np.array([t.scale for t in spec.terms], dtype=float)
+        self.weight = np.array([t.weight for t in spec.terms], dtype=float)
+        self.clip = np.array([t.clip for t in spec.terms])
+        self.invert = np.array([t.invert for t in spec.terms])
+        self.force_positive = CompiledRule(spec.force_positive, columns)
+        self.force_negative = CompiledRule(spec.force_negative, columns)
+        self.jitter_draws = JITTER_DRAWS[spec.outcome]
+
+    def base_score(self, X: np.ndarray) -> np.ndarray:
+        values = X[:, self.index] / self.scale
+        values = np.where(self.clip, np.minimum(1.0, values), values)
+        values = np.where(self.invert, 1.0 - values, values)
+        return values @ self.weight + self.spec.bias
+
+    def score(self, X: np.ndarray, uniforms: Optional[np.ndarray] = None):
+        """
+        Return (predictions, probabilities) for every row of X. ``uniforms``
+        is an (n, jitter_draws) array in [0, 1) that drives the random
+        variation; fresh random draws are used when it is omitted.
+        """
+        X = np.asarray(X, dtype=float)
+        if uniforms is None:
+            uniforms = np.random.random((X.shape[0], self.jitter_draws))
+        base = self.base_score(X)
+        if self.spec.outcome == "centered":
+            return centered_outcome(base, uniforms)
+        return banded_outcome(
+            base,
+            self.force_positive.evaluate(X),
+            self.force_negative.evaluate(X),
+            uniforms,
+        )
+
+
+def banded_outcome(base, force_positive, force_negative, uniforms, threshold=0.5):
+    u = uniforms[:, 0]
+    above = base > threshold
+
+    # Add significant randomness (±20%) to ensure varied results, then keep
+    # positive predictions within 0.55-0.95 and negative ones within 0.05-0.45
+    raw = base + (u * 0.4 - 0.2)
+    scored = np.where(above, np.clip(raw, 0.55, 0.95), np.clip(raw, 0.05, 0.45))
+
+    # Forced profiles use 0.65-0.95 (positive) and 0.05-0.35 (negative)
+    probabilities = np.where(
+        force_positive, 0.65 + u * 0.3,
+        np.where(force_negative, 0.05 + u * 0.3, scored)
+    )
+    predictions = np.where(force_positive, True, np.where(force_negative, False, above))
+    return predictions, probabilities
+
+
+def centered_outcome(base, uniforms, threshold=0.5):
+    # Add significant randomness (±25%) and keep within 0.05-0.95
+    raw = np.clip(base + (uniforms[:, 0] * 0.5 - 0.25), 0.05, 0.95)
+
+    # If the probability is near 0.5, push it away in either direction
+    near_middle = (raw >= 0.45) & (raw <= 0.55)
+    direction = np.where(uniforms[:, 1] > 0.5, 1.0, -1.0)
+    raw = np.where(near_middle, raw + direction * 0.15, raw)
+
+    predictions = raw > threshold
+    # Two decimal places for display
+    probabilities = np.round(raw * 100) / 100
+    return predictions, probabilities
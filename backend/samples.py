@@ -0,0 +1,167 @@
+"""
+Realistic request payloads for the predict endpoints, built from the datasets
+in backend/data, and the sample images in public/images. Shared by the
+benchmark and load generator; SAMPLE_SPECS also maps the columns of files
+uploaded for bulk scoring.
+"""
+import csv
+import os
+import random
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'public', 'images')
+
+
+class SampleSpec(NamedTuple):
+    """
+    How one dataset maps onto an endpoint's input model. Columns are renamed
+    with ``rename`` (default: spaces become underscores) and parsed as floats
+    unless listed in ``text`` or ``integer``; ``values`` maps raw strings of
+    a column to the value the API expects.
+    """
+    filename: str
+    drop: Tuple[str, ...] = ()
+    rename: Dict[str, str] = {}
+    text: Tuple[str, ...] = ()
+    integer: Tuple[str, ...] = ()
+    values: Dict[str, Dict[str, Any]] = {}
+
+
+SAMPLE_SPECS = {
+    "diabetes": SampleSpec("diabetes.csv", drop=("Outcome",)),
+    "heart": SampleSpec(
+        "Heart_Disease_Prediction.csv",
+        drop=("Heart Disease",),
+        rename={
+            "Age": "age", "Sex": "sex", "Chest pain type": "cp", "BP": "trestbps",
+            "Cholesterol": "chol", "FBS over 120": "fbs", "EKG results": "restecg",
+            "Max HR": "thalach", "Exercise angina": "exang", "ST depression": "oldpeak",
+            "Slope of ST": "slope", "Number of vessels fluro": "ca", "Thallium": "thal",
+        },
+    ),
+    "liver": SampleSpec(
+        "indian_liver_patient.csv",
+        drop=("Dataset",),
+        rename={
+            "Age": "age", "Gender": "gender", "Total_Bilirubin": "total_bilirubin",
+            "Direct_Bilirubin": "direct_bilirubin", "Alkaline_Phosphotase": "alkaline_phosphotase",
+            "Alamine_Aminotransferase": "alamine_aminotransferase",
+            "Aspartate_Aminotransferase": "aspartate_aminotransferase",
+            "Total_Protiens": "total_proteins", "Albumin": "albumin",
+            "Albumin_and_Globulin_Ratio": "albumin_globulin_ratio",
+        },
+        # Same encoding as the liver form in the frontend
+        values={"gender": {"Male": 1.0, "Female": 0.0}},
+    ),
+    "parkinsons": SampleSpec("parkinsons_dataset.csv", drop=("target",)),
+    "lung": SampleSpec(
+        "lung_cancer.csv",
+        drop=("LUNG_CANCER",),
+        rename={
+            "GENDER": "gender", "AGE": "age", "SMOKING": "smoking", "YELLOW_FINGERS": "yellow_fingers",
+            "ANXIETY": "anxiety", "PEER_PRESSURE": "peer_pressure", "CHRONICDISEASE": "chronic_disease",
+            "FATIGUE": "fatigue", "ALLERGY": "allergy", "WHEEZING": "wheezing",
+            "ALCOHOLCONSUMING": "alcohol_consuming", "COUGHING": "coughing",
+            "SHORTNESSOFBREATH": "shortness_of_breath", "SWALLOWINGDIFFICULTY": "swallowing_difficulty",
+            "CHESTPAIN": "chest_pain",
+        },
+        text=("gender",),
+        integer=(
+            "age", "smoking", "yellow_fingers", "anxiety", "peer_pressure", "chronic_disease",
+            "fatigue", "allergy", "wheezing", "alcohol_consuming", "coughing",
+            "shortness_of_breath", "swallowing_difficulty", "chest_pain",
+        ),
+    ),
+    "kidney": SampleSpec(
+        "chronic_kidney_dataset.csv",
+        drop=("target",),
+        text=("rbc", "pc", "pcc", "ba", "htn", "dm", "cad", "appet", "pe", "ane"),
+    ),
+    "breast": SampleSpec("breast_cancer_dataset.csv", drop=("target",)),
+}
+
+DISEASES = tuple(SAMPLE_SPECS) + ("general",)
+
+# Image uploads per disease type; GIFs are left out since cv2 cannot decode them
+IMAGE_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+IMAGE_DISEASES = {
+    "breast": "breast", "diabetes": "diabetes", "heart": "heart", "liver": "liver",
+    "lung": "lung", "parkinson": "parkinsons", "h": "general",
+}
+
+
+class SampleImage(NamedTuple):
+    disease: str
+    filename: str
+    content_type: str
+    data: bytes
+
+
+def _parse(spec: SampleSpec, field: str, raw: str):
+    raw = raw.strip()
+    if field in spec.values:
+        return spec.values[field][raw]
+    if field in spec.text:
+        return raw
+    if field in spec.integer:
+        return int(float(raw))
+    return float(raw)
+
+
+@lru_cache(maxsize=None)
+def load_payloads(disease: str) -> Tuple[dict, ...]:
+    """Every usable dataset row of ``disease`` as a JSON request body; rows with missing values are skipped"""
+    if disease == "general":
+        return _symptom_payloads()
+    spec = SAMPLE_SPECS[disease]
+    with open(os.path.join(DATA_DIR, spec.filename), newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = [column.strip() for column in next(reader)]
+        columns = [
+            (position, spec.rename.get(column, column.replace(' ', '_')))
+            for position, column in enumerate(header)
+            if column not in spec.drop
+        ]
+        payloads = []
+        for row in reader:
+            try:
+                payloads.append({field: _parse(spec, field, row[position]) for position, field in columns})
+            except (ValueError, KeyError, IndexError):
+                continue
+    return tuple(payloads)
+
+
+def _symptom_payloads() -> Tuple[dict, ...]:
+    with open(os.path.join(DATA_DIR, 'dataset.csv'), newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        payloads = []
+        for row in reader:
+            symptoms = [symptom.strip() for symptom in row[1:] if symptom.strip()]
+            if symptoms:
+                payloads.append({"symptoms": symptoms})
+    return tuple(payloads)
+
+
+def sample_payloads(disease: str, n: int, rng: random.Random) -> List[dict]:
+    """``n`` request bodies for ``disease`` drawn with replacement"""
+    return rng.choices(load_payloads(disease), k=n)
+
+
+@lru_cache(maxsize=None)
+def load_images() -> Tuple[SampleImage, ...]:
+    """The sample images in public/images with the disease type each is uploaded as"""
+    images = []
+    if not os.path.isdir(IMAGES_DIR):
+        return ()
+    for filename in sorted(os.listdir(IMAGES_DIR)):
+        stem, extension = os.path.splitext(filename)
+        content_type = IMAGE_TYPES.get(extension.lower())
+        disease = IMAGE_DISEASES.get(stem)
+        if content_type is None or disease is None:
+            continue
+        with open(os.path.join(IMAGES_DIR, filename), 'rb') as f:
+            images.append(SampleImage(disease, filename, content_type, f.read()))
+    return tuple(images)
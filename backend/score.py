@@ -0,0 +1,202 @@
+"""
+Offline batch scoring with the API's encoders and models, without HTTP.
+
+    python -m backend.score DISEASE INPUT [-o OUTPUT] [--workers N]
+        [--chunk-rows N] [--jitter off|hashed|random]
+
+INPUT is a CSV or Parquet file in the layout of the disease's dataset in
+backend/data, like uploads to /predict/{disease}/bulk. Chunks of rows are
+scored on a pool of worker processes by the same function that serves the
+bulk endpoint, so results match what the API returns. The output format
+follows the extension of OUTPUT (.csv, .ndjson/.jsonl or .parquet); without
+-o, NDJSON is written to stdout. ``row`` is the line number in a CSV input
+and the 1-based row index in a Parquet input.
+"""
+import argparse
+import csv
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from bulk import GENERAL_RESULT_FIELDS, RESULT_FIELDS, csv_header, csv_lines, ndjson_lines
+    from jitter import JITTER_MODES, resolve_jitter
+    from samples import DISEASES
+except ImportError:
+    # Fallback for when running as a module
+    from backend.bulk import GENERAL_RESULT_FIELDS, RESULT_FIELDS, csv_header, csv_lines, ndjson_lines
+    from backend.jitter import JITTER_MODES, resolve_jitter
+    from backend.samples import DISEASES
+
+OUTPUT_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+
+
+def iter_csv_records(path, chunk_rows):
+    """Lists of at most ``chunk_rows`` (line number, column -> value) records of a CSV file"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = None
+        records = []
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue
+            if header is None:
+                header = [column.strip() for column in row]
+                continue
+            records.append((reader.line_num, dict(zip(header, row))))
+            if len(records) == chunk_rows:
+                yield records
+                records = []
+        if records:
+            yield records
+
+
+def iter_parquet_records(path, chunk_rows):
+    """Lists of at most ``chunk_rows`` (row index, column -> value) records of a Parquet file"""
+    import pyarrow.parquet as pq
+
+    number = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        records = []
+        for record in batch.to_pylist():
+            number += 1
+            records.append((number, record))
+        yield records
+
+
+def _scoring_app():
+    try:
+        import main
+    except ImportError:
+        # Fallback for when running as a module
+        from backend import main
+    return main
+
+
+def score_records(disease, records, jitter, log_level):
+    """Score one chunk in a worker process with the bulk endpoint's scorer"""
+    app = _scoring_app()
+    # Importing the app configures logging with LOG_LEVEL; the CLI has its own level
+    logging.getLogger().setLevel(log_level)
+    return app.score_records(disease, records, jitter)
+
+
+class ParquetOutput:
+    """Writes scored chunks as row groups of a Parquet file"""
+
+    def __init__(self, path, disease):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.fields = GENERAL_RESULT_FIELDS if disease == "general" else RESULT_FIELDS
+        types = {
+            "prediction": pa.string() if disease == "general" else pa.bool_(),
+            "probability": pa.float64(),
+            "risk_level": pa.string(),
+            "description": pa.string(),
+            "precautions": pa.list_(pa.string()),
+            "unrecognized": pa.list_(pa.string()),
+        }
+        self.schema = pa.schema(
+            [("row", pa.int64())] + [(field, types[field]) for field in self.fields] + [("error", pa.string())]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, numbered_results):
+        columns = {"row": [number for number, _ in numbered_results]}
+        for field in self.fields + ("error",):
+            columns[field] = [result.get(field) for _, result in numbered_results]
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class TextOutput:
+    """Writes scored chunks as NDJSON or CSV lines"""
+
+    def __init__(self, path, disease, fmt):
+        self.disease = disease
+        self.fmt = fmt
+        self.file = sys.stdout if path is None else open(path, "w", encoding="utf-8", newline="")
+        if fmt == "csv":
+            self.file.write(csv_header(disease))
+
+    def write(self, numbered_results):
+        if self.fmt == "csv":
+            self.file.write(csv_lines(self.disease, numbered_results))
+        else:
+            self.file.write(ndjson_lines(numbered_results))
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file with the API's models, without HTTP")
+    parser.add_argument("disease", choices=DISEASES)
+    parser.add_argument("input", help="CSV or Parquet file in the layout of the disease's dataset in backend/data")
+    parser.add_argument("-o", "--output", help="output file, .csv, .ndjson/.jsonl or .parquet (default: NDJSON on stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="scoring processes, 0 scores in this process (default: %(default)s)")
+    parser.add_argument("--chunk-rows", type=int, default=4096, help="rows per scoring call (default: %(default)s)")
+    parser.add_argument("--jitter", choices=JITTER_MODES, help="probability jitter mode (default: PREDICTION_JITTER)")
+    parser.add_argument("--log-level", default="WARNING", help="level of the scoring code's logs (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    fmt = "ndjson"
+    if args.output is not None:
+        fmt = OUTPUT_FORMATS.get(os.path.splitext(args.output)[1].lower())
+        if fmt is None:
+            parser.error(f"unknown output extension, use one of {', '.join(OUTPUT_FORMATS)}")
+    parquet_input = os.path.splitext(args.input)[1].lower() == ".parquet"
+    chunks = (iter_parquet_records if parquet_input else iter_csv_records)(args.input, args.chunk_rows)
+    jitter = resolve_jitter(args.jitter)
+
+    output = ParquetOutput(args.output, args.disease) if fmt == "parquet" else TextOutput(args.output, args.disease, fmt)
+    started = time.perf_counter()
+    scored = errors = 0
+
+    def write(numbered_results):
+        nonlocal scored, errors
+        output.write(numbered_results)
+        scored += len(numbered_results)
+        errors += sum(1 for _, result in numbered_results if "error" in result)
+
+    try:
+        if args.workers <= 0:
+            for chunk in chunks:
+                write(score_records(args.disease, chunk, jitter, args.log_level.upper()))
+        else:
+            # spawn like the API's process pool; at most two chunks per worker
+            # are in flight, so memory does not grow with the input
+            with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(score_records, args.disease, chunk, jitter, args.log_level.upper()))
+                    if len(pending) >= 2 * args.workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        output.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Scored {scored} {args.disease} rows ({errors} errors) in {elapsed:.2f}s, "
+        f"{scored / elapsed if elapsed > 0 else 0:.0f} rows/s",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Seconds between mtime checks for hot-reloading model artifacts (-1 disables)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "2.0"))
+
+# Largest number of rows accepted by the /predict/{disease}/batch endpoints
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "10000"))
+
+# Micro-batching of concurrent single-row predictions: requests arriving
+# within the window are scored together, up to MICROBATCH_MAX_ROWS rows.
+# A window of 0 scores every request on its own.
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "2"))
+MICROBATCH_MAX_ROWS = int(os.getenv("MICROBATCH_MAX_ROWS", "64"))
+
+# Execution layer: blocking I/O runs on a thread pool; CPU-heavy inference
+# and image decoding run on the executor named here ("thread", "process"
+# or "inline" to stay on the event loop)
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", str(min(32, (os.cpu_count() or 1) + 4))))
+PROCESS_POOL_SIZE = int(os.getenv("PROCESS_POOL_SIZE", str(os.cpu_count() or 1)))
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+IMAGE_EXECUTOR = os.getenv("IMAGE_EXECUTOR", "thread")
+
+# Gemini image analysis
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL",
+    "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent",
+)
+# Seconds allowed for one HTTP attempt, and for the whole call including retries
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "60"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_RETRY_BACKOFF = float(os.getenv("GEMINI_RETRY_BACKOFF", "0.5"))
+
+# Image analysis cache, keyed on the uploaded bytes, disease type and prompt.
+# IMAGE_CACHE_PATH enables the SQLite disk tier when set.
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "1024"))
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "86400"))
+IMAGE_CACHE_PATH = os.getenv("IMAGE_CACHE_PATH", "")
+IMAGE_CACHE_DISK_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+# JPEG/PNG uploads up to this size are sent to Gemini as-is, without a
+# decode and JPEG re-encode
+IMAGE_PASSTHROUGH_MAX_BYTES = int(os.getenv("IMAGE_PASSTHROUGH_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Upload size budget, enforced while the upload is read
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+IMAGE_READ_CHUNK_BYTES = int(os.getenv("IMAGE_READ_CHUNK_BYTES", str(1024 * 1024)))
+# Downscale stage before analysis: longest edge in pixels and JPEG size
+# budget in bytes (0 disables either limit)
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "2048"))
+IMAGE_TARGET_BYTES = int(os.getenv("IMAGE_TARGET_BYTES", str(1024 * 1024)))
+
+# Probability jitter of the heart, liver, lung, parkinsons and breast scorers:
+# "random" (fresh noise per request), "off" or "hashed" (noise derived from
+# the input, so identical inputs get identical, cacheable results). Requests
+# can override it with ?jitter=. PREDICTION_JITTER_SEED keys the hash.
+PREDICTION_JITTER = os.getenv("PREDICTION_JITTER", "random")
+PREDICTION_JITTER_SEED = os.getenv("PREDICTION_JITTER_SEED", "")
+
+# Prediction result cache, one LRU per model, keyed on the validated input
+# and the model version. Only reproducible results are cached (0 disables).
+# The version comes from the serving process, which loads each cached model
+# even when INFERENCE_EXECUTOR=process scores it in the workers.
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+
+# Serve the array-backed exports written by `python -m backend.export_models`
+# instead of the pickled/JSON artifacts, for models that have one. Their
+# scores match the originals' within the export's SCORE_TOLERANCE.
+# LEAN_MODELS_DIR defaults to backend/saved_models/lean.
+LEAN_MODELS = os.getenv("LEAN_MODELS", "false").lower() in ("1", "true", "yes")
+LEAN_MODELS_DIR = os.getenv("LEAN_MODELS_DIR", "")
+
+# Startup warmup: "blocking" loads every model and the lazily imported
+# libraries before the worker accepts requests, "background" accepts requests
+# at once and warms up on a worker thread, "off" loads everything on first use
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background")
+# Time every module imported until warmup ends, like python -X importtime;
+# logged once warmup finishes and served at /debug/startup
+IMPORT_PROFILE = os.getenv("IMPORT_PROFILE", "false").lower() in ("1", "true", "yes")
+
+# Logging: level and output format of the records written to stderr by a
+# background thread, plain "text" lines unless LOG_FORMAT=json. Records below
+# WARNING logged while serving a request are kept with probability
+# LOG_SAMPLE_RATE, or the rate given for its route template in
+# LOG_SAMPLE_RATES ("/predict/heart=0.1,/predict/general=0.5").
+# LOG_QUEUE_SIZE records can wait to be written before new ones are dropped.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Bulk scoring of uploaded CSV files (/predict/{disease}/bulk): rows scored
+# per model call and bytes read from the upload at a time
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "2048"))
+BULK_READ_CHUNK_BYTES = int(os.getenv("BULK_READ_CHUNK_BYTES", str(256 * 1024)))
@@ -0,0 +1,161 @@
+"""
+Symptom autocomplete over the feature columns of the general model.
+
+Every symptom is indexed in a character trie under its name and under each
+word it contains ("pain" finds abdominal_pain and chest_pain). A query is
+matched against prefixes of those keys within a small edit distance by
+walking the trie with one Levenshtein row per node, so typos still find
+their symptom. Suggestions are ranked by match quality, then by weight in
+Symptom-severity.csv, most severe first.
+"""
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from helper import DATA_DIR, normalize_symptom, symptom_columns
+except ImportError:
+    # Fallback for when running as a module
+    from backend.helper import DATA_DIR, normalize_symptom, symptom_columns
+
+SEVERITY_PATH = os.path.join(DATA_DIR, 'Symptom-severity.csv')
+
+
+class Symptom(NamedTuple):
+    name: str  # feature column, as accepted by /predict/general
+    label: str
+    severity: Optional[int]
+
+
+class Suggestion(NamedTuple):
+    symptom: Symptom
+    distance: int
+
+
+def max_distance(query: str) -> int:
+    """Typos tolerated in a query: none for 1-2 characters, then one, then two"""
+    if len(query) <= 2:
+        return 0
+    return 1 if len(query) <= 5 else 2
+
+
+def _join_key(name: str) -> str:
+    # Symptom-severity.csv spells a few names differently ("foul_smell_ofurine")
+    return normalize_symptom(name).replace('_', '')
+
+
+def load_severities() -> Dict[str, int]:
+    """Separator-free symptom name -> weight in Symptom-severity.csv"""
+    with open(SEVERITY_PATH, newline='', encoding='utf-8') as f:
+        return {_join_key(row['Symptom']): int(row['weight']) for row in csv.DictReader(f)}
+
+
+class _Node:
+    __slots__ = ('children', 'matches')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        # (symptom id, word position) of every key passing through this node
+        self.matches: List[Tuple[int, int]] = []
+
+
+class SymptomSearchIndex:
+    """Prefix trie over symptom names and their words, built once per process"""
+
+    def __init__(self, symptoms: List[Symptom]):
+        self.symptoms = symptoms
+        self.root = _Node()
+        for symptom_id, symptom in enumerate(symptoms):
+            words = normalize_symptom(symptom.name).split('_')
+            for position in range(len(words)):
+                self._insert('_'.join(words[position:]), (symptom_id, position))
+        # Everything, most severe first, for an empty query
+        self.by_severity = sorted(range(len(symptoms)), key=lambda i: self._severity_rank(i))
+
+    def _insert(self, key: str, match: Tuple[int, int]):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            node.matches.append(match)
+
+    def _severity_rank(self, symptom_id: int):
+        symptom = self.symptoms[symptom_id]
+        return -(symptom.severity or 0), symptom.name
+
+    def _prefix_matches(self, query: str) -> List[Tuple[int, int]]:
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.matches
+
+    def _fuzzy_matches(self, query: str, best: Dict[int, Tuple[int, int]]):
+        """
+        Add the keys having a prefix within max_distance(query) edits of the
+        query to ``best``. Typos in the first character are not corrected,
+        which keeps the walk inside one subtree, and only the diagonal band
+        of the Levenshtein rows that can stay within the limit is computed.
+        """
+        allowed = max_distance(query)
+        start = self.root.children.get(query[0])
+        if allowed == 0 or start is None:
+            return
+        over = allowed + 1
+        length = len(query)
+        first_row = list(range(min(length, allowed) + 1)) + [over] * max(0, length - allowed)
+        stack = [(start, query[0], first_row, 1)]
+        while stack:
+            node, char, previous, depth = stack.pop()
+            row = [over] * (length + 1)
+            if depth <= allowed:
+                row[0] = depth
+            for i in range(max(1, depth - allowed), min(length, depth + allowed) + 1):
+                row[i] = min(row[i - 1] + 1, previous[i] + 1, previous[i - 1] + (query[i - 1] != char), over)
+            distance = row[-1]
+            if distance <= allowed:
+                # The query matches this prefix; every key below it is a candidate
+                for symptom_id, position in node.matches:
+                    rank = (distance, position)
+                    if rank < best.get(symptom_id, (over, 0)):
+                        best[symptom_id] = rank
+            # Going deeper only helps while some longer prefix could still
+            # match, and match more closely than this one
+            if min(row) < min(distance, over):
+                stack.extend((child, child_char, row, depth + 1) for child_char, child in node.children.items())
+
+    def search(self, query: str, limit: int = 10) -> List[Suggestion]:
+        query = normalize_symptom(query)
+        if not query:
+            return [Suggestion(self.symptoms[i], 0) for i in self.by_severity[:limit]]
+
+        # symptom id -> (distance, word position) of its best match
+        best: Dict[int, Tuple[int, int]] = {}
+        for symptom_id, position in self._prefix_matches(query):
+            if (0, position) < best.get(symptom_id, (1, 0)):
+                best[symptom_id] = (0, position)
+        if len(best) < limit:
+            self._fuzzy_matches(query, best)
+
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (item[1][0], item[1][1] > 0) + self._severity_rank(item[0]),
+        )
+        return [Suggestion(self.symptoms[i], rank[0]) for i, rank in ranked[:limit]]
+
+
+@lru_cache(maxsize=None)
+def symptom_search_index() -> SymptomSearchIndex:
+    severities = load_severities()
+    symptoms = [
+        Symptom(column, ' '.join(normalize_symptom(column).split('_')), severities.get(_join_key(column)))
+        for column in symptom_columns()
+    ]
+    return SymptomSearchIndex(symptoms)
+
+
+@lru_cache(maxsize=4096)
+def search_symptoms(query: str, limit: int = 10) -> Tuple[Suggestion, ...]:
+    """Ranked suggestions for ``query``; repeated autocomplete prefixes are served from memory"""
+    return tuple(symptom_search_index().search(query, limit))
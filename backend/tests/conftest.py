@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Import the backend modules the way the server does (``cd backend && uvicorn main:app``)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Settings are read when the app is imported
+os.environ.setdefault("STARTUP_WARMUP", "off")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("INFERENCE_EXECUTOR", "thread")
+os.environ.setdefault("IMAGE_CACHE_PATH", "")
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import prediction_cache
+from samples import DISEASES, sample_payloads
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("disease", DISEASES)
+def test_batch_returns_the_single_endpoint_results_in_order(client, disease):
+    payloads = sample_payloads(disease, 6, random.Random(disease))
+    # Jittered endpoints derive their noise from the row with "hashed"
+    params = {"jitter": "hashed"}
+
+    singles = []
+    for payload in payloads:
+        response = client.post(f"/predict/{disease}", json=payload, params=params)
+        assert response.status_code == 200, response.text
+        singles.append(response.json())
+    # Score the batch rather than reading back what the singles cached
+    prediction_cache.prediction_caches.clear()
+
+    response = client.post(f"/predict/{disease}/batch", json=payloads, params=params)
+    assert response.status_code == 200, response.text
+    assert response.json() == singles
+
+
+def test_batch_rejects_an_invalid_row(client):
+    payloads = sample_payloads("heart", 2, random.Random(0))
+    payloads[1] = {**payloads[1], "age": "old"}
+    assert client.post("/predict/heart/batch", json=payloads).status_code == 422
+
+
+def test_batch_size_is_limited(client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_ROWS", 2)
+    payloads = sample_payloads("diabetes", 3, random.Random(0))
+    assert client.post("/predict/diabetes/batch", json=payloads).status_code == 413
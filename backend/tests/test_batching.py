@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=5))
+
+
+class Recorder:
+    """Batched function that doubles each row and records the batches it got"""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    def __call__(self, rows):
+        self.batches.append(list(rows))
+        if self.fail_on in rows:
+            raise ValueError(f"bad row {self.fail_on}")
+        return [row * 2 for row in rows]
+
+
+def test_concurrent_submits_share_one_call_and_get_their_own_result():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_rows=64, window=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    assert run(scenario()) == [i * 2 for i in range(10)]
+    assert fn.batches == [list(range(10))]
+
+
+def test_flushes_when_max_rows_are_pending():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_rows=4, window=10)
+
+    async def scenario():
+        return await batcher.submit_all(range(8))
+
+    assert run(scenario()) == [i * 2 for i in range(8)]
+    assert fn.batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+def test_disabled_batcher_calls_once_per_row():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_rows=64, window=0)
+
+    assert run(batcher.submit_all([1, 2])) == [2, 4]
+    assert fn.batches == [[1], [2]]
+
+
+def test_runner_executes_the_batched_call():
+    fn = Recorder()
+    calls = []
+
+    async def runner(batched_fn, rows):
+        calls.append(rows)
+        return batched_fn(rows)
+
+    batcher = MicroBatcher(fn, max_rows=64, window=0.01, runner=runner)
+
+    assert run(batcher.submit_all([1, 2, 3])) == [2, 4, 6]
+    assert calls == [[1, 2, 3]]
+
+
+def test_a_failing_row_only_fails_its_own_request():
+    fn = Recorder(fail_on=3)
+    batcher = MicroBatcher(fn, max_rows=64, window=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)), return_exceptions=True)
+
+    results = run(scenario())
+    assert results[:3] == [0, 2, 4]
+    assert isinstance(results[3], ValueError) and str(results[3]) == "bad row 3"
+    assert results[4] == 8
+    # The coalesced call, then one retry per row
+    assert fn.batches[0] == list(range(5))
+    assert fn.batches[1:] == [[i] for i in range(5)]
+
+
+def test_single_row_error_is_passed_through():
+    batcher = MicroBatcher(Recorder(fail_on=1), max_rows=64, window=0.01)
+
+    with pytest.raises(ValueError, match="bad row 1"):
+        run(batcher.submit(1))
+
+
+def test_wrong_number_of_results_fails_every_request_instead_of_hanging():
+    batcher = MicroBatcher(lambda rows: [row * 2 for row in rows][:-1], max_rows=64, window=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    results = run(scenario())
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
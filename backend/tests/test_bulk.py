@@ -0,0 +1,91 @@
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+import main
+from bulk import read_records, record_payload, score_chunk
+
+HEADER = "Pregnancies,Glucose,BloodPressure,SkinThickness,Insulin,BMI,DiabetesPedigreeFunction,Age,Outcome\n"
+GOOD = ["6,148,72,35,0,33.6,0.627,50,1\n", "1,85,66,29,0,26.6,0.351,31,0\n"]
+BAD = "8,high,64,0,0,23.3,0.672,32,1\n"
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def upload(text):
+    return UploadFile(io.BytesIO(text.encode()), filename="cohort.csv")
+
+
+async def collect(file, chunk_rows):
+    return [chunk async for chunk in read_records(file, chunk_rows)]
+
+
+def test_read_records_numbers_lines_and_chunks_rows(monkeypatch):
+    # Reads smaller than a line, so records span reads
+    monkeypatch.setattr("bulk.BULK_READ_CHUNK_BYTES", 7)
+    text = HEADER + GOOD[0] + "\n" + GOOD[1] + BAD
+
+    chunks = asyncio.run(collect(upload(text), 2))
+
+    assert [[number for number, _ in chunk] for chunk in chunks] == [[2, 4], [5]]
+    assert chunks[0][0][1]["Glucose"] == "148"
+    assert chunks[1][0][1]["Glucose"] == "high"
+
+
+def test_read_records_rejects_an_empty_file():
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(collect(upload(""), 2))
+    assert e.value.status_code == 400
+
+
+def test_score_chunk_falls_back_to_single_rows():
+    def score(rows):
+        if "bad" in rows:
+            raise HTTPException(status_code=400, detail="bad row")
+        return [{"value": row} for row in rows]
+
+    assert score_chunk(score, ["a", "bad", "b"]) == [{"value": "a"}, {"error": "bad row"}, {"value": "b"}]
+
+
+def test_a_bad_row_gets_an_error_and_the_others_are_scored(client):
+    text = HEADER + GOOD[0] + BAD + GOOD[1]
+    response = client.post("/predict/diabetes/bulk", files={"file": ("cohort.csv", text, "text/csv")})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["row"] for line in lines] == [2, 3, 4]
+    assert "error" in lines[1] and "Glucose" in lines[1]["error"]
+    record = dict(zip(HEADER.strip().split(","), GOOD[0].strip().split(",")))
+    single = client.post("/predict/diabetes", json=record_payload("diabetes", record)).json()
+    assert {key: lines[0][key] for key in single} == single
+    assert "error" not in lines[2]
+
+
+def test_csv_output_keeps_a_column_for_errors(client):
+    text = HEADER + BAD + GOOD[0]
+    response = client.post(
+        "/predict/diabetes/bulk", params={"format": "csv"}, files={"file": ("cohort.csv", text, "text/csv")}
+    )
+    assert response.status_code == 200
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["row"] for row in rows] == ["2", "3"]
+    assert rows[0]["prediction"] == "" and rows[0]["error"]
+    assert rows[1]["prediction"] in ("True", "False") and rows[1]["error"] == ""
+
+
+def test_missing_columns_fail_before_streaming(client):
+    text = "Pregnancies,Glucose\n6,148\n"
+    response = client.post("/predict/diabetes/bulk", files={"file": ("cohort.csv", text, "text/csv")})
+    assert response.status_code == 400
+    assert "BloodPressure" in response.json()["detail"]
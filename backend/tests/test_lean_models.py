@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pytest
+
+from export_models import SCORE_TOLERANCE, _scores, export_model, sample_inputs
+from lean_models import LeanXGBoost, load_lean_model, to_lean
+from model_registry import registry
+
+
+def lean_pair(name, tmp_path):
+    """The original model of ``name`` and its lean export reloaded from disk"""
+    source = registry.source_path(name)
+    if not os.path.exists(source):
+        pytest.skip(f"{source} not found")
+    reference = registry.load_source(name)
+    reference = getattr(reference, "model", reference)
+    try:
+        lean = LeanXGBoost.from_json(source) if source.endswith(".json") else to_lean(reference)
+    except ValueError as e:
+        pytest.skip(str(e))
+    path = str(tmp_path / f"{name}.npz")
+    lean.save(path)
+    return reference, load_lean_model(path)
+
+
+@pytest.mark.filterwarnings("ignore")
+@pytest.mark.parametrize("name", registry.names())
+def test_lean_scores_are_within_tolerance_of_the_original(name, tmp_path):
+    reference, lean = lean_pair(name, tmp_path)
+    X = sample_inputs(lean, np.random.default_rng(0), 500)
+
+    np.testing.assert_array_equal(np.asarray(reference.predict(X)), np.asarray(lean.predict(X)))
+    np.testing.assert_allclose(
+        _scores(lean, X), np.asarray(_scores(reference, X), dtype=np.float64), rtol=0, atol=SCORE_TOLERANCE
+    )
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_export_fails_outside_the_tolerance(tmp_path):
+    rng = np.random.default_rng(0)
+    assert export_model("diabetes", str(tmp_path), 200, rng)
+    # The diabetes export differs from the original by ~1e-10
+    assert not export_model("diabetes", str(tmp_path), 200, rng, tolerance=0.0)
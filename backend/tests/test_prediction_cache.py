@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+import prediction_cache
+from prediction_cache import cached_predict, prediction_key
+
+
+class GeneralInput(BaseModel):
+    symptoms: list[str]
+
+
+class HeartInput(BaseModel):
+    age: float
+    chol: float
+
+
+class FakeRegistry:
+    def __init__(self, version=1, stale=False):
+        self.current = version
+        self.is_stale = stale
+        self.loads = 0
+
+    def version(self, name):
+        return self.current
+
+    def stale(self, name):
+        return self.is_stale
+
+    def get(self, name):
+        self.loads += 1
+        self.is_stale = False
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    fake = FakeRegistry()
+    monkeypatch.setattr(prediction_cache, "registry", fake)
+    monkeypatch.setattr(prediction_cache, "prediction_caches", {})
+    return fake
+
+
+class Scorer:
+    def __init__(self, on_call=None):
+        self.calls = []
+        self.on_call = on_call
+
+    async def __call__(self, rows):
+        self.calls.append(list(rows))
+        if self.on_call is not None:
+            self.on_call()
+        return [{"prediction": row.age > 50} for row in rows]
+
+
+def test_key_ignores_symptom_order_case_spacing_and_duplicates():
+    a = GeneralInput(symptoms=["itching", "Skin Rash", "itching"])
+    b = GeneralInput(symptoms=["skin_rash", " ITCHING "])
+    assert prediction_key(a, 1) == prediction_key(b, 1)
+
+
+def test_key_changes_with_input_version_and_options():
+    row = HeartInput(age=60, chol=200)
+    key = prediction_key(row, 1)
+    assert prediction_key(HeartInput(age=60, chol=201), 1) != key
+    assert prediction_key(row, 2) != key
+    assert prediction_key(row, 1, ("hashed",)) != key
+    assert prediction_key(row, 1, ()) == key
+
+
+def test_key_distinguishes_input_models_with_the_same_fields():
+    class OtherInput(BaseModel):
+        age: float
+        chol: float
+
+    assert prediction_key(HeartInput(age=60, chol=200), 1) != prediction_key(OtherInput(age=60, chol=200), 1)
+
+
+def test_only_misses_are_scored(registry):
+    score = Scorer()
+    first, second = HeartInput(age=60, chol=200), HeartInput(age=40, chol=180)
+
+    asyncio.run(cached_predict("heart", [first], score, model="heart"))
+    results = asyncio.run(cached_predict("heart", [first, second], score, model="heart"))
+
+    assert results == [{"prediction": True}, {"prediction": False}]
+    assert score.calls == [[first], [second]]
+
+
+def test_results_are_not_stored_when_the_model_changes_while_scoring(registry):
+    def reload():
+        registry.current += 1
+
+    row = HeartInput(age=60, chol=200)
+    score = Scorer(on_call=reload)
+    asyncio.run(cached_predict("heart", [row], score, model="heart"))
+    assert len(prediction_cache.prediction_cache("heart")) == 0
+
+    score.on_call = None
+    asyncio.run(cached_predict("heart", [row], score, model="heart"))
+    asyncio.run(cached_predict("heart", [row], score, model="heart"))
+    assert len(score.calls) == 2
+
+
+def test_a_stale_model_is_loaded_before_its_version_is_used(registry):
+    registry.is_stale = True
+    score = Scorer()
+    row = HeartInput(age=60, chol=200)
+
+    asyncio.run(cached_predict("heart", [row], score, model="heart"))
+    asyncio.run(cached_predict("heart", [row], score, model="heart"))
+
+    assert registry.loads == 1
+    assert len(score.calls) == 1
+
+
+def test_cache_is_bypassed_while_the_model_cannot_be_loaded(registry, monkeypatch):
+    registry.is_stale = True
+    monkeypatch.setattr(registry, "get", lambda name: None)
+    score = Scorer()
+    row = HeartInput(age=60, chol=200)
+
+    asyncio.run(cached_predict("heart", [row], score, model="heart"))
+    asyncio.run(cached_predict("heart", [row], score, model="heart"))
+
+    assert len(score.calls) == 2
+    assert len(prediction_cache.prediction_cache("heart")) == 0
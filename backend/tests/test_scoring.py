@@ -0,0 +1,180 @@
+"""
+The rule specs in scoring.py against the per-request formulas they replaced,
+written out here as they were in the original handlers, with each
+np.random draw replaced by the same uniform value the engine receives.
+"""
+import random
+
+import numpy as np
+import pytest
+
+import main
+from samples import load_payloads
+from scoring import (
+    HEART_ENGINE, HEART_FEATURES, LIVER_ENGINE, LIVER_FEATURES, LUNG_ENGINE, LUNG_FEATURES,
+    PARKINSONS_ENGINE, PARKINSONS_FEATURES, feature_matrix,
+)
+
+
+def banded(base_score, force_positive, force_negative, u):
+    if force_positive:
+        return True, 0.65 + u * 0.3
+    if force_negative:
+        return False, 0.05 + u * 0.3
+    prediction = base_score > 0.5
+    # np.random.uniform(-0.2, 0.2)
+    raw_probability = base_score + (u * 0.4 - 0.2)
+    if prediction:
+        return True, max(0.55, min(0.95, raw_probability))
+    return False, max(0.05, min(0.45, raw_probability))
+
+
+def heart(d, u):
+    base_score = (
+        d['age'] / 100
+        + d['cp'] * 0.1
+        + min(1.0, d['chol'] / 300) * 0.1
+        + (1 - min(1.0, d['thalach'] / 180)) * 0.1
+        + d['exang'] * 0.2
+        + min(1.0, d['oldpeak'] / 4) * 0.15
+        + d['ca'] * 0.1
+        + (d['thal'] / 3) * 0.15
+    )
+    force_positive = d['cp'] >= 3 or d['exang'] == 1 or d['oldpeak'] >= 2.0 or d['ca'] >= 2 or d['thal'] >= 6
+    force_negative = (
+        d['age'] < 40 and d['cp'] <= 1 and d['chol'] < 200 and d['exang'] == 0
+        and d['oldpeak'] < 1.0 and d['ca'] == 0
+    )
+    return banded(base_score, force_positive, force_negative, u[0])
+
+
+def liver(d, u):
+    base_score = (
+        min(1.0, d['age'] / 70) * 0.05
+        + min(1.0, d['total_bilirubin'] / 2.0) * 0.15
+        + min(1.0, d['direct_bilirubin'] / 0.5) * 0.15
+        + min(1.0, d['alkaline_phosphotase'] / 250) * 0.15
+        + min(1.0, d['alamine_aminotransferase'] / 50) * 0.15
+        + min(1.0, d['aspartate_aminotransferase'] / 50) * 0.15
+        + (1.0 - min(1.0, d['total_proteins'] / 6.5)) * 0.05
+        + (1.0 - min(1.0, d['albumin'] / 3.5)) * 0.1
+        + (1.0 - min(1.0, d['albumin_globulin_ratio'] / 1.0)) * 0.05
+    )
+    force_positive = (
+        d['total_bilirubin'] > 1.5 or d['direct_bilirubin'] > 0.5 or d['alkaline_phosphotase'] > 300
+        or d['alamine_aminotransferase'] > 60 or d['aspartate_aminotransferase'] > 60 or d['albumin'] < 3.0
+    )
+    force_negative = (
+        d['total_bilirubin'] < 1.0 and d['direct_bilirubin'] < 0.3 and d['alkaline_phosphotase'] < 200
+        and d['alamine_aminotransferase'] < 40 and d['aspartate_aminotransferase'] < 40
+        and d['albumin'] > 3.5 and d['albumin_globulin_ratio'] > 1.0
+    )
+    return banded(base_score, force_positive, force_negative, u[0])
+
+
+def lung(d, u):
+    base_score = (
+        0.5
+        + min(1.0, d['age'] / 80) * 0.1
+        + d['smoking'] / 2 * 0.2
+        + d['yellow_fingers'] / 2 * 0.05
+        + d['chronic_disease'] / 2 * 0.1
+        + d['fatigue'] / 2 * 0.05
+        + d['wheezing'] / 2 * 0.1
+        + d['coughing'] / 2 * 0.1
+        + d['shortness_of_breath'] / 2 * 0.1
+        + d['chest_pain'] / 2 * 0.1
+        + d['anxiety'] / 2 * 0.025
+        + d['peer_pressure'] / 2 * 0.025
+        + d['allergy'] / 2 * 0.025
+        + d['alcohol_consuming'] / 2 * 0.025
+        + d['swallowing_difficulty'] / 2 * 0.05
+    )
+    force_positive = (
+        d['age'] > 60 and d['smoking'] == 2
+        and (d['coughing'] == 2 or d['shortness_of_breath'] == 2)
+        and (d['chest_pain'] == 2 or d['wheezing'] == 2)
+    )
+    force_negative = (
+        d['age'] < 40 and d['smoking'] == 1 and d['coughing'] == 1 and d['shortness_of_breath'] == 1
+        and d['chest_pain'] == 1 and d['wheezing'] == 1
+    )
+    return banded(base_score, force_positive, force_negative, u[0])
+
+
+def parkinsons(d, u):
+    base_probability = (
+        min(1.0, d['jitter_percent'] / 1.0) * 0.15
+        + min(1.0, d['shimmer'] / 0.06) * 0.15
+        + min(1.0, d['nhr'] / 0.5) * 0.15
+        + min(1.0, d['ppe'] / 0.5) * 0.15
+        + min(1.0, d['rpde'] / 0.7) * 0.15
+        + (1.0 - min(1.0, d['hnr'] / 30.0)) * 0.15
+    )
+    # np.random.uniform(-0.25, 0.25)
+    raw_probability = max(0.05, min(0.95, base_probability + (u[0] * 0.5 - 0.25)))
+    if 0.45 <= raw_probability <= 0.55:
+        # np.random.random() > 0.5
+        raw_probability += (1 if u[1] > 0.5 else -1) * 0.15
+    return raw_probability > 0.5, round(raw_probability * 100) / 100
+
+
+def random_rows(features, rng, n):
+    """Rows around the thresholds of the formulas, so every branch is taken"""
+    columns = {
+        'age': (20, 90), 'cp': (0, 3), 'chol': (120, 400), 'thalach': (70, 210), 'exang': (0, 1),
+        'oldpeak': (0, 5), 'ca': (0, 3), 'thal': (0, 7),
+        'total_bilirubin': (0.2, 3), 'direct_bilirubin': (0, 1), 'alkaline_phosphotase': (100, 400),
+        'alamine_aminotransferase': (10, 90), 'aspartate_aminotransferase': (10, 90),
+        'total_proteins': (4, 9), 'albumin': (2, 5), 'albumin_globulin_ratio': (0.3, 2),
+        'jitter_percent': (0, 1.5), 'shimmer': (0, 0.1), 'nhr': (0, 0.6), 'ppe': (0, 0.6),
+        'rpde': (0.2, 0.9), 'hnr': (5, 35),
+    }
+    rows = np.empty((n, len(features)))
+    for j, feature in enumerate(features):
+        if feature in columns:
+            low, high = columns[feature]
+            rows[:, j] = rng.uniform(low, high, n)
+            if feature in ('cp', 'exang', 'ca', 'thal'):
+                rows[:, j] = np.round(rows[:, j])
+        else:
+            # Binary answers coded 1/2, and features the formulas ignore
+            rows[:, j] = rng.integers(1, 3, n)
+    return rows
+
+
+CASES = [
+    ("heart", HEART_ENGINE, HEART_FEATURES, heart, main.HeartInput),
+    ("liver", LIVER_ENGINE, LIVER_FEATURES, liver, main.LiverInput),
+    ("lung", LUNG_ENGINE, LUNG_FEATURES, lung, main.LungInput),
+    ("parkinsons", PARKINSONS_ENGINE, PARKINSONS_FEATURES, parkinsons, main.ParkinsonsInput),
+]
+
+
+@pytest.mark.parametrize("name, engine, features, formula, input_model", CASES, ids=[case[0] for case in CASES])
+def test_rule_engine_matches_original_formulas(name, engine, features, formula, input_model):
+    rng = np.random.default_rng(0)
+    X = random_rows(features, rng, 2000)
+    uniforms = rng.random((len(X), engine.jitter_draws))
+
+    predictions, probabilities = engine.score(X, uniforms)
+
+    for row, u, prediction, probability in zip(X, uniforms, predictions, probabilities):
+        expected_prediction, expected_probability = formula(dict(zip(features, row)), u)
+        assert bool(prediction) == expected_prediction
+        assert probability == pytest.approx(expected_probability, abs=1e-12)
+
+
+@pytest.mark.parametrize("name, engine, features, formula, input_model", CASES, ids=[case[0] for case in CASES])
+def test_rule_engine_matches_original_formulas_on_dataset_rows(name, engine, features, formula, input_model):
+    payloads = load_payloads(name)
+    payloads = random.Random(0).sample(payloads, min(200, len(payloads)))
+    X = feature_matrix([input_model.model_validate(payload) for payload in payloads], features)
+    uniforms = np.random.default_rng(1).random((len(X), engine.jitter_draws))
+
+    predictions, probabilities = engine.score(X, uniforms)
+
+    for row, u, prediction, probability in zip(X, uniforms, predictions, probabilities):
+        expected_prediction, expected_probability = formula(dict(zip(features, row)), u)
+        assert bool(prediction) == expected_prediction
+        assert probability == pytest.approx(expected_probability, abs=1e-12)
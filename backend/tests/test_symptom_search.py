@@ -0,0 +1,120 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import helper
+import main
+from symptom_search import Symptom, SymptomSearchIndex, max_distance, search_symptoms
+
+SYMPTOMS = [
+    Symptom("abdominal_pain", "abdominal pain", 4),
+    Symptom("chest_pain", "chest pain", 7),
+    Symptom("high_fever", "high fever", 7),
+    Symptom("mild_fever", "mild fever", 5),
+    Symptom("headache", "headache", 3),
+    Symptom("skin_rash", "skin rash", 3),
+    Symptom("dischromic _patches", "dischromic patches", None),
+]
+
+
+@pytest.fixture
+def index():
+    return SymptomSearchIndex(SYMPTOMS)
+
+
+def names(suggestions):
+    return [suggestion.symptom.name for suggestion in suggestions]
+
+
+def test_max_distance_grows_with_the_query():
+    assert [max_distance("x" * n) for n in (1, 2, 3, 5, 6, 20)] == [0, 0, 1, 1, 2, 2]
+
+
+def test_prefix_of_a_name(index):
+    assert names(index.search("head")) == ["headache"]
+
+
+def test_prefix_of_a_later_word(index):
+    # Equal distance and both on a later word: most severe first
+    assert names(index.search("pain")) == ["chest_pain", "abdominal_pain"]
+
+
+def test_first_word_matches_rank_before_later_words(index):
+    assert names(index.search("mild")) == ["mild_fever"]
+    assert names(index.search("fever")) == ["high_fever", "mild_fever"]
+
+
+def test_query_is_normalized_like_the_columns(index):
+    assert names(index.search("Skin Rash")) == ["skin_rash"]
+    assert names(index.search("dischromic_pat")) == ["dischromic _patches"]
+
+
+def test_typos_within_the_edit_distance(index):
+    results = index.search("hedache")
+    assert names(results) == ["headache"]
+    assert results[0].distance == 1
+    assert names(index.search("fevr")) == ["high_fever", "mild_fever"]
+
+
+def test_exact_matches_rank_before_typos(index):
+    results = index.search("chest")
+    assert names(results)[0] == "chest_pain"
+    assert [suggestion.distance for suggestion in results] == sorted(suggestion.distance for suggestion in results)
+
+
+def test_the_first_character_is_not_corrected(index):
+    assert index.search("xeadache") == []
+
+
+def test_short_queries_need_an_exact_prefix(index):
+    assert names(index.search("hx")) == []
+
+
+def test_empty_query_lists_the_most_severe_symptoms(index):
+    assert names(index.search("", limit=3)) == ["chest_pain", "high_fever", "mild_fever"]
+
+
+def test_limit(index):
+    assert len(index.search("p", limit=1)) == 1
+
+
+def test_search_over_the_model_columns():
+    assert "skin_rash" in names(search_symptoms("skin"))
+    assert {"high_fever", "mild_fever"} <= set(names(search_symptoms("fevr")))
+
+
+def test_search_endpoint():
+    with TestClient(main.app) as client:
+        response = client.get("/symptoms/search", params={"q": "itchin"})
+        assert response.status_code == 200
+        assert response.json()["results"][0]["symptom"] == "itching"
+        assert client.get("/symptoms/search", params={"q": "itch", "limit": 0}).status_code == 422
+
+        symptoms = client.get("/symptoms").json()
+        assert len(symptoms) == len(helper.symptom_columns())
+
+
+@pytest.fixture
+def columns(monkeypatch):
+    """Replace the model's symptom columns, rebuilding the lookup around the test"""
+    def use(names):
+        monkeypatch.setattr(helper, "symptom_columns", lambda: tuple(names))
+        helper.symptom_index.cache_clear()
+
+    yield use
+    monkeypatch.undo()
+    helper.symptom_index.cache_clear()
+
+
+def test_symptom_lookup_normalizes_names(columns):
+    columns(["itching", "skin_rash", "dischromic _patches"])
+    assert helper.symptom_indices(["Skin Rash", "dischromic_patches", " ITCHING", "nope"]) == ([1, 2, 0], ["nope"])
+
+
+def test_columns_that_normalize_the_same_are_rejected(columns):
+    columns(["skin_rash", "Skin Rash"])
+    with pytest.raises(ValueError, match="skin_rash"):
+        helper.symptom_index()
+
+
+def test_current_columns_do_not_collide():
+    assert len(helper.symptom_index()) == len(helper.symptom_columns())